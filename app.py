@@ -1,165 +1,695 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g
 from flask_cors import CORS
+import asyncio
+import base64
+import contextlib
+import contextvars
+import csv
+import functools
+import io
+import json
 import os
-import requests
-from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.batch_jobs import JobManager
+from backend.lifecycle import LeaderLock, Lifecycle
+from backend.watchlists import WatchlistManager
+from backend.llm_batch import MicroBatcher, build_batch_prompt, split_batch_response
+from backend.llm_cache import prompt_key
+from backend.metrics import COUNT_BUCKETS, SIZE_BUCKETS, TOKEN_BUCKETS, metrics
+from backend.model_router import LARGE, SMALL, ModelRouter
+from backend.prewarm import PrewarmScheduler, target_items
+from backend.query_expansion import expand_query, reciprocal_rank_fusion
+from backend.providers import (
+    BASE_DIR, env, get_guard, get_llm, get_llm_cache, get_result_cache, get_search_cache, get_settings,
+    get_source_index, guard_stats, worker_processes
+)
+from backend.rate_limit import TokenBucket, take_budget, take_budget_async
+from backend.rerank import rerank
+from backend.resilience import ProviderUnavailable, parse_limits
+from backend.result_cache import Revalidator, make_key
+from backend.results import build_context, canonical_url
+from backend.scheduler import BACKGROUND, BULK, INTERACTIVE, PriorityScheduler
+from backend.serper import (
+    serper_flights, serper_flights_async, serper_search, serper_news_search, serper_search_async,
+    serper_news_search_async
+)
+from backend.tokens import count_tokens, set_encoding, tokenizer_name
+from backend.structured_output import MAX_POINTS, OUTPUT_INSTRUCTIONS, parse_point, parse_points
+from backend.singleflight import AsyncSingleFlight, SingleFlight, single_flight, single_flight_async
 
 # =================================================
 # LOAD ENV VARIABLES
 # =================================================
-load_dotenv()
+# Fail fast on missing keys; the LLM client and caches are built on first use
+OPENAI_MODEL_NAME = get_settings()["OPENAI_MODEL_NAME"]
 
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
-OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME")
-SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+# Worker threads for fan-out requests such as /api/brief
+RESEARCH_POOL_SIZE = int(env("RESEARCH_POOL_SIZE", "16"))
 
-if not all([
-    AZURE_OPENAI_ENDPOINT,
-    OPENAI_API_KEY,
-    OPENAI_API_VERSION,
-    OPENAI_MODEL_NAME,
-    SERPER_API_KEY
-]):
-    raise ValueError("❌ Missing environment variables")
+# Bulk enrichment jobs (rate limits are requests per second, 0 = unlimited)
+BATCH_JOBS_DIR = env("BATCH_JOBS_DIR", os.path.join(BASE_DIR, ".cache", "jobs"))
+BATCH_WORKERS = int(env("BATCH_WORKERS", "4"))
+BATCH_MAX_RETRIES = int(env("BATCH_MAX_RETRIES", "3"))
+SERPER_RATE_LIMIT = float(env("SERPER_RATE_LIMIT", "5"))
+LLM_RATE_LIMIT = float(env("LLM_RATE_LIMIT", "2"))
+
+# Answer company / news questions from the local source index when it already
+# covers them (can also be switched per request with "local_first")
+LOCAL_FIRST = env("LOCAL_FIRST", "0").lower() in ("1", "true", "yes")
+
+# Fetch a wide candidate set, rerank it locally (TF-IDF) and keep the best
+# sources that fit the context budget; RERANK=0 restores Serper's top 5
+RERANK = env("RERANK", "1").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = int(env("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(env("RERANK_TOP_K", "5"))
+CONTEXT_TOKEN_BUDGET = int(env("CONTEXT_TOKEN_BUDGET", "600"))
+SEARCH_CANDIDATES = RERANK_CANDIDATES if RERANK else 5
+
+# Token guardrails: prompts are tokenized locally (tiktoken TOKENIZER_ENCODING,
+# or a ~4 characters/token estimate when it can't be loaded). Each LLM call
+# gets LLM_TOKEN_BUDGET tokens: LLM_MAX_COMPLETION_TOKENS are kept for the
+# answer (sent as max_tokens) and the lowest-ranked sources are dropped until
+# the prompt fits in the rest
+TOKENIZER_ENCODING = env("TOKENIZER_ENCODING", "o200k_base")
+LLM_TOKEN_BUDGET = int(env("LLM_TOKEN_BUDGET", "2000"))
+LLM_MAX_COMPLETION_TOKENS = int(env("LLM_MAX_COMPLETION_TOKENS", "512"))
+PROMPT_TOKEN_BUDGET = max(LLM_TOKEN_BUDGET - LLM_MAX_COMPLETION_TOKENS, 1)
+
+# Opt-in query expansion: each lookup searches up to QUERY_VARIANTS targeted
+# variants (company site, LinkedIn profile, funding, leadership) in parallel
+# and fuses them with reciprocal-rank fusion. Every variant is a Serper call,
+# so a cold lookup costs QUERY_VARIANTS times the quota (1 = the single query)
+QUERY_VARIANTS = int(env("QUERY_VARIANTS", "1"))
+SEARCH_POOL_SIZE = int(env("SEARCH_POOL_SIZE", "32"))
+
+# Opt-in micro-batching: summaries requested within LLM_BATCH_WINDOW_MS of
+# each other share one multi-entity LLM call (0 = off)
+LLM_BATCH_WINDOW_MS = float(env("LLM_BATCH_WINDOW_MS", "0"))
+LLM_BATCH_MAX = int(env("LLM_BATCH_MAX", "8"))
+
+# Two-tier model routing: short, unambiguous contexts are summarized by the
+# OPENAI_SMALL_MODEL_NAME deployment, everything else (and any answer from it
+# that fails to parse) by OPENAI_MODEL_NAME. Unset = one model for everything
+OPENAI_SMALL_MODEL_NAME = env("OPENAI_SMALL_MODEL_NAME", "")
+ROUTER_MAX_SOURCES = int(env("ROUTER_MAX_SOURCES", "5"))
+ROUTER_MAX_CONTEXT_TOKENS = int(env("ROUTER_MAX_CONTEXT_TOKENS", "500"))
+ROUTER_LARGE_TOOLS = [t.strip() for t in env("ROUTER_LARGE_TOOLS", "lead").split(",") if t.strip()]
+
+# News watchlists: due accounts are checked every WATCHLIST_INTERVAL seconds (0 = manual runs only)
+WATCHLIST_PATH = env("WATCHLIST_PATH", os.path.join(BASE_DIR, ".cache", "watchlists.sqlite3"))
+WATCHLIST_INTERVAL = float(env("WATCHLIST_INTERVAL", str(60 * 60)))
+WATCHLIST_WORKERS = int(env("WATCHLIST_WORKERS", "4"))
+WATCHLIST_RESULTS = int(env("WATCHLIST_RESULTS", "10"))
+
+# Prewarm: once a day, in the off-peak window starting at PREWARM_AT (local
+# time), research every account in PREWARM_FILE (a CSV / JSON CRM export) as
+# a bulk job, so interactive lookups for them are answered from the result cache
+PREWARM_FILE = env("PREWARM_FILE", "")
+PREWARM_AT = env("PREWARM_AT", "05:30")
+PREWARM_WINDOW_HOURS = float(env("PREWARM_WINDOW_HOURS", "3"))
+PREWARM_WORKERS = int(env("PREWARM_WORKERS", "2"))
+PREWARM_DIR = env("PREWARM_DIR", os.path.join(BASE_DIR, ".cache", "prewarm"))
+
+# Stale-while-revalidate: answers of STALE_TOOLS are kept in the result cache;
+# past their freshness window (RESULT_TTL_*) they are still served, flagged
+# stale with their age, for up to RESULT_MAX_STALE seconds while one of
+# REVALIDATE_WORKERS threads refreshes them (at most REVALIDATE_QUEUE waiting)
+STALE_TOOLS = [t.strip() for t in env("STALE_TOOLS", "company,lead").split(",") if t.strip()]
+RESULT_MAX_STALE = float(env("RESULT_MAX_STALE", str(7 * 24 * 60 * 60)))
+REVALIDATE_WORKERS = int(env("REVALIDATE_WORKERS", "2"))
+REVALIDATE_QUEUE = int(env("REVALIDATE_QUEUE", "100"))
+
+# Cache housekeeping (background leader only): every CACHE_PURGE_INTERVAL
+# seconds, drop Serper / LLM entries that expired more than CACHE_STALE_GRACE
+# ago (until then they are the stale fallback while a provider is down),
+# result-cache answers past RESULT_MAX_STALE, and prune the source index
+CACHE_PURGE_INTERVAL = float(env("CACHE_PURGE_INTERVAL", str(60 * 60)))
+CACHE_STALE_GRACE = float(env("CACHE_STALE_GRACE", str(7 * 24 * 60 * 60)))
+
+# Priority scheduling: research calls hold one of SCHEDULER_CAPACITY slots
+# while they run. Reps (interactive), enrichment jobs (bulk) and prewarm /
+# revalidation / watchlists (background) each have a concurrency limit, and a
+# free slot goes to the waiting class furthest below its weighted fair share
+SCHEDULER_CAPACITY = int(env("SCHEDULER_CAPACITY", "32"))
+SCHEDULER_LIMITS = parse_limits(env("SCHEDULER_LIMITS", "interactive=32,bulk=4,background=2"))
+SCHEDULER_WEIGHTS = parse_limits(env("SCHEDULER_WEIGHTS", "interactive=8,bulk=2,background=1"))
+
+# Graceful shutdown: how long to wait for in-flight LLM calls. With several
+# worker processes, the one holding BACKGROUND_LOCK_PATH runs job resume and
+# the watchlist scheduler
+DRAIN_TIMEOUT = float(env("DRAIN_TIMEOUT", "25"))
+BACKGROUND_LOCK_PATH = env("BACKGROUND_LOCK_PATH", os.path.join(BASE_DIR, ".cache", "background.lock"))
 
 # =================================================
 # INITIALIZE FLASK APP
 # =================================================
+# Importing this module has no side effects; create_app() (wsgi.py, asgi.py,
+# `python app.py`) starts the background services
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
+lifecycle = Lifecycle()
+
 # =================================================
-# AZURE OPENAI LLM
+# REQUEST METRICS
 # =================================================
-llm = AzureChatOpenAI(
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_key=OPENAI_API_KEY,
-    api_version=OPENAI_API_VERSION,
-    deployment_name=OPENAI_MODEL_NAME,
-    temperature=0
-)
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def _reject_when_draining():
+    # A worker that is shutting down sends new requests back to the load balancer
+    if lifecycle.draining:
+        response = jsonify({"error": "Server is shutting down"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.endpoint or "unknown"
+    start = getattr(g, "request_start", None)
+    if start is not None:
+        metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, status=str(response.status_code))
+    metrics.observe("http_request_bytes", request.content_length or 0, buckets=SIZE_BUCKETS, endpoint=endpoint)
+    if not response.is_streamed:
+        metrics.observe("http_response_bytes", response.calculate_content_length() or 0, buckets=SIZE_BUCKETS, endpoint=endpoint)
+    return response
+
+def research_response(tool: str, result):
+    with metrics.timer("research_stage_seconds", tool=tool, stage="serialize"):
+        response = jsonify(result)
+    # Answers from the result cache say how old they are, like an HTTP cache would
+    freshness = result.get("freshness") if isinstance(result, dict) else None
+    if freshness:
+        response.headers["Age"] = str(int(freshness["age"]))
+    return response
 
 # =================================================
-# SERPER SEARCH FUNCTIONS
+# LLM CALLS (CACHED + COALESCED)
 # =================================================
-def serper_search(query: str, num_results: int = 5):
-    url = "https://google.serper.dev/search"
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {"q": query, "num": num_results}
+set_encoding(TOKENIZER_ENCODING)
 
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        # Debug logging: show status and small snippet when things go wrong
-        if response.status_code != 200:
-            print(f"Serper search non-200 status: {response.status_code}, body: {response.text[:500]}")
-            return []
+# Identical requests that arrive while one is already running wait for it
+research_flights = SingleFlight()
+research_flights_async = AsyncSingleFlight()
+
+router = ModelRouter(
+    OPENAI_MODEL_NAME,
+    OPENAI_SMALL_MODEL_NAME or None,
+    max_sources=ROUTER_MAX_SOURCES,
+    max_context_tokens=ROUTER_MAX_CONTEXT_TOKENS,
+    large_tools=ROUTER_LARGE_TOOLS
+)
+
+def record_llm_usage(tool: str, response, tier: str = LARGE, prompt: str = None, completion: str = None):
+    # usage_metadata is filled in by langchain for OpenAI-compatible responses;
+    # streamed answers usually come without it, so those are counted locally
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    elif prompt is not None:
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(completion or "")
+    else:
+        return
+    metrics.inc("llm_tokens_total", prompt_tokens, tool=tool, kind="prompt")
+    metrics.inc("llm_tokens_total", completion_tokens, tool=tool, kind="completion")
+    metrics.inc("llm_tier_tokens_total", prompt_tokens, tier=tier, kind="prompt")
+    metrics.inc("llm_tier_tokens_total", completion_tokens, tier=tier, kind="completion")
+    metrics.observe("llm_prompt_tokens", prompt_tokens, buckets=TOKEN_BUCKETS, tool=tool)
+    metrics.observe("llm_completion_tokens", completion_tokens, buckets=TOKEN_BUCKETS, tool=tool)
+
+def complete_lines(tool: str, raw: str, finish_reason: str = None):
+    # An answer cut off by max_tokens ends in half a line; keep only the complete ones
+    if finish_reason != "length":
+        return raw
+    metrics.inc("llm_truncated_total", tool=tool)
+    return raw.rsplit("\n", 1)[0] if "\n" in raw else ""
+
+def finish_reason(response):
+    return (getattr(response, "response_metadata", None) or {}).get("finish_reason")
+
+def completion_cap(prompt: str):
+    # max_tokens for the answer: its reserved share, less if the prompt ran over
+    # its budget (a single long source is always kept), but never under 64
+    return max(64, min(LLM_MAX_COMPLETION_TOKENS, LLM_TOKEN_BUDGET - count_tokens(prompt)))
+
+def cached_llm_response(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    cached = get_llm_cache().get(prompt, router.deployment(tier), tool=tool, query=query, sources=sources)
+    metrics.inc("cache_requests_total", cache="llm", result="miss" if cached is None else "hit")
+    return cached
+
+def stale_llm_response(prompt: str, error: Exception, tier: str = LARGE):
+    # Azure is throttling or down: reuse an expired completion for the same prompt if there is one
+    stale = get_llm_cache().get_stale(prompt, router.deployment(tier))
+    metrics.inc("cache_requests_total", cache="llm", result="stale" if stale is not None else "miss_stale")
+    if stale is None:
+        raise error
+    print(f"Serving stale LLM response ({error})")
+    return stale
+
+def completion_text(tool: str, tier: str, response):
+    # Usage and truncation for one finished (non-streamed) completion
+    record_llm_usage(tool, response, tier)
+    return complete_lines(tool, response.content, finish_reason(response)).strip()
+
+def request_completion(prompt: str, tool: str, tier: str = LARGE):
+    # One guarded, tracked completion; single calls and batch fallbacks both go through here
+    with lifecycle.track(), metrics.timer("llm_request_seconds", tool=tool), \
+            metrics.timer("llm_tier_seconds", tier=tier):
+        response = get_guard("llm").call(get_llm(router.deployment(tier)).invoke, prompt,
+                                         max_tokens=completion_cap(prompt))
+    return completion_text(tool, tier, response)
+
+def store_completion(prompt: str, tool: str, query: str, sources: list, tier: str, response):
+    # Usage, truncation and the cache write (blocking: SQLite, tokenizer)
+    raw = completion_text(tool, tier, response)
+    get_llm_cache().set(prompt, router.deployment(tier), raw, tool=tool, query=query, sources=sources)
+    return raw
+
+def store_streamed_completion(prompt: str, tool: str, query: str, sources: list, tier: str,
+                              usage_chunk, raw: str, reason: str):
+    record_llm_usage(tool, usage_chunk, tier, prompt, raw)
+    raw = complete_lines(tool, raw, reason).strip()
+    get_llm_cache().set(prompt, router.deployment(tier), raw, tool=tool, query=query, sources=sources)
+
+def invoke_llm(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    # temperature=0, so an identical (or near-identical) request gets the same answer
+    cached = cached_llm_response(prompt, tool, query, sources, tier)
+    if cached is not None:
+        return cached
+
+    deployment = router.deployment(tier)
 
+    def _call():
         try:
-            data = response.json()
+            raw = request_completion(prompt, tool, tier)
         except Exception as e:
-            print(f"Serper search JSON parse error: {e}, body: {response.text[:500]}")
-            return []
+            return stale_llm_response(prompt, e, tier)
+        get_llm_cache().set(prompt, deployment, raw, tool=tool, query=query, sources=sources)
+        return raw
 
-        results = []
+    return research_flights.do(("llm", prompt_key(prompt, deployment)), _call)
 
-        for item in data.get("organic", []):
-            results.append({
-                "title": item.get("title"),
-                "snippet": item.get("snippet"),
-                "link": item.get("link")
-            })
+async def invoke_llm_async(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    # Cache lookups and writes (SQLite, near-duplicate scan) and token counting
+    # run in a worker thread, never on the event loop
+    cached = await asyncio.to_thread(cached_llm_response, prompt, tool, query, sources, tier)
+    if cached is not None:
+        return cached
 
-        if not results:
-            print(f"Serper search returned no organic results for query '{query}' (response keys: {list(data.keys())})")
+    deployment = router.deployment(tier)
 
-        return results
-    except Exception as e:
-        print(f"Search error: {e}")
-        return []
-
-def serper_news_search(query: str, num_results: int = 5):
-    url = "https://google.serper.dev/news"
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {"q": query, "num": num_results}
+    async def _call():
+        max_tokens = await asyncio.to_thread(completion_cap, prompt)
+        try:
+            with lifecycle.track(), metrics.timer("llm_request_seconds", tool=tool), \
+                    metrics.timer("llm_tier_seconds", tier=tier):
+                response = await get_guard("llm").call_async(get_llm(deployment).ainvoke, prompt,
+                                                              max_tokens=max_tokens)
+        except Exception as e:
+            return await asyncio.to_thread(stale_llm_response, prompt, e, tier)
+        return await asyncio.to_thread(store_completion, prompt, tool, query, sources, tier, response)
 
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        # Debug logging: show status and small snippet when things go wrong
-        if response.status_code != 200:
-            print(f"Serper news non-200 status: {response.status_code}, body: {response.text[:500]}")
-            return []
+    return await research_flights_async.do(("llm", prompt_key(prompt, deployment)), _call)
+
+def run_llm_batch(items):
+    # items are (prompt, tool, tier); a batch only ever goes to one deployment
+    results = [None] * len(items)
+    tiers = {}
+    for index, (_, _, tier) in enumerate(items):
+        tiers.setdefault(tier, []).append(index)
 
+    for tier, indices in tiers.items():
         try:
-            data = response.json()
+            answers = run_llm_tier_batch(tier, [items[i][:2] for i in indices])
         except Exception as e:
-            print(f"Serper news JSON parse error: {e}, body: {response.text[:500]}")
-            return []
+            answers = [e] * len(indices)
+        for index, answer in zip(indices, answers):
+            results[index] = answer
+    return results
 
-        results = []
+def run_llm_tier_batch(tier: str, items):
+    # items are (prompt, tool) pairs; returns one completion (or exception) per item
+    llm = get_llm(router.deployment(tier))
+    prompts = [prompt for prompt, _ in items]
+    if len(items) == 1:
+        return [request_completion(prompts[0], items[0][1], tier)]
 
-        for item in data.get("news", []):
-            results.append({
-                "title": item.get("title"),
-                "snippet": item.get("snippet"),
-                "link": item.get("link"),
-                "date": item.get("date")
-            })
+    with lifecycle.track(), metrics.timer("llm_request_seconds", tool="batch"), \
+            metrics.timer("llm_tier_seconds", tier=tier):
+        # One answer per task, so the batch gets the sum of their completion caps
+        response = get_guard("llm").call(llm.invoke, build_batch_prompt(prompts),
+                                         max_tokens=sum(completion_cap(prompt) for prompt in prompts))
+    record_llm_usage("batch", response, tier)
+    metrics.observe("llm_batch_size", len(items), buckets=COUNT_BUCKETS)
 
-        if not results:
-            print(f"Serper news returned no news results for query '{query}' (response keys: {list(data.keys())})")
+    results = []
+    for (prompt, tool), answer in zip(items, split_batch_response(response.content, len(items))):
+        if answer is None:
+            # The model skipped this task; ask for it on its own
+            metrics.inc("llm_batch_fallbacks_total", tool=tool)
+            try:
+                answer = request_completion(prompt, tool, tier)
+            except Exception as e:
+                answer = e
+        results.append(answer)
+    return results
 
-        return results
+llm_batcher = MicroBatcher(run_llm_batch, window=LLM_BATCH_WINDOW_MS / 1000.0, max_batch=LLM_BATCH_MAX) \
+    if LLM_BATCH_WINDOW_MS > 0 else None
+
+def invoke_llm_batched(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    cached = cached_llm_response(prompt, tool, query, sources, tier)
+    if cached is not None:
+        return cached
+
+    deployment = router.deployment(tier)
+
+    def _call():
+        try:
+            # The batch runs in the batcher's threads, outside this caller's context:
+            # its provider budget (bulk jobs, watchlists) is charged here, one token per item
+            take_budget("llm")
+            raw = llm_batcher.submit((prompt, tool, tier)).result()
+        except Exception as e:
+            return stale_llm_response(prompt, e, tier)
+        get_llm_cache().set(prompt, deployment, raw, tool=tool, query=query, sources=sources)
+        return raw
+
+    return research_flights.do(("llm", prompt_key(prompt, deployment)), _call)
+
+async def invoke_llm_batched_async(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    cached = await asyncio.to_thread(cached_llm_response, prompt, tool, query, sources, tier)
+    if cached is not None:
+        return cached
+
+    deployment = router.deployment(tier)
+
+    async def _call():
+        try:
+            await take_budget_async("llm")
+            raw = await asyncio.wrap_future(llm_batcher.submit((prompt, tool, tier)))
+        except Exception as e:
+            return await asyncio.to_thread(stale_llm_response, prompt, e, tier)
+        await asyncio.to_thread(get_llm_cache().set, prompt, deployment, raw, tool=tool, query=query, sources=sources)
+        return raw
+
+    return await research_flights_async.do(("llm", prompt_key(prompt, deployment)), _call)
+
+def stream_llm_lines(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    # Yields the completion line by line as the model produces it
+    cached = cached_llm_response(prompt, tool, query, sources, tier)
+    if cached is not None:
+        yield from cached.split("\n")
+        return
+
+    # Streams of the same prompt share one completion, each getting every line
+    yield from research_flights.stream(("llm", prompt_key(prompt, router.deployment(tier))),
+                                       stream_llm_completion, prompt, tool, query, sources, tier)
+
+def stream_llm_completion(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    guard = get_guard("llm")
+    try:
+        guard.acquire()
+    except ProviderUnavailable as e:
+        yield from stale_llm_response(prompt, e, tier).split("\n")
+        return
+
+    chunks = []
+    buffer = ""
+    usage_chunk = reason = None
+    try:
+        with lifecycle.track():
+            for chunk in get_llm(router.deployment(tier)).stream(prompt, max_tokens=completion_cap(prompt)):
+                # The last chunks carry the finish reason and, when the endpoint reports it, the usage
+                usage_chunk = chunk if getattr(chunk, "usage_metadata", None) else usage_chunk
+                reason = finish_reason(chunk) or reason
+                text = chunk.content or ""
+                chunks.append(text)
+                buffer += text
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    yield line
     except Exception as e:
-        print(f"News search error: {e}")
-        return []
+        guard.record_error(e)
+        raise
+    guard.record()
+    # A line still in the buffer when max_tokens cut the answer off is incomplete
+    if buffer and reason != "length":
+        yield buffer
+
+    store_streamed_completion(prompt, tool, query, sources, tier, usage_chunk, "".join(chunks), reason)
+
+async def stream_llm_lines_async(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    cached = await asyncio.to_thread(cached_llm_response, prompt, tool, query, sources, tier)
+    if cached is not None:
+        for line in cached.split("\n"):
+            yield line
+        return
+
+    # Closed right away when the client goes, so a stream nobody reads any more stops
+    async with contextlib.aclosing(research_flights_async.stream(
+            ("llm", prompt_key(prompt, router.deployment(tier))),
+            stream_llm_completion_async, prompt, tool, query, sources, tier)) as lines:
+        async for line in lines:
+            yield line
+
+async def stream_llm_completion_async(prompt: str, tool: str, query: str, sources: list, tier: str = LARGE):
+    guard = get_guard("llm")
+    try:
+        await guard.acquire_async()
+    except ProviderUnavailable as e:
+        for line in (await asyncio.to_thread(stale_llm_response, prompt, e, tier)).split("\n"):
+            yield line
+        return
+
+    max_tokens = await asyncio.to_thread(completion_cap, prompt)
+    chunks = []
+    buffer = ""
+    usage_chunk = reason = None
+    try:
+        with lifecycle.track():
+            async for chunk in get_llm(router.deployment(tier)).astream(prompt, max_tokens=max_tokens):
+                # The last chunks carry the finish reason and, when the endpoint reports it, the usage
+                usage_chunk = chunk if getattr(chunk, "usage_metadata", None) else usage_chunk
+                reason = finish_reason(chunk) or reason
+                text = chunk.content or ""
+                chunks.append(text)
+                buffer += text
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    yield line
+    except Exception as e:
+        guard.record_error(e)
+        raise
+    guard.record()
+    # A line still in the buffer when max_tokens cut the answer off is incomplete
+    if buffer and reason != "length":
+        yield buffer
+
+    await asyncio.to_thread(store_streamed_completion, prompt, tool, query, sources, tier,
+                            usage_chunk, "".join(chunks), reason)
 
 # =================================================
 # HELPER FUNCTIONS
 # =================================================
-def build_context(results):
-    context = ""
-    for idx, r in enumerate(results, 1):
-        context += f"""
-SOURCE {idx}:
-Title: {r['title']}
-Snippet: {r['snippet']}
-URL: {r['link']}
-"""
-    return context.strip()
-
-def build_news_context(results):
-    context = ""
-    for idx, r in enumerate(results, 1):
-        context += f"""
-NEWS {idx}:
-Title: {r['title']}
-Snippet: {r['snippet']}
-Date: {r['date']}
-URL: {r['link']}
-"""
-    return context.strip()
+def research_result(points: list, sources: list):
+    # "summary" keeps the plain bullet list; "points" adds which sources each bullet cites
+    return {
+        "summary": [p["text"] for p in points] or ["No summary available"],
+        "sources": sources,
+        "points": points
+    }
+
+def empty_result(message: str):
+    return {"summary": [message], "sources": [], "points": []}
+
+def fit_prompt(tool: str, question: str, results: list, build):
+    """
+    (results, prompt) with the prompt built by `build(question, results)`
+    inside PROMPT_TOKEN_BUDGET: the lowest-ranked sources are dropped one at
+    a time until it fits. The best source is always kept.
+    """
+    kept = len(results)
+    prompt = build(question, results)
+    tokens = count_tokens(prompt)
+    while tokens > PROMPT_TOKEN_BUDGET and kept > 1:
+        kept -= 1
+        prompt = build(question, results[:kept])
+        tokens = count_tokens(prompt)
+
+    metrics.observe("prompt_tokens_local", tokens, buckets=TOKEN_BUCKETS, tool=tool)
+    if kept < len(results):
+        metrics.observe("prompt_sources_trimmed", len(results) - kept, buckets=COUNT_BUCKETS, tool=tool)
+    return results[:kept], prompt
+
+revalidator = Revalidator(REVALIDATE_WORKERS, REVALIDATE_QUEUE)
+
+scheduler = PriorityScheduler(
+    SCHEDULER_CAPACITY,
+    limits={name: int(limit) for name, limit in SCHEDULER_LIMITS.items()},
+    weights=SCHEDULER_WEIGHTS
+)
+
+def cached_research(tool: str, query: str):
+    # A stored answer (prewarmed, or an earlier lookup for STALE_TOOLS) skips
+    # search and LLM entirely; a stale one is served while it is refreshed
+    max_stale = RESULT_MAX_STALE if tool in STALE_TOOLS else 0
+    result = get_result_cache().get(tool, query, max_stale)
+    if result is None:
+        metrics.inc("cache_requests_total", cache="result", result="miss")
+        return None
+    if result["freshness"]["stale"]:
+        metrics.inc("cache_requests_total", cache="result", result="stale")
+        revalidate(tool, query)
+    else:
+        metrics.inc("cache_requests_total", cache="result", result="hit")
+    return result
+
+def revalidate(tool: str, query: str):
+    # research_functions is defined with the research tools below
+    if revalidator.submit(make_key(tool, query), research_functions[tool], query,
+                          refresh="revalidate", priority=BACKGROUND):
+        metrics.inc("result_revalidations_total", tool=tool)
+
+def store_research(tool: str, query: str, result: dict, origin: str):
+    # Empty and failed answers are not worth serving later
+    if result.get("points"):
+        get_result_cache().set(tool, query, result, origin=origin)
+
+def result_cached(tool: str):
+    """
+    Answer fn(query) from the result cache when it can (see cached_research).
+    refresh="<origin>" skips the cache and stores the new answer under that
+    origin; live answers of STALE_TOOLS are stored as well. Goes outside
+    @single_flight, so a stale hit never waits for a refresh in flight.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(query, *args, refresh: str = None, **kwargs):
+            if refresh is None:
+                cached = cached_research(tool, query)
+                if cached is not None:
+                    return cached
+            result = fn(query, *args, **kwargs)
+            if refresh or tool in STALE_TOOLS:
+                store_research(tool, query, result, refresh or "live")
+            return result
+        return wrapper
+    return decorator
+
+def result_cached_async(tool: str):
+    # Same as result_cached; the result cache (SQLite) is read and written off the event loop
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(query, *args, refresh: str = None, **kwargs):
+            if refresh is None:
+                cached = await asyncio.to_thread(cached_research, tool, query)
+                if cached is not None:
+                    return cached
+            result = await fn(query, *args, **kwargs)
+            if refresh or tool in STALE_TOOLS:
+                await asyncio.to_thread(store_research, tool, query, result, refresh or "live")
+            return result
+        return wrapper
+    return decorator
+
+def scheduled(fn):
+    """
+    Run fn in a scheduler slot of class priority=... (default interactive).
+    Goes inside @result_cached, so cached answers never queue, and outside
+    @single_flight, so a bulk lookup leading a flight can't hold up reps.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, priority: str = INTERACTIVE, **kwargs):
+        with scheduler.slot(priority):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def scheduled_async(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, priority: str = INTERACTIVE, **kwargs):
+        async with scheduler.slot_async(priority):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+def route_summary(tool: str, results: list):
+    tier, reason = router.route(tool, results)
+    metrics.inc("llm_route_total", tool=tool, tier=tier, reason=reason)
+    return tier
+
+def escalate(tool: str, reason: str):
+    # A small-model answer was unusable; the caller re-asks the large deployment
+    router.escalated(reason)
+    metrics.inc("llm_escalations_total", tool=tool, reason=reason)
+
+def summary_points(tool: str, query: str, prompt: str, sources: list, tier: str):
+    with metrics.timer("research_stage_seconds", tool=tool, stage="llm"):
+        raw = (invoke_llm_batched if llm_batcher else invoke_llm)(prompt, tool, query, sources, tier)
+    with metrics.timer("research_stage_seconds", tool=tool, stage="parse"):
+        return parse_points(raw, len(sources))
+
+async def summary_points_async(tool: str, query: str, prompt: str, sources: list, tier: str):
+    with metrics.timer("research_stage_seconds", tool=tool, stage="llm"):
+        raw = await (invoke_llm_batched_async if llm_batcher else invoke_llm_async)(prompt, tool, query, sources, tier)
+    with metrics.timer("research_stage_seconds", tool=tool, stage="parse"):
+        return parse_points(raw, len(sources))
+
+def summarize(tool: str, query: str, prompt: str, sources: list, results: list = ()):
+    # `results` (the ranked search results behind `prompt`) decide which model tier answers
+    tier = route_summary(tool, results)
+    try:
+        try:
+            points = summary_points(tool, query, prompt, sources, tier)
+            reason = router.needs_escalation(points, len(sources)) if tier == SMALL else None
+        except Exception as e:
+            if tier != SMALL:
+                raise
+            print(f"Small model error: {e}")
+            reason = "error"
+        if reason:
+            escalate(tool, reason)
+            points = summary_points(tool, query, prompt, sources, LARGE)
+        return research_result(points, sources)
+    except Exception as e:
+        metrics.inc("research_errors_total", tool=tool, stage="llm")
+        print(f"LLM error: {e}")
+        return {"summary": ["Error generating summary"], "sources": sources, "points": []}
+
+async def summarize_async(tool: str, query: str, prompt: str, sources: list, results: list = ()):
+    # Routing counts source tokens: CPU work, kept off the event loop
+    tier = await asyncio.to_thread(route_summary, tool, results)
+    try:
+        try:
+            points = await summary_points_async(tool, query, prompt, sources, tier)
+            reason = router.needs_escalation(points, len(sources)) if tier == SMALL else None
+        except Exception as e:
+            if tier != SMALL:
+                raise
+            print(f"Small model error: {e}")
+            reason = "error"
+        if reason:
+            escalate(tool, reason)
+            points = await summary_points_async(tool, query, prompt, sources, LARGE)
+        return research_result(points, sources)
+    except Exception as e:
+        metrics.inc("research_errors_total", tool=tool, stage="llm")
+        print(f"LLM error: {e}")
+        return {"summary": ["Error generating summary"], "sources": sources, "points": []}
 
 # =================================================
-# COMPANY RESEARCH
+# PROMPTS
 # =================================================
-def get_company_details(question: str):
-    search_results = serper_search(question)
-    
-    if not search_results:
-        return {"summary": ["No information found"], "sources": []}
-
+def company_prompt(question: str, search_results: list):
     context = build_context(search_results)
 
-    prompt = f"""
+    return f"""
 You are given web search results about a company.
 
 Create a concise summary using ONLY the information below.
@@ -172,43 +702,13 @@ Search Results:
 
 Question: {question}
 
-Respond with each point on a new line.
-Do NOT number the points.
+{OUTPUT_INSTRUCTIONS}
 """
 
-    try:
-        response = llm.invoke(prompt)
-        raw = response.content.strip()
-        
-        points = [
-            line.strip("-• ").strip()
-            for line in raw.split("\n")
-            if line.strip() and not line.strip().startswith("Question:")
-        ]
-        
-        return {
-            "summary": points[:5] if points else ["No summary available"],
-            "sources": [r["link"] for r in search_results]
-        }
-    except Exception as e:
-        print(f"LLM error: {e}")
-        return {
-            "summary": ["Error generating summary"],
-            "sources": [r["link"] for r in search_results]
-        }
-
-# =================================================
-# NEWS RESEARCH
-# =================================================
-def get_tech_news(question: str):
-    news_results = serper_news_search(question)
-    
-    if not news_results:
-        return {"summary": ["No news found"], "sources": []}
-
-    context = build_news_context(news_results)
+def news_prompt(question: str, news_results: list):
+    context = build_context(news_results, label="NEWS")
 
-    prompt = f"""
+    return f"""
 You are given recent news articles.
 
 Summarize the key trends and developments using ONLY the information below.
@@ -221,48 +721,13 @@ News Data:
 
 Question: {question}
 
-Respond with each point on a new line.
-Do NOT number the points.
+{OUTPUT_INSTRUCTIONS}
 """
 
-    try:
-        response = llm.invoke(prompt)
-        raw = response.content.strip()
-        
-        points = [
-            line.strip("-• ").strip()
-            for line in raw.split("\n")
-            if line.strip() and not line.strip().startswith("Question:")
-        ]
-        
-        return {
-            "summary": points[:5] if points else ["No summary available"],
-            "sources": [n["link"] for n in news_results]
-        }
-    except Exception as e:
-        print(f"LLM error: {e}")
-        return {
-            "summary": ["Error generating summary"],
-            "sources": [n["link"] for n in news_results]
-        }
-
-# =================================================
-# LEAD RESEARCH
-# =================================================
-def get_lead_info(query: str):
-    if "@" in query:
-        search_query = f"{query} professional profile"
-    else:
-        search_query = f"{query} profile CEO founder"
-
-    results = serper_search(search_query)
-    
-    if not results:
-        return {"summary": ["No information found"], "sources": []}
-
+def lead_prompt(query: str, results: list):
     context = build_context(results)
 
-    prompt = f"""
+    return f"""
 You are given public web information about a person.
 
 Create a concise lead profile using ONLY the information below.
@@ -275,30 +740,690 @@ Data:
 
 Question: {query}
 
-Respond with each point on a new line.
-Do NOT number the points.
+{OUTPUT_INSTRUCTIONS}
 """
 
+def research_plan(tool: str, query: str):
+    # How each research tool searches and prompts, for code paths that handle all three
+    if tool == "news":
+        return {"question": query, "endpoint": "news", "prompt": news_prompt, "empty": "No news found"}
+    if tool == "lead":
+        return {"question": query, "endpoint": "search", "prompt": lead_prompt, "empty": "No information found"}
+    return {"question": query, "endpoint": "search", "prompt": company_prompt, "empty": "No information found"}
+
+# Variant searches only call Serper (never back into this pool), so they can't deadlock callers
+search_pool = ThreadPoolExecutor(max_workers=SEARCH_POOL_SIZE, thread_name_prefix="search")
+
+def fuse_variants(tool: str, result_lists: list):
+    fused = reciprocal_rank_fusion(result_lists)
+    metrics.observe("query_variants_overlap", sum(len(results) for results in result_lists) - len(fused),
+                    buckets=COUNT_BUCKETS, tool=tool)
+    return fused[:SEARCH_CANDIDATES]
+
+def expanded_search(tool: str, endpoint: str, query: str):
+    # All variants at once over the pooled session, merged into one ranked list
+    search = serper_news_search if endpoint == "news" else serper_search
+    queries = expand_query(tool, query, QUERY_VARIANTS)
+    if len(queries) == 1:
+        return search(queries[0], SEARCH_CANDIDATES, tool=tool)
+    # Each variant runs in the caller's context (a bulk job's provider budget goes along)
+    contexts = [contextvars.copy_context() for _ in queries]
+    result_lists = list(search_pool.map(lambda ctx, q: ctx.run(search, q, SEARCH_CANDIDATES, tool=tool),
+                                        contexts, queries))
+    return fuse_variants(tool, result_lists)
+
+async def expanded_search_async(tool: str, endpoint: str, query: str):
+    search = serper_news_search_async if endpoint == "news" else serper_search_async
+    queries = expand_query(tool, query, QUERY_VARIANTS)
+    if len(queries) == 1:
+        return await search(queries[0], SEARCH_CANDIDATES, tool=tool)
+    result_lists = await asyncio.gather(*(search(q, SEARCH_CANDIDATES, tool=tool) for q in queries))
+    return fuse_variants(tool, result_lists)
+
+def local_results(tool: str, endpoint: str, query: str, local_first: bool = None):
+    # Local-first mode: well-covered queries are answered from indexed sources without Serper
+    if not (LOCAL_FIRST if local_first is None else local_first):
+        return None
+    results = get_source_index().lookup(endpoint, query, SEARCH_CANDIDATES)
+    metrics.inc("cache_requests_total", cache="source_index", result="miss" if results is None else "hit")
+    return results
+
+def rank_sources(tool: str, question: str, results: list):
+    # Best, non-duplicate sources first, trimmed to the context token budget
+    if not RERANK or not results:
+        return results
+    with metrics.timer("research_stage_seconds", tool=tool, stage="rerank"):
+        selected = rerank(question, results, top_k=RERANK_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET)
+    metrics.observe("rerank_dropped", len(results) - len(selected), buckets=COUNT_BUCKETS, tool=tool)
+    return selected
+
+# =================================================
+# COMPANY RESEARCH
+# =================================================
+@result_cached("company")
+@scheduled
+@single_flight(research_flights, "company")
+def get_company_details(question: str, local_first: bool = None):
+    with metrics.timer("research_stage_seconds", tool="company", stage="search"):
+        search_results = local_results("company", "search", question, local_first) \
+            or expanded_search("company", "search", question)
+    search_results = rank_sources("company", question, search_results)
+
+    if not search_results:
+        return empty_result("No information found")
+
+    with metrics.timer("research_stage_seconds", tool="company", stage="prompt"):
+        search_results, prompt = fit_prompt("company", question, search_results, company_prompt)
+    return summarize("company", question, prompt, [r.link for r in search_results], search_results)
+
+@result_cached_async("company")
+@scheduled_async
+@single_flight_async(research_flights_async, "company")
+async def get_company_details_async(question: str, local_first: bool = None):
+    with metrics.timer("research_stage_seconds", tool="company", stage="search"):
+        search_results = await asyncio.to_thread(local_results, "company", "search", question, local_first) \
+            or await expanded_search_async("company", "search", question)
+    # Reranking (embeddings) and prompt fitting (tokenizer) run in a worker thread
+    search_results = await asyncio.to_thread(rank_sources, "company", question, search_results)
+
+    if not search_results:
+        return empty_result("No information found")
+
+    with metrics.timer("research_stage_seconds", tool="company", stage="prompt"):
+        search_results, prompt = await asyncio.to_thread(fit_prompt, "company", question, search_results, company_prompt)
+    return await summarize_async("company", question, prompt, [r.link for r in search_results], search_results)
+
+# =================================================
+# NEWS RESEARCH
+# =================================================
+@result_cached("news")
+@scheduled
+@single_flight(research_flights, "news")
+def get_tech_news(question: str, local_first: bool = None):
+    with metrics.timer("research_stage_seconds", tool="news", stage="search"):
+        news_results = local_results("news", "news", question, local_first) \
+            or expanded_search("news", "news", question)
+    news_results = rank_sources("news", question, news_results)
+
+    if not news_results:
+        return empty_result("No news found")
+
+    with metrics.timer("research_stage_seconds", tool="news", stage="prompt"):
+        news_results, prompt = fit_prompt("news", question, news_results, news_prompt)
+    return summarize("news", question, prompt, [n.link for n in news_results], news_results)
+
+@result_cached_async("news")
+@scheduled_async
+@single_flight_async(research_flights_async, "news")
+async def get_tech_news_async(question: str, local_first: bool = None):
+    with metrics.timer("research_stage_seconds", tool="news", stage="search"):
+        news_results = await asyncio.to_thread(local_results, "news", "news", question, local_first) \
+            or await expanded_search_async("news", "news", question)
+    # Reranking (embeddings) and prompt fitting (tokenizer) run in a worker thread
+    news_results = await asyncio.to_thread(rank_sources, "news", question, news_results)
+
+    if not news_results:
+        return empty_result("No news found")
+
+    with metrics.timer("research_stage_seconds", tool="news", stage="prompt"):
+        news_results, prompt = await asyncio.to_thread(fit_prompt, "news", question, news_results, news_prompt)
+    return await summarize_async("news", question, prompt, [n.link for n in news_results], news_results)
+
+# =================================================
+# LEAD RESEARCH
+# =================================================
+@result_cached("lead")
+@scheduled
+@single_flight(research_flights, "lead")
+def get_lead_info(query: str):
+    with metrics.timer("research_stage_seconds", tool="lead", stage="search"):
+        results = expanded_search("lead", "search", query)
+    results = rank_sources("lead", query, results)
+
+    if not results:
+        return empty_result("No information found")
+
+    with metrics.timer("research_stage_seconds", tool="lead", stage="prompt"):
+        results, prompt = fit_prompt("lead", query, results, lead_prompt)
+    return summarize("lead", query, prompt, [r.link for r in results], results)
+
+@result_cached_async("lead")
+@scheduled_async
+@single_flight_async(research_flights_async, "lead")
+async def get_lead_info_async(query: str):
+    with metrics.timer("research_stage_seconds", tool="lead", stage="search"):
+        results = await expanded_search_async("lead", "search", query)
+    results = await asyncio.to_thread(rank_sources, "lead", query, results)
+
+    if not results:
+        return empty_result("No information found")
+
+    with metrics.timer("research_stage_seconds", tool="lead", stage="prompt"):
+        results, prompt = await asyncio.to_thread(fit_prompt, "lead", query, results, lead_prompt)
+    return await summarize_async("lead", query, prompt, [r.link for r in results], results)
+
+# Sync entry points per tool (bulk jobs, background refreshes)
+research_functions = {
+    "company": get_company_details,
+    "news": get_tech_news,
+    "lead": get_lead_info,
+}
+
+# =================================================
+# ACCOUNT BRIEF (COMPANY + NEWS + LEAD IN PARALLEL)
+# =================================================
+research_pool = ThreadPoolExecutor(max_workers=RESEARCH_POOL_SIZE, thread_name_prefix="research")
+
+def brief_plan(company: str, person: str = ""):
+    plan = {
+        "company": research_plan("company", company),
+        "news": research_plan("news", company),
+    }
+    if person:
+        plan["lead"] = research_plan("lead", f"{person} {company}".strip())
+    return plan
+
+def merge_brief(company: str, person: str, sections: dict):
+    # Every link is listed once at the top level; sections point at it by index
+    sources = []
+    positions = {}
+    merged = {}
+
+    for name, result in sections.items():
+        refs = []
+        for link in result["sources"]:
+            key = canonical_url(link)
+            if key not in positions:
+                positions[key] = len(sources)
+                sources.append(link)
+            if positions[key] not in refs:
+                refs.append(positions[key])
+        # Section-local citation indices -> top-level source indices
+        local = [positions[canonical_url(link)] for link in result["sources"]]
+        points = [{"text": p["text"], "sources": [local[i] for i in p["sources"] if i < len(local)]}
+                  for p in result.get("points", [])]
+        merged[name] = {"summary": result["summary"], "sources": refs, "points": points}
+        if "freshness" in result:
+            merged[name]["freshness"] = result["freshness"]
+
+    return {
+        "company": company,
+        "person": person or None,
+        "sections": merged,
+        "sources": sources
+    }
+
+def section_prompts(plan: dict, results: dict):
+    # {section: (ranked results, prompt)} for the sections that found anything
+    prompts = {}
+    for name, found in results.items():
+        step = plan[name]
+        ranked = rank_sources(name, step["question"], found)
+        if ranked:
+            prompts[name] = fit_prompt(name, step["question"], ranked, step["prompt"])
+    return prompts
+
+def research_brief_sections(plan: dict, pending: dict):
+    # Stage 1: all Serper searches at once
+    searches = {}
+    for name, step in pending.items():
+        searches[name] = research_pool.submit(expanded_search, name, step["endpoint"], step["question"])
+    prompts = section_prompts(plan, {name: future.result() for name, future in searches.items()})
+
+    # Stage 2: all summaries at once
+    summaries = {}
+    for name, (results, prompt) in prompts.items():
+        summaries[name] = research_pool.submit(summarize, name, plan[name]["question"], prompt,
+                                               [r.link for r in results], results)
+    return {name: future.result() for name, future in summaries.items()}
+
+def cached_sections(plan: dict):
+    return {name: cached_research(name, step["question"]) for name, step in plan.items()}
+
+def store_sections(plan: dict, summaries: dict):
+    for name, result in summaries.items():
+        if name in STALE_TOOLS:
+            store_research(name, plan[name]["question"], result, "live")
+
+def get_account_brief(company: str, person: str = ""):
+    plan = brief_plan(company, person)
+    cached = cached_sections(plan)
+    pending = {name: step for name, step in plan.items() if cached[name] is None}
+
+    summaries = {}
+    if pending:
+        # The uncached sections are researched in one interactive scheduler slot
+        with scheduler.slot(INTERACTIVE):
+            summaries = research_brief_sections(plan, pending)
+        store_sections(plan, summaries)
+
+    sections = {}
+    for name in plan:
+        if cached[name] is not None:
+            sections[name] = cached[name]
+        elif name in summaries:
+            sections[name] = summaries[name]
+        else:
+            sections[name] = empty_result(plan[name]["empty"])
+
+    return merge_brief(company, person, sections)
+
+async def research_brief_sections_async(plan: dict, names: list):
+    # Stage 1: all Serper searches at once
+    searches = []
+    for name in names:
+        searches.append(expanded_search_async(name, plan[name]["endpoint"], plan[name]["question"]))
+    results = dict(zip(names, await asyncio.gather(*searches)))
+    # Reranking and prompt fitting for every section in one worker-thread hop
+    prompts = await asyncio.to_thread(section_prompts, plan, results)
+
+    # Stage 2: all summaries at once
+    summaries = []
+    for name, (results, prompt) in prompts.items():
+        summaries.append(summarize_async(name, plan[name]["question"], prompt, [r.link for r in results], results))
+    return dict(zip(prompts, await asyncio.gather(*summaries)))
+
+async def get_account_brief_async(company: str, person: str = ""):
+    plan = brief_plan(company, person)
+    cached = await asyncio.to_thread(cached_sections, plan)
+    names = [name for name in plan if cached[name] is None]
+
+    summaries = {}
+    if names:
+        async with scheduler.slot_async(INTERACTIVE):
+            summaries = await research_brief_sections_async(plan, names)
+        await asyncio.to_thread(store_sections, plan, summaries)
+
+    sections = {}
+    for name in plan:
+        if cached[name] is not None:
+            sections[name] = cached[name]
+        elif name in summaries:
+            sections[name] = summaries[name]
+        else:
+            sections[name] = empty_result(plan[name]["empty"])
+
+    return merge_brief(company, person, sections)
+
+# =================================================
+# STREAMING RESEARCH (SERVER-SENT EVENTS)
+# =================================================
+# Event order: "sources" as soon as Serper returns, one "point" per bullet
+# as the LLM writes it, then "done" with the full result (or "error").
+def sse_event(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def cached_events(result: dict):
+    # A stored answer replays the same event sequence, just without the waiting
+    yield sse_event("sources", {"sources": result["sources"]})
+    for point in result["points"]:
+        yield sse_event("point", point)
+    yield sse_event("done", result)
+
+def stream_research(tool: str, query: str):
+    cached = cached_research(tool, query)
+    if cached is not None:
+        yield from cached_events(cached)
+        return
+
+    # The slot is held until the last event (or the client disconnects)
+    with scheduler.slot(INTERACTIVE):
+        yield from live_events(tool, query)
+
+def live_events(tool: str, query: str):
+    step = research_plan(tool, query)
+    with metrics.timer("research_stage_seconds", tool=tool, stage="search"):
+        results = expanded_search(tool, step["endpoint"], query)
+    results = rank_sources(tool, step["question"], results)
+    if results:
+        # Trimmed before "sources" goes out, so citations match what the model sees
+        results, prompt = fit_prompt(tool, step["question"], results, step["prompt"])
+    sources = [r.link for r in results]
+
+    yield sse_event("sources", {"sources": sources})
+
+    if not results:
+        yield sse_event("point", {"text": step["empty"], "sources": []})
+        yield sse_event("done", empty_result(step["empty"]))
+        return
+
+    tier = route_summary(tool, results)
+    points = []
     try:
-        response = llm.invoke(prompt)
-        raw = response.content.strip()
-        
-        points = [
-            line.strip("-• ").strip()
-            for line in raw.split("\n")
-            if line.strip() and not line.strip().startswith("Question:")
-        ]
-        
-        return {
-            "summary": points[:5] if points else ["No summary available"],
-            "sources": [r["link"] for r in results]
-        }
+        for line in stream_llm_lines(prompt, tool, step["question"], sources, tier):
+            point = parse_point(line, len(sources))
+            # Keep draining after MAX_POINTS so the full completion still gets cached
+            if point and len(points) < MAX_POINTS:
+                points.append(point)
+                yield sse_event("point", point)
+        if tier == SMALL and not points:
+            # Nothing usable came out of the small model: answer with the large one
+            escalate(tool, "parse_failure")
+            points = parse_points(invoke_llm(prompt, tool, step["question"], sources, LARGE), len(sources))
+            for point in points:
+                yield sse_event("point", point)
     except Exception as e:
+        metrics.inc("research_errors_total", tool=tool, stage="llm")
         print(f"LLM error: {e}")
-        return {
-            "summary": ["Error generating summary"],
-            "sources": [r["link"] for r in results]
+        yield sse_event("error", {"error": "Error generating summary"})
+        if not points:
+            yield sse_event("done", {"summary": ["Error generating summary"], "sources": sources, "points": []})
+            return
+        # The points already sent, but a cut-off answer is never cached as fresh
+        yield sse_event("done", research_result(points, sources))
+        return
+
+    result = research_result(points, sources)
+    if tool in STALE_TOOLS:
+        store_research(tool, query, result, "live")
+    yield sse_event("done", result)
+
+async def stream_research_async(tool: str, query: str):
+    cached = await asyncio.to_thread(cached_research, tool, query)
+    if cached is not None:
+        for event in cached_events(cached):
+            yield event
+        return
+
+    async with scheduler.slot_async(INTERACTIVE):
+        async for event in live_events_async(tool, query):
+            yield event
+
+async def live_events_async(tool: str, query: str):
+    step = research_plan(tool, query)
+    with metrics.timer("research_stage_seconds", tool=tool, stage="search"):
+        results = await expanded_search_async(tool, step["endpoint"], query)
+    # Reranking and prompt fitting are CPU work, done in a worker thread
+    prompts = await asyncio.to_thread(section_prompts, {tool: step}, {tool: results})
+    results, prompt = prompts.get(tool, ([], None))
+    sources = [r.link for r in results]
+
+    yield sse_event("sources", {"sources": sources})
+
+    if not results:
+        yield sse_event("point", {"text": step["empty"], "sources": []})
+        yield sse_event("done", empty_result(step["empty"]))
+        return
+
+    tier = await asyncio.to_thread(route_summary, tool, results)
+    points = []
+    try:
+        async for line in stream_llm_lines_async(prompt, tool, step["question"], sources, tier):
+            point = parse_point(line, len(sources))
+            if point and len(points) < MAX_POINTS:
+                points.append(point)
+                yield sse_event("point", point)
+        if tier == SMALL and not points:
+            escalate(tool, "parse_failure")
+            points = parse_points(await invoke_llm_async(prompt, tool, step["question"], sources, LARGE), len(sources))
+            for point in points:
+                yield sse_event("point", point)
+    except Exception as e:
+        metrics.inc("research_errors_total", tool=tool, stage="llm")
+        print(f"LLM error: {e}")
+        yield sse_event("error", {"error": "Error generating summary"})
+        if not points:
+            yield sse_event("done", {"summary": ["Error generating summary"], "sources": sources, "points": []})
+            return
+        # The points already sent, but a cut-off answer is never cached as fresh
+        yield sse_event("done", research_result(points, sources))
+        return
+
+    result = research_result(points, sources)
+    if tool in STALE_TOOLS:
+        await asyncio.to_thread(store_research, tool, query, result, "live")
+    yield sse_event("done", result)
+
+# =================================================
+# BULK ENRICHMENT JOBS
+# =================================================
+# Bulk jobs' share of each provider (shared by enrichment and prewarm jobs),
+# taken per real Serper / LLM call and split between the worker processes;
+# the shared guards from get_guard() still apply on top
+bulk_limiters = {
+    "serper": TokenBucket(SERPER_RATE_LIMIT / worker_processes()),
+    "llm": TokenBucket(LLM_RATE_LIMIT / worker_processes()),
+}
+
+job_manager = JobManager(
+    BATCH_JOBS_DIR,
+    research={tool: functools.partial(research, priority=BULK) for tool, research in research_functions.items()},
+    workers=BATCH_WORKERS,
+    limiters=bulk_limiters,
+    max_retries=BATCH_MAX_RETRIES
+)
+
+# =================================================
+# PREWARM (OFF-PEAK CACHE WARMING FOR CRM TARGETS)
+# =================================================
+prewarm_jobs = JobManager(
+    os.path.join(PREWARM_DIR, "jobs"),
+    # Always researched again (never answered from the cache): this is what keeps it fresh
+    research={tool: functools.partial(research, refresh="prewarm", priority=BACKGROUND)
+              for tool, research in research_functions.items()},
+    workers=PREWARM_WORKERS,
+    limiters=bulk_limiters,
+    max_retries=BATCH_MAX_RETRIES
+)
+
+prewarmer = PrewarmScheduler(
+    PREWARM_FILE or None,
+    submit=prewarm_jobs.submit,
+    at=PREWARM_AT,
+    window_hours=PREWARM_WINDOW_HOURS,
+    state_path=os.path.join(PREWARM_DIR, "state.json")
+)
+
+# =================================================
+# NEWS WATCHLISTS (DELTA-ONLY DIGESTS)
+# =================================================
+def fetch_watch_news(account: str):
+    with scheduler.slot(BACKGROUND):
+        return serper_news_search(account, WATCHLIST_RESULTS, tool="watchlist")
+
+def summarize_watch_delta(account: str, articles: list):
+    # Only the articles that are new since the last run reach the LLM
+    metrics.observe("watchlist_new_articles", len(articles), buckets=COUNT_BUCKETS)
+    articles, prompt = fit_prompt("news", account, articles, news_prompt)
+    # No query: a delta is only ever reused for the exact same prompt, never
+    # answered from (or served as) a near-duplicate of a full news lookup
+    with scheduler.slot(BACKGROUND):
+        return summarize("news", "", prompt, [a.link for a in articles], articles)
+
+watchlists = WatchlistManager(
+    WATCHLIST_PATH or None,
+    fetch=fetch_watch_news,
+    summarize=summarize_watch_delta,
+    interval=WATCHLIST_INTERVAL,
+    workers=WATCHLIST_WORKERS
+)
+
+# =================================================
+# BACKGROUND SERVICES + GRACEFUL SHUTDOWN
+# =================================================
+leader = LeaderLock(BACKGROUND_LOCK_PATH)
+_background_stop = threading.Event()
+_background_started = False
+
+def purge_caches():
+    removed = {}
+    for name, purge in (("serper", lambda: get_search_cache().purge_expired(CACHE_STALE_GRACE)),
+                        ("llm", lambda: get_llm_cache().purge_expired(CACHE_STALE_GRACE)),
+                        ("result", lambda: get_result_cache().purge_expired(RESULT_MAX_STALE)),
+                        ("source_index", lambda: get_source_index().prune())):
+        try:
+            removed[name] = purge()
+        except Exception as e:
+            print(f"Cache purge error ({name}): {e}")
+            continue
+        metrics.inc("cache_purged_total", removed[name], cache=name)
+    if any(removed.values()):
+        print(f"Purged cache entries: {removed}")
+    return removed
+
+def run_cache_purges(stop: threading.Event):
+    # Right away (catching up after downtime), then every CACHE_PURGE_INTERVAL until draining
+    while True:
+        purge_caches()
+        if stop.wait(CACHE_PURGE_INTERVAL):
+            return
+
+def start_background_services():
+    # Once per process; with several workers only the leader resumes jobs and runs the schedulers
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+
+    def _start():
+        # Pick up jobs that were interrupted by a crash or restart
+        job_manager.resume()
+        prewarm_jobs.resume()
+        watchlists.start()
+        prewarmer.start()
+        if CACHE_PURGE_INTERVAL > 0:
+            threading.Thread(target=run_cache_purges, args=(_background_stop,), name="cache-purge",
+                             daemon=True).start()
+
+    leader.run_when_acquired(_start, _background_stop)
+
+# Stop taking background work as soon as draining starts...
+lifecycle.on_drain(_background_stop.set)
+lifecycle.on_drain(lambda: watchlists.stop(wait=False))
+lifecycle.on_drain(lambda: job_manager.shutdown(wait=False))
+lifecycle.on_drain(prewarmer.stop)
+lifecycle.on_drain(lambda: prewarm_jobs.shutdown(wait=False))
+lifecycle.on_drain(lambda: revalidator.shutdown(wait=False))
+# ...then, once in-flight LLM calls are done, wait for the pools (runs newest first)
+if llm_batcher is not None:
+    lifecycle.on_shutdown(llm_batcher.close)
+lifecycle.on_shutdown(lambda: search_pool.shutdown(wait=True))
+lifecycle.on_shutdown(lambda: research_pool.shutdown(wait=True))
+lifecycle.on_shutdown(lambda: revalidator.shutdown(wait=True))
+lifecycle.on_shutdown(lambda: job_manager.shutdown(wait=True))
+lifecycle.on_shutdown(lambda: prewarm_jobs.shutdown(wait=True))
+lifecycle.on_shutdown(lambda: watchlists.stop(wait=True))
+
+def shutdown(timeout: float = None):
+    """Graceful stop: reject new requests, drain in-flight LLM calls, close the pools."""
+    return lifecycle.shutdown(DRAIN_TIMEOUT if timeout is None else timeout)
+
+def drain_on_sigterm():
+    """
+    Start draining as soon as SIGTERM arrives, then hand the signal to the
+    server's own handler. gunicorn and uvicorn only run shutdown() once their
+    requests are done, which is too late to send new ones back with 503.
+    Call after the server has set up its signals; off the main thread (an
+    embedded or threaded server) signals can't be handled, so it does nothing.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def _handle(signum, frame):
+        # Drain hooks take locks; keep them out of the signal handler
+        threading.Thread(target=lifecycle.drain, name="drain", daemon=True).start()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
+
+    signal.signal(signal.SIGTERM, _handle)
+
+def create_app():
+    """The Flask app with its background services running (gunicorn: wsgi:app)."""
+    start_background_services()
+    return app
+
+def render_metrics():
+    # Cache and in-flight gauges are read at scrape time
+    caches = (("serper", get_search_cache()), ("llm", get_llm_cache()), ("source_index", get_source_index()),
+              ("result", get_result_cache()))
+    for name, cache in caches:
+        for key, value in cache.stats().items():
+            if isinstance(value, (int, float)):
+                metrics.set("cache_stat", value, cache=name, stat=key)
+    metrics.set("singleflight_in_flight", research_flights.stats()["in_flight"] + serper_flights.stats()["in_flight"],
+                mode="sync")
+    metrics.set("singleflight_in_flight",
+                research_flights_async.stats()["in_flight"] + serper_flights_async.stats()["in_flight"], mode="async")
+    for priority, stats in scheduler.stats()["classes"].items():
+        metrics.set("scheduler_queue_depth", stats["queued"], priority=priority)
+        metrics.set("scheduler_active", stats["active"], priority=priority)
+    for name, stats in guard_stats().items():
+        provider, key = name.split(":", 1)
+        metrics.set("provider_rate_limit", stats["rate"], provider=provider, key=key)
+        metrics.set("provider_breaker_open", 0 if stats["state"] == "closed" else 1, provider=provider, key=key)
+    return metrics.render()
+
+def json_body(text: str):
+    # Like request.get_json(silent=True): anything that isn't a JSON object counts as empty
+    try:
+        data = json.loads(text) if text else {}
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def parse_job_items(content_type: str, text: str):
+    # Accepts a CSV upload (columns: tool, query) or JSON:
+    #   {"items": [{"tool": "company", "query": "..."}]}
+    #   {"tool": "lead", "queries": ["...", "..."]}
+    if (content_type or "").startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        return [{"tool": row.get("tool", ""), "query": row.get("query", "")} for row in reader]
+
+    data = json_body(text)
+    if "items" in data:
+        return data["items"]
+    return [{"tool": data.get("tool", ""), "query": q} for q in data.get("queries", [])]
+
+def parse_prewarm_targets(content_type: str, text: str):
+    # Same CRM formats as PREWARM_FILE (CSV upload or JSON {"accounts": [...]});
+    # an empty body means "everything in PREWARM_FILE"
+    if (content_type or "").startswith("text/csv"):
+        return target_items(csv.DictReader(io.StringIO(text)))
+
+    data = json_body(text)
+    if "items" in data:
+        return target_items(data["items"])
+    if "accounts" in data:
+        return target_items(data["accounts"])
+    return None
+
+def prewarm_snapshot():
+    schedule = prewarmer.stats()
+    job = prewarm_jobs.status(schedule["job_id"]) if schedule.get("job_id") else None
+    return {"schedule": schedule, "job": job}
+
+def cache_stats_snapshot():
+    return {
+        "serper": get_search_cache().stats(),
+        "llm": get_llm_cache().stats(),
+        "source_index": get_source_index().stats(),
+        "result": get_result_cache().stats(),
+        "revalidation": revalidator.stats(),
+        "prewarm": prewarmer.stats(),
+        "scheduler": scheduler.stats(),
+        "singleflight": research_flights.stats(),
+        "singleflight_async": research_flights_async.stats(),
+        "singleflight_serper": serper_flights.stats(),
+        "singleflight_serper_async": serper_flights_async.stats(),
+        "providers": guard_stats(),
+        "llm_batch": llm_batcher.stats() if llm_batcher else None,
+        "router": router.stats(),
+        "tokens": {
+            "tokenizer": tokenizer_name(),
+            "budget": LLM_TOKEN_BUDGET,
+            "prompt_budget": PROMPT_TOKEN_BUDGET,
+            "max_completion_tokens": LLM_MAX_COMPLETION_TOKENS
         }
+    }
+
+# 1x1 transparent PNG, served when there is no favicon in static/
+PLACEHOLDER_ICON = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8Xw8AAn8B9jYwWwAAAABJRU5ErkJggg=='
+)
 
 # =================================================
 # FLASK ROUTES
@@ -322,8 +1447,8 @@ def company_endpoint():
         if not query:
             return jsonify({"error": "Query is required"}), 400
         
-        result = get_company_details(query)
-        return jsonify(result)
+        result = get_company_details(query, local_first=data.get('local_first'))
+        return research_response("company", result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -336,8 +1461,8 @@ def news_endpoint():
         if not query:
             return jsonify({"error": "Query is required"}), 400
         
-        result = get_tech_news(query)
-        return jsonify(result)
+        result = get_tech_news(query, local_first=data.get('local_first'))
+        return research_response("news", result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -351,10 +1476,137 @@ def lead_endpoint():
             return jsonify({"error": "Query is required"}), 400
         
         result = get_lead_info(query)
-        return jsonify(result)
+        return research_response("lead", result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/<tool>/stream', methods=['POST'])
+def stream_endpoint(tool):
+    if tool not in ("company", "news", "lead"):
+        return jsonify({"error": f"Unknown tool '{tool}'"}), 404
+
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', '')
+
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+
+    return Response(
+        stream_with_context(stream_research(tool, query)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/brief', methods=['POST'])
+def brief_endpoint():
+    try:
+        data = request.get_json()
+        company = data.get('company', '')
+        person = data.get('person', '')
+
+        if not company:
+            return jsonify({"error": "Company is required"}), 400
+
+        result = get_account_brief(company, person)
+        return research_response("brief", result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        job_id = job_manager.submit(parse_job_items(request.content_type, request.get_data(as_text=True)))
+        return jsonify(job_manager.status(job_id)), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_manager.status(job_id))
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    if job_manager.status(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # ?follow=1 keeps the response open and streams rows as they finish
+    follow = request.args.get('follow', '0').lower() in ('1', 'true', 'yes')
+    return Response(
+        stream_with_context(job_manager.iter_results(job_id, follow=follow)),
+        mimetype='application/x-ndjson'
+    )
+
+@app.route('/api/prewarm', methods=['GET'])
+def prewarm_status():
+    return jsonify(prewarm_snapshot())
+
+@app.route('/api/prewarm', methods=['POST'])
+def run_prewarm():
+    try:
+        job_id = prewarmer.run_now(parse_prewarm_targets(request.content_type, request.get_data(as_text=True)))
+        return jsonify(prewarm_jobs.status(job_id)), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/watchlists', methods=['GET'])
+def list_watchlists():
+    return jsonify({"watchlists": watchlists.names()})
+
+@app.route('/api/watchlists', methods=['POST'])
+def add_to_watchlist():
+    # {"name": "enterprise", "accounts": ["Logitech", "Freshworks"]}
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(watchlists.add(data.get('name', ''), data.get('accounts', []))), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/watchlists/<name>', methods=['GET'])
+def get_watchlist(name):
+    watchlist = watchlists.get(name)
+    if watchlist is None:
+        return jsonify({"error": "Watchlist not found"}), 404
+    return jsonify(watchlist)
+
+@app.route('/api/watchlists/<name>', methods=['DELETE'])
+def delete_watchlist(name):
+    # Body {"accounts": [...]} removes just those accounts
+    data = request.get_json(silent=True) or {}
+    removed = watchlists.remove(name, data.get('accounts'))
+    if not removed:
+        return jsonify({"error": "Watchlist not found"}), 404
+    return jsonify({"removed": removed})
+
+@app.route('/api/watchlists/<name>/run', methods=['POST'])
+def run_watchlist(name):
+    if watchlists.get(name) is None:
+        return jsonify({"error": "Watchlist not found"}), 404
+    # ?wait=1 runs in the request and returns per-account outcomes
+    if request.args.get('wait', '0').lower() in ('1', 'true', 'yes'):
+        return jsonify({"runs": watchlists.run(name)})
+    watchlists.run_async(name)
+    return jsonify({"status": "started"}), 202
+
+@app.route('/api/watchlists/<name>/digest', methods=['GET'])
+def watchlist_digest(name):
+    if watchlists.get(name) is None:
+        return jsonify({"error": "Watchlist not found"}), 404
+    since = request.args.get('since', type=float)
+    return jsonify({"name": name, "entries": watchlists.digest(name, since=since)})
+
 @app.route('/favicon.ico')
 def favicon():
     # Serve favicon.ico if present; otherwise serve favicon.png; otherwise return a 1x1 PNG placeholder
@@ -367,32 +1619,42 @@ def favicon():
     if os.path.exists(png_path):
         return send_from_directory('static', 'favicon.png', mimetype='image/png')
 
-    # Generate a 1x1 transparent PNG as a placeholder
-    import base64
-    png_b64 = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8Xw8AAn8B9jYwWwAAAABJRU5ErkJggg=='
-    png_bytes = base64.b64decode(png_b64)
-    return Response(png_bytes, mimetype='image/png')
+    return Response(PLACEHOLDER_ICON, mimetype='image/png')
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({"status": "healthy", "worker": lifecycle.stats(), "background_leader": leader.held})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache_stats_snapshot())
 
 # =================================================
 # RUN SERVER
 # =================================================
 if __name__ == '__main__':
-    # Start a background thread to open the app in the default browser
-    # Wait briefly to allow the server to start before opening
-    import threading, webbrowser, time
+    # Development server. In production use gunicorn (wsgi.py) or uvicorn (asgi.py)
+    create_app()
 
-    def _open_browser():
-        time.sleep(0.8)
-        try:
-            webbrowser.open("http://127.0.0.1:5000")
-        except Exception:
-            pass
+    # Open the app in the default browser once the server is up (OPEN_BROWSER=0 to skip)
+    if env("OPEN_BROWSER", "1").lower() in ("1", "true", "yes"):
+        import webbrowser
 
-    threading.Thread(target=_open_browser, daemon=True).start()
+        def _open_browser():
+            time.sleep(0.8)
+            try:
+                webbrowser.open("http://127.0.0.1:5000")
+            except Exception:
+                pass
+
+        threading.Thread(target=_open_browser, daemon=True).start()
 
     # Run the Flask development server without the auto-reloader (prevents double browser opens)
-    app.run(debug=False, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
+    try:
+        app.run(debug=False, host='0.0.0.0', port=5000, use_reloader=False)
+    finally:
+        shutdown()
@@ -0,0 +1,285 @@
+import asyncio
+import functools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from app import (
+    BASE_DIR,
+    PLACEHOLDER_ICON,
+    cache_stats_snapshot,
+    drain_on_sigterm,
+    json_body,
+    job_manager,
+    leader,
+    lifecycle,
+    metrics,
+    parse_job_items,
+    parse_prewarm_targets,
+    prewarm_jobs,
+    prewarm_snapshot,
+    prewarmer,
+    render_metrics,
+    shutdown,
+    start_background_services,
+    watchlists,
+    get_company_details_async,
+    get_tech_news_async,
+    get_lead_info_async,
+    get_account_brief_async,
+    stream_research_async,
+)
+from backend.http_pool import close_async_client
+from backend.metrics import SIZE_BUCKETS
+
+# =================================================
+# ASYNC (ASGI) ENTRY POINT
+# =================================================
+# Same API as the Flask app, but Serper and Azure OpenAI calls are awaited
+# on a shared keep-alive connection pool, so one process can serve many
+# concurrent lookups:
+#
+#   uvicorn asgi:api --host 0.0.0.0 --port 5000 --workers $WEB_CONCURRENCY
+#
+
+@asynccontextmanager
+async def lifespan(_app):
+    start_background_services()
+    # uvicorn's signal handlers are set by now; drain (503s) from the moment SIGTERM arrives
+    drain_on_sigterm()
+    yield
+    # Drain in-flight LLM calls (blocking) before the shared client goes away
+    await asyncio.to_thread(shutdown)
+    await close_async_client()
+
+api = FastAPI(title="Sales Intelligence Agent", lifespan=lifespan)
+api.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+@api.middleware("http")
+async def record_request(request: Request, call_next):
+    start = time.perf_counter()
+    if lifecycle.draining:
+        response = JSONResponse({"error": "Server is shutting down"}, status_code=503, headers={"Retry-After": "1"})
+    else:
+        response = await call_next(request)
+    # The route template, not the path: job ids and watchlist names would each be a new series
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", None) or "unmatched"
+    metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, status=str(response.status_code))
+    metrics.observe("http_request_bytes", int(request.headers.get("content-length") or 0),
+                    buckets=SIZE_BUCKETS, endpoint=endpoint)
+    if "content-length" in response.headers:
+        metrics.observe("http_response_bytes", int(response.headers["content-length"]),
+                        buckets=SIZE_BUCKETS, endpoint=endpoint)
+    return response
+
+
+class QueryRequest(BaseModel):
+    query: str = ""
+    local_first: Optional[bool] = None
+
+
+class BriefRequest(BaseModel):
+    company: str = ""
+    person: str = ""
+
+
+class WatchlistRequest(BaseModel):
+    name: str = ""
+    accounts: list = []
+
+
+def _flag(value: str):
+    return (value or "0").lower() in ("1", "true", "yes")
+
+
+async def _run(research, body: QueryRequest):
+    query = body.query.strip()
+    if not query:
+        return JSONResponse({"error": "Query is required"}, status_code=400)
+
+    try:
+        result = await research(query)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    # Answers from the result cache say how old they are
+    freshness = result.get("freshness")
+    if freshness:
+        return JSONResponse(result, headers={"Age": str(int(freshness["age"]))})
+    return result
+
+
+# =================================================
+# ROUTES
+# =================================================
+@api.get("/")
+async def index():
+    return FileResponse(os.path.join(BASE_DIR, "static", "index.html"))
+
+@api.post("/api/company")
+async def company_endpoint(body: QueryRequest):
+    return await _run(functools.partial(get_company_details_async, local_first=body.local_first), body)
+
+@api.post("/api/news")
+async def news_endpoint(body: QueryRequest):
+    return await _run(functools.partial(get_tech_news_async, local_first=body.local_first), body)
+
+@api.post("/api/lead")
+async def lead_endpoint(body: QueryRequest):
+    return await _run(get_lead_info_async, body)
+
+@api.post("/api/{tool}/stream")
+async def stream_endpoint(tool: str, body: QueryRequest):
+    if tool not in ("company", "news", "lead"):
+        return JSONResponse({"error": f"Unknown tool '{tool}'"}, status_code=404)
+
+    query = body.query.strip()
+    if not query:
+        return JSONResponse({"error": "Query is required"}, status_code=400)
+
+    return StreamingResponse(
+        stream_research_async(tool, query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.post("/api/brief")
+async def brief_endpoint(body: BriefRequest):
+    company = body.company.strip()
+    if not company:
+        return JSONResponse({"error": "Company is required"}, status_code=400)
+
+    try:
+        return await get_account_brief_async(company, body.person.strip())
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+# =================================================
+# BULK JOBS + PREWARM
+# =================================================
+@api.post("/api/jobs")
+async def create_job(request: Request):
+    text = (await request.body()).decode("utf-8", errors="replace")
+    try:
+        # submit() writes the job file; keep it off the event loop
+        job_id = await asyncio.to_thread(job_manager.submit, parse_job_items(request.headers.get("content-type"), text))
+        return JSONResponse(job_manager.status(job_id), status_code=202)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@api.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return status
+
+@api.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not job_manager.cancel(job_id):
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return job_manager.status(job_id)
+
+@api.get("/api/jobs/{job_id}/results")
+async def job_results(job_id: str, follow: str = "0"):
+    if job_manager.status(job_id) is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    # A plain generator: Starlette iterates it in a worker thread
+    return StreamingResponse(job_manager.iter_results(job_id, follow=_flag(follow)),
+                             media_type="application/x-ndjson")
+
+@api.get("/api/prewarm")
+async def prewarm_status():
+    return prewarm_snapshot()
+
+@api.post("/api/prewarm")
+async def run_prewarm(request: Request):
+    text = (await request.body()).decode("utf-8", errors="replace")
+    try:
+        job_id = await asyncio.to_thread(prewarmer.run_now,
+                                         parse_prewarm_targets(request.headers.get("content-type"), text))
+        return JSONResponse(prewarm_jobs.status(job_id), status_code=202)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+# =================================================
+# WATCHLISTS
+# =================================================
+@api.get("/api/watchlists")
+async def list_watchlists():
+    return {"watchlists": watchlists.names()}
+
+@api.post("/api/watchlists")
+async def add_to_watchlist(body: WatchlistRequest):
+    try:
+        return JSONResponse(watchlists.add(body.name, body.accounts), status_code=201)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@api.get("/api/watchlists/{name}")
+async def get_watchlist(name: str):
+    watchlist = watchlists.get(name)
+    if watchlist is None:
+        return JSONResponse({"error": "Watchlist not found"}, status_code=404)
+    return watchlist
+
+@api.delete("/api/watchlists/{name}")
+async def delete_watchlist(name: str, request: Request):
+    # Body {"accounts": [...]} removes just those accounts
+    data = json_body((await request.body()).decode("utf-8", errors="replace"))
+    removed = watchlists.remove(name, data.get("accounts"))
+    if not removed:
+        return JSONResponse({"error": "Watchlist not found"}, status_code=404)
+    return {"removed": removed}
+
+@api.post("/api/watchlists/{name}/run")
+async def run_watchlist(name: str, wait: str = "0"):
+    if watchlists.get(name) is None:
+        return JSONResponse({"error": "Watchlist not found"}, status_code=404)
+    if _flag(wait):
+        return {"runs": await asyncio.to_thread(watchlists.run, name)}
+    watchlists.run_async(name)
+    return JSONResponse({"status": "started"}, status_code=202)
+
+@api.get("/api/watchlists/{name}/digest")
+async def watchlist_digest(name: str, since: Optional[float] = None):
+    if watchlists.get(name) is None:
+        return JSONResponse({"error": "Watchlist not found"}, status_code=404)
+    return {"name": name, "entries": watchlists.digest(name, since=since)}
+
+# =================================================
+# STATIC + OPERATIONS
+# =================================================
+@api.get("/favicon.ico")
+async def favicon():
+    for name, media_type in (("favicon.ico", "image/x-icon"), ("favicon.png", "image/png")):
+        path = os.path.join(BASE_DIR, "static", name)
+        if os.path.exists(path):
+            return FileResponse(path, media_type=media_type)
+    return Response(PLACEHOLDER_ICON, media_type="image/png")
+
+@api.get("/health")
+async def health():
+    return {"status": "healthy", "worker": lifecycle.stats(), "background_leader": leader.held}
+
+@api.get("/metrics")
+async def metrics_endpoint():
+    # Cache gauges count SQLite rows; read them off the event loop
+    return PlainTextResponse(await asyncio.to_thread(render_metrics), media_type="text/plain; version=0.0.4")
+
+@api.get("/api/cache/stats")
+async def cache_stats():
+    return await asyncio.to_thread(cache_stats_snapshot)
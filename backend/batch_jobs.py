@@ -0,0 +1,336 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.rate_limit import provider_budgets
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+# Summaries the research functions return instead of raising
+FAILED_SUMMARIES = ("Error generating summary",)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+# =================================================
+# BATCH ENRICHMENT JOBS
+# =================================================
+class JobManager:
+    """
+    Runs lists of research queries in the background.
+
+    Each job lives in `<directory>/<job_id>/`:
+
+    - job.json      metadata and status
+    - items.jsonl   the submitted {"tool", "query"} items
+    - results.jsonl one line per finished item (this is the checkpoint)
+
+    Items run on a bounded worker pool and are retried with exponential
+    backoff. Every Serper / LLM call an item really makes (not cache hits)
+    takes a token from the per-provider `limiters`. Jobs that were still running when the process stopped are
+    picked up again by resume(), skipping items already in results.jsonl.
+
+    Only one process runs jobs, but any process sharing the directory can
+    report on them: jobs it does not hold in memory are read from disk.
+    """
+
+    def __init__(self, directory, research: dict, workers: int = DEFAULT_WORKERS, limiters=None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff: float = DEFAULT_BACKOFF):
+        self.directory = directory
+        self.research = research
+        self.limiters = limiters or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _path(self, job_id, name):
+        return os.path.join(self.directory, job_id, name)
+
+    def _save_meta(self, job):
+        _write_json(self._path(job["id"], "job.json"), {
+            "id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        })
+
+    def _read_items(self, job_id):
+        with open(self._path(job_id, "items.jsonl"), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _read_meta(self, job_id):
+        meta_path = self._path(job_id, "job.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_checkpoint(self, job_id, repair: bool = True):
+        done, failed = set(), 0
+        path = self._path(job_id, "results.jsonl")
+        if not os.path.exists(path):
+            return done, failed
+
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                done.add(record["index"])
+                if record.get("status") != "ok":
+                    failed += 1
+
+        # A crash can leave a half-written last line; cut it off so those items simply run again
+        if repair and valid_bytes < os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return done, failed
+
+    def submit(self, items: list):
+        cleaned = []
+        for item in items:
+            tool = (item.get("tool") or "").strip().lower()
+            query = (item.get("query") or "").strip()
+            if tool not in self.research:
+                raise ValueError(f"Unknown tool '{tool}' (expected one of {sorted(self.research)})")
+            if not query:
+                raise ValueError("Every item needs a non-empty query")
+            cleaned.append({"tool": tool, "query": query})
+
+        if not cleaned:
+            raise ValueError("No items to enrich")
+
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.join(self.directory, job_id))
+        with open(self._path(job_id, "items.jsonl"), "w", encoding="utf-8") as f:
+            for item in cleaned:
+                f.write(json.dumps(item) + "\n")
+
+        now = time.time()
+        job = self._new_state(job_id, len(cleaned), now, now)
+        self._save_meta(job)
+        self._start(job, cleaned, set())
+        return job_id
+
+    def _new_state(self, job_id, total, created_at, updated_at, status="queued"):
+        return {
+            "id": job_id,
+            "status": status,
+            "total": total,
+            "completed": 0,
+            "failed": 0,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "cancel": threading.Event(),
+            "write_lock": threading.Lock(),
+        }
+
+    def _start(self, job, items, done):
+        with self._lock:
+            self._jobs[job["id"]] = job
+
+        pending = [(index, item) for index, item in enumerate(items) if index not in done]
+        if not pending:
+            self._finish(job)
+            return
+
+        job["status"] = "running"
+        self._save_meta(job)
+        for index, item in pending:
+            self._pool.submit(self._run_item, job, index, item)
+
+    def resume(self):
+        """Reload every job on disk and restart the ones that did not finish."""
+        resumed = []
+        for job_id in sorted(os.listdir(self.directory)):
+            meta = None if job_id in self._jobs else self._read_meta(job_id)
+            if meta is None:
+                continue
+
+            job = self._new_state(job_id, meta["total"], meta["created_at"], meta["updated_at"], meta["status"])
+            done, failed = self._read_checkpoint(job_id)
+            job["completed"] = len(done) - failed
+            job["failed"] = failed
+
+            if meta["status"] in ACTIVE_STATUSES:
+                self._start(job, self._read_items(job_id), done)
+                resumed.append(job_id)
+            else:
+                with self._lock:
+                    self._jobs[job_id] = job
+        return resumed
+
+    def _job(self, job_id):
+        """In-memory state, or a snapshot from disk for a job run by another process."""
+        job = self._jobs.get(job_id)
+        if job is not None or not job_id.isalnum():
+            return job
+
+        meta = self._read_meta(job_id)
+        if meta is None:
+            return None
+        job = self._new_state(job_id, meta["total"], meta["created_at"], meta["updated_at"], meta["status"])
+        # The owning process may be appending right now: never truncate from here
+        done, failed = self._read_checkpoint(job_id, repair=False)
+        job["completed"] = len(done) - failed
+        job["failed"] = failed
+        return job
+
+    def cancel(self, job_id):
+        job = self._job(job_id)
+        if job is None:
+            return False
+        job["cancel"].set()
+        if job["status"] in ACTIVE_STATUSES:
+            job["status"] = "cancelled"
+            job["updated_at"] = time.time()
+            self._save_meta(job)
+        return True
+
+    def _finish(self, job):
+        if job["status"] != "cancelled":
+            job["status"] = "completed"
+        job["updated_at"] = time.time()
+        self._save_meta(job)
+
+    def _is_failure(self, result):
+        summary = (result or {}).get("summary") or []
+        return len(summary) == 1 and summary[0] in FAILED_SUMMARIES
+
+    def _cancelled_on_disk(self, job):
+        # cancel() in another process only updates job.json
+        meta = self._read_meta(job["id"]) or {}
+        if meta.get("status") == "cancelled":
+            job["status"] = "cancelled"
+            job["cancel"].set()
+            return True
+        return False
+
+    def _run_item(self, job, index, item):
+        if job["cancel"].is_set() or self._cancelled_on_disk(job):
+            return
+
+        research = self.research[item["tool"]]
+        result, error, attempts = None, None, 0
+
+        for attempt in range(self.max_retries + 1):
+            attempts = attempt + 1
+            try:
+                with provider_budgets(self.limiters):
+                    result = research(item["query"])
+                if not self._is_failure(result):
+                    error = None
+                    break
+                error = result["summary"][0]
+            except Exception as e:
+                result, error = None, str(e)
+
+            if attempt < self.max_retries:
+                if job["cancel"].wait(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)):
+                    return
+
+        record = {
+            "index": index,
+            "tool": item["tool"],
+            "query": item["query"],
+            "status": "failed" if error else "ok",
+            "attempts": attempts,
+        }
+        if result is not None:
+            record.update(result)
+        if error:
+            record["error"] = error
+
+        with job["write_lock"]:
+            with open(self._path(job["id"], "results.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+            if error:
+                job["failed"] += 1
+            else:
+                job["completed"] += 1
+            job["updated_at"] = time.time()
+
+            if job["completed"] + job["failed"] >= job["total"]:
+                self._finish(job)
+
+    def status(self, job_id):
+        job = self._job(job_id)
+        if job is None:
+            return None
+
+        finished = job["completed"] + job["failed"]
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "completed": job["completed"],
+            "failed": job["failed"],
+            "pending": job["total"] - finished,
+            "progress": round(finished / job["total"], 4) if job["total"] else 1.0,
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    def iter_results(self, job_id, follow: bool = False, poll_interval: float = 0.5):
+        """
+        Yield results.jsonl lines as they are written.
+
+        With follow=True keep tailing the file until the job stops running.
+        """
+        job = self._job(job_id)
+        if job is None:
+            return
+
+        path = self._path(job_id, "results.jsonl")
+        position = 0
+        while True:
+            if job_id not in self._jobs:
+                job = self._job(job_id) or job
+            active = job["status"] in ACTIVE_STATUSES
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    f.seek(position)
+                    while True:
+                        line = f.readline()
+                        if not line.endswith("\n"):
+                            break
+                        position = f.tell()
+                        yield line
+
+            if not follow or not active:
+                return
+            time.sleep(poll_interval)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop taking work. Items already running finish (with wait=True); queued
+        ones are dropped and run again by resume() on the next start.
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
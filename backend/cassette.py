@@ -0,0 +1,317 @@
+import asyncio
+import codecs
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+# =================================================
+# RECORD / REPLAY CASSETTES (SERPER + AZURE OPENAI)
+# =================================================
+# A cassette is a gzip-compressed JSON-lines file with one recorded HTTP
+# exchange per line: the request (method, path, body) and the response
+# (status, a few headers, body chunks with the time each arrived). Record
+# mode passes calls through to the real API and appends them; replay mode
+# answers from the file without touching the network.
+
+RECORD = "record"
+REPLAY = "replay"
+MODES = (RECORD, REPLAY)
+
+# Only these response headers are kept; request headers (API keys) never are
+KEPT_HEADERS = ("content-type", "retry-after")
+# Bodies are stored decoded, so these no longer describe them
+_ENCODING_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_DEPLOYMENT_RE = re.compile(r"/deployments/[^/]+/")
+
+
+class CassetteMiss(Exception):
+    """Replay mode got a request that was never recorded."""
+
+
+def _decoded_headers(headers):
+    return [(name, value) for name, value in headers.items() if name.lower() not in _ENCODING_HEADERS]
+
+
+def request_key(method: str, url: str, body):
+    """
+    What a request is matched on: method, path and body. The host and query
+    string are ignored (Serper / Azure base URLs and api-version differ
+    between machines), and so is the Azure deployment name.
+    """
+    path = url.split("://", 1)[-1]
+    path = "/" + path.split("/", 1)[1] if "/" in path else "/"
+    path = _DEPLOYMENT_RE.sub("/deployments/*/", path.split("?", 1)[0])
+
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True)
+    except (TypeError, ValueError):
+        body = body or ""
+    return f"{method.upper()} {path} {body}"
+
+
+class Cassette:
+    """
+    Recorded exchanges for one cassette file.
+
+    In replay mode, identical requests get their recordings back in the
+    order they were made (the last one is repeated once they run out), after
+    the recorded delays multiplied by `realtime`: 1 replays at recorded
+    speed, 0 instantly.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, realtime: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {list(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+
+        self._lock = threading.Lock()
+        self._recorded = defaultdict(list)
+        self._played = defaultdict(int)
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            # Re-recording starts the file over
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with gzip.open(path, "wt", encoding="utf-8"):
+                pass
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path} (record it with CASSETTE_MODE=record)")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self._recorded[exchange["key"]].append(exchange)
+
+    def record(self, key: str, status: int, headers, chunks: list):
+        """Store one exchange; `chunks` is [(seconds since the request was sent, text), ...]."""
+        exchange = {
+            "key": key,
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() in KEPT_HEADERS},
+            "chunks": [[round(offset, 4), text] for offset, text in chunks],
+        }
+        line = json.dumps(exchange)
+        with self._lock:
+            self._recorded[key].append(exchange)
+            # Appending gzip members keeps the file valid after every call
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._stats["recorded"] += 1
+
+    def play(self, key: str):
+        with self._lock:
+            recordings = self._recorded.get(key)
+            if not recordings:
+                self._stats["misses"] += 1
+                raise CassetteMiss(f"No recorded response in {self.path} for {key[:200]}")
+            index = min(self._played[key], len(recordings) - 1)
+            self._played[key] += 1
+            self._stats["replayed"] += 1
+            return recordings[index]
+
+    def delays(self, exchange):
+        """(delay before the response starts, [(delay, chunk bytes), ...]), scaled by `realtime`."""
+        chunks, previous = [], 0.0
+        for offset, text in exchange["chunks"]:
+            chunks.append((max(offset - previous, 0.0) * self.realtime, text.encode("utf-8")))
+            previous = offset
+        if not chunks:
+            return 0.0, []
+        first_delay = chunks[0][0]
+        return first_delay, [(0.0, chunks[0][1])] + chunks[1:]
+
+    def _matching(self, path_prefix: str = None):
+        # Caller holds the lock
+        for key, exchanges in self._recorded.items():
+            path = key.split(" ", 2)[1]
+            if not path_prefix or path.startswith(path_prefix):
+                yield from exchanges
+
+    def count(self, path_prefix: str = None):
+        """Recorded exchanges, optionally only for request paths starting with `path_prefix`."""
+        with self._lock:
+            return sum(1 for _ in self._matching(path_prefix))
+
+    def recorded_seconds(self, path_prefix: str = None):
+        """Total recorded response time, optionally only for request paths starting with `path_prefix`."""
+        with self._lock:
+            return sum(e["chunks"][-1][0] for e in self._matching(path_prefix) if e["chunks"])
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["exchanges"] = sum(len(v) for v in self._recorded.values())
+        snapshot.update({"path": self.path, "mode": self.mode, "realtime": self.realtime})
+        return snapshot
+
+
+# =================================================
+# requests TRANSPORT (SERPER, SYNC)
+# =================================================
+def requests_adapter(cassette: Cassette):
+    import requests
+    from requests.adapters import BaseAdapter, HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+
+    class CassetteAdapter(BaseAdapter):
+        def __init__(self):
+            super().__init__()
+            self._real = HTTPAdapter() if cassette.mode == RECORD else None
+
+        def send(self, request, **kwargs):
+            key = request_key(request.method, request.url, request.body)
+
+            if cassette.mode == RECORD:
+                started = time.perf_counter()
+                response = self._real.send(request, **kwargs)
+                content = response.content
+                cassette.record(key, response.status_code, response.headers,
+                                [(time.perf_counter() - started, content.decode("utf-8", errors="replace"))])
+                return response
+
+            exchange = cassette.play(key)
+            first_delay, chunks = cassette.delays(exchange)
+            delay = first_delay + sum(d for d, _ in chunks)
+            if delay:
+                time.sleep(delay)
+
+            response = requests.Response()
+            response.status_code = exchange["status"]
+            response.headers = CaseInsensitiveDict(exchange["headers"])
+            response._content = b"".join(c for _, c in chunks)
+            response.url = request.url
+            response.request = request
+            response.reason = "OK" if response.status_code < 400 else "Error"
+            response.encoding = "utf-8"
+            return response
+
+        def close(self):
+            if self._real is not None:
+                self._real.close()
+
+    return CassetteAdapter()
+
+
+# =================================================
+# httpx TRANSPORTS (AZURE OPENAI + ASYNC SERPER)
+# =================================================
+def httpx_transport(cassette: Cassette):
+    import httpx
+
+    class _RecordingStream(httpx.SyncByteStream):
+        def __init__(self, key, response, started):
+            self.key, self.response, self.started = key, response, started
+            self.chunks = []
+            self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        def __iter__(self):
+            # Decompressed bytes, timed as they arrive (one chunk per SSE event when streaming)
+            for chunk in self.response.iter_bytes():
+                self.chunks.append((time.perf_counter() - self.started, self._decoder.decode(chunk)))
+                yield chunk
+
+        def close(self):
+            self.response.close()
+            cassette.record(self.key, self.response.status_code, self.response.headers, self.chunks)
+
+    class _ReplayStream(httpx.SyncByteStream):
+        def __init__(self, chunks):
+            self.chunks = chunks
+
+        def __iter__(self):
+            for delay, chunk in self.chunks:
+                if delay:
+                    time.sleep(delay)
+                yield chunk
+
+    class CassetteTransport(httpx.BaseTransport):
+        def __init__(self):
+            self._real = httpx.HTTPTransport() if cassette.mode == RECORD else None
+
+        def handle_request(self, request):
+            key = request_key(request.method, str(request.url), request.read())
+
+            if cassette.mode == RECORD:
+                started = time.perf_counter()
+                response = self._real.handle_request(request)
+                return httpx.Response(response.status_code, headers=_decoded_headers(response.headers),
+                                      stream=_RecordingStream(key, response, started), extensions=response.extensions)
+
+            exchange = cassette.play(key)
+            first_delay, chunks = cassette.delays(exchange)
+            if first_delay:
+                time.sleep(first_delay)
+            return httpx.Response(exchange["status"], headers=exchange["headers"], stream=_ReplayStream(chunks))
+
+        def close(self):
+            if self._real is not None:
+                self._real.close()
+
+    return CassetteTransport()
+
+
+def httpx_async_transport(cassette: Cassette):
+    import httpx
+
+    class _RecordingStream(httpx.AsyncByteStream):
+        def __init__(self, key, response, started):
+            self.key, self.response, self.started = key, response, started
+            self.chunks = []
+            self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        async def __aiter__(self):
+            async for chunk in self.response.aiter_bytes():
+                self.chunks.append((time.perf_counter() - self.started, self._decoder.decode(chunk)))
+                yield chunk
+
+        async def aclose(self):
+            await self.response.aclose()
+            cassette.record(self.key, self.response.status_code, self.response.headers, self.chunks)
+
+    class _ReplayStream(httpx.AsyncByteStream):
+        def __init__(self, chunks):
+            self.chunks = chunks
+
+        async def __aiter__(self):
+            for delay, chunk in self.chunks:
+                if delay:
+                    await asyncio.sleep(delay)
+                yield chunk
+
+    class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self._real = httpx.AsyncHTTPTransport() if cassette.mode == RECORD else None
+
+        async def handle_async_request(self, request):
+            key = request_key(request.method, str(request.url), await request.aread())
+
+            if cassette.mode == RECORD:
+                started = time.perf_counter()
+                response = await self._real.handle_async_request(request)
+                return httpx.Response(response.status_code, headers=_decoded_headers(response.headers),
+                                      stream=_RecordingStream(key, response, started), extensions=response.extensions)
+
+            exchange = cassette.play(key)
+            first_delay, chunks = cassette.delays(exchange)
+            if first_delay:
+                await asyncio.sleep(first_delay)
+            return httpx.Response(exchange["status"], headers=exchange["headers"], stream=_ReplayStream(chunks))
+
+        async def aclose(self):
+            if self._real is not None:
+                await self._real.aclose()
+
+    return AsyncCassetteTransport()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+# =================================================
+# POOL SETTINGS
+# =================================================
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+_async_client = None
+_async_client_loop = None
+
+
+# =================================================
+# SYNC POOL (requests.Session, keep-alive)
+# =================================================
+def get_session(max_connections: int = DEFAULT_MAX_CONNECTIONS):
+    """Process-wide requests.Session so repeated Serper calls reuse TCP/TLS connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                from backend.providers import get_cassette
+
+                session = requests.Session()
+                cassette = get_cassette()
+                if cassette is not None:
+                    from backend.cassette import requests_adapter
+
+                    adapter = requests_adapter(cassette)
+                else:
+                    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max_connections)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+# =================================================
+# ASYNC POOL (httpx.AsyncClient, keep-alive)
+# =================================================
+def get_async_client(max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                     max_keepalive: int = DEFAULT_MAX_KEEPALIVE):
+    """
+    Shared httpx.AsyncClient for the running event loop.
+
+    The client is bound to the loop it was created on, so a new one is
+    built if the loop changes (e.g. repeated asyncio.run() calls).
+    """
+    global _async_client, _async_client_loop
+    import httpx
+    from backend.providers import get_cassette
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        cassette = get_cassette()
+        transport = None
+        if cassette is not None:
+            from backend.cassette import httpx_async_transport
+
+            transport = httpx_async_transport(cassette)
+        _async_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive
+            ),
+            transport=transport
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+def reset():
+    """Drop the shared session and client so the next call builds them again (e.g. with another cassette)."""
+    global _session, _async_client, _async_client_loop
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _async_client = None
+        _async_client_loop = None
+
+
+async def close_async_client():
+    global _async_client, _async_client_loop
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
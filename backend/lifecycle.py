@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process is its own leader
+    fcntl = None
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_DRAIN_TIMEOUT = 30.0
+# How often a follower process retries the leader lock (takes over if the leader dies)
+LEADER_RETRY = 15.0
+
+
+# =================================================
+# IN-FLIGHT WORK + GRACEFUL SHUTDOWN
+# =================================================
+class Lifecycle:
+    """
+    Tracks in-flight work (LLM calls) of one server process and shuts it
+    down gracefully. shutdown():
+
+    1. flags the process as draining so new requests can be turned away
+       and runs the on_drain hooks (stop taking background work)
+    2. waits for tracked work to finish
+    3. runs the on_shutdown hooks, newest first (close pools and clients)
+    """
+
+    def __init__(self):
+        self.draining = False
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._drain_hooks = []
+        self._hooks = []
+        self._shut_down = False
+
+    @contextmanager
+    def track(self):
+        with self._cond:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def in_flight(self):
+        with self._cond:
+            return self._in_flight
+
+    def on_drain(self, hook):
+        self._drain_hooks.append(hook)
+        return hook
+
+    def on_shutdown(self, hook):
+        self._hooks.append(hook)
+        return hook
+
+    def _run_hooks(self, hooks):
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Shutdown hook error: {e}")
+
+    def drain(self):
+        """Step 1 only (once): turn new requests away and stop taking background work."""
+        with self._cond:
+            if self.draining:
+                return
+            self.draining = True
+        self._run_hooks(self._drain_hooks)
+
+    def shutdown(self, timeout: float = DEFAULT_DRAIN_TIMEOUT):
+        """Drain and run the hooks once. Returns False if work was still running at the timeout."""
+        with self._cond:
+            if self._shut_down:
+                return True
+            self._shut_down = True
+        self.drain()
+
+        with self._cond:
+            deadline = time.monotonic() + timeout
+            while self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            left = self._in_flight
+
+        if left:
+            print(f"Shutdown: {left} LLM call(s) still running after {timeout}s")
+        self._run_hooks(reversed(self._hooks))
+        return left == 0
+
+    def stats(self):
+        with self._cond:
+            return {"pid": os.getpid(), "draining": self.draining, "in_flight": self._in_flight}
+
+
+# =================================================
+# BACKGROUND SERVICE LEADER (ONE PER HOST)
+# =================================================
+class LeaderLock:
+    """
+    Exclusive flock on `path`, held for the life of the process.
+
+    With several worker processes only the lock holder runs background
+    services (job resume, watchlist scheduler); the others keep retrying
+    so one of them takes over if the leader exits.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        if self._file is not None:
+            return True
+        if fcntl is None or not self.path:
+            self._file = True
+            return True
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def run_when_acquired(self, start, stop: threading.Event, retry: float = LEADER_RETRY):
+        """Call start() now if the lock is free, else from a thread once it is."""
+        if self.try_acquire():
+            start()
+            return
+
+        def _wait():
+            while not stop.wait(retry):
+                if self.try_acquire():
+                    print(f"Process {os.getpid()} took over background services")
+                    start()
+                    return
+
+        threading.Thread(target=_wait, name="leader-election", daemon=True).start()
@@ -0,0 +1,124 @@
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# =================================================
+# MULTI-ENTITY PROMPT FORMAT
+# =================================================
+# Several single-entity prompts are sent as one request; each task's input
+# is fenced with TASK markers and the model answers under ANSWER headers,
+# which split_batch_response() uses to hand every caller its own part.
+
+_ANSWER_RE = re.compile(r"^\s*#+\s*ANSWER\s+(\d+)\s*:?\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def build_batch_prompt(prompts: list):
+    sections = "\n\n".join(
+        f"<<<TASK {i}>>>\n{prompt.strip()}\n<<<END TASK {i}>>>"
+        for i, prompt in enumerate(prompts, 1)
+    )
+    return f"""
+You will complete {len(prompts)} independent tasks. Each task has its own data and question.
+Answer every task using ONLY that task's own data; never mix information between tasks.
+
+For each task write a header line "### ANSWER <task number>" followed by that task's answer,
+following the task's own formatting instructions.
+
+{sections}
+"""
+
+
+def split_batch_response(raw: str, count: int):
+    """Answer text per task (None where the model skipped a task)."""
+    answers = [None] * count
+    matches = list(_ANSWER_RE.finditer(raw or ""))
+    for match, following in zip(matches, matches[1:] + [None]):
+        index = int(match.group(1)) - 1
+        end = following.start() if following else len(raw)
+        if 0 <= index < count and answers[index] is None:
+            answers[index] = raw[match.end():end].strip() or None
+    return answers
+
+
+# =================================================
+# MICRO-BATCHER
+# =================================================
+class MicroBatcher:
+    """
+    Groups items submitted within `window` seconds (or `max_batch` items,
+    whichever comes first) and runs them with one `run_batch(items)` call.
+
+    run_batch must return one result per item, in order; an Exception in
+    that list is raised to the matching caller only.
+    """
+
+    def __init__(self, run_batch, window: float = 0.05, max_batch: int = 8, workers: int = 4):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch")
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0}
+
+    def submit(self, item):
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            elif len(self._pending) == 1:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._pool.submit(self._run, batch)
+        return future
+
+    def _take(self):
+        # Caller holds the lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(batch)
+
+        try:
+            results = self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"run_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = len(self._pending)
+        snapshot["window"] = self.window
+        snapshot["max_batch"] = self.max_batch
+        return snapshot
+
+    def close(self):
+        """Run whatever is still pending, then wait for every batch in flight."""
+        self._flush()
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from backend.storage import connect
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_SIMILARITY = 0.75
+
+# How much the query wording vs. the retrieved sources count towards a near-duplicate match
+QUERY_WEIGHT = 0.6
+SOURCE_WEIGHT = 0.4
+# Never reuse an answer for a query that shares too few words, however similar the sources are
+MIN_QUERY_SIMILARITY = 0.5
+
+# Filler words that do not change what is being asked about
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "on", "in", "to", "and", "or", "is", "are",
+    "about", "what", "who", "how", "tell", "me", "give", "show", "please",
+    "company", "companies", "info", "information", "details",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9@.]+")
+
+
+def prompt_key(prompt: str, deployment: str):
+    return hashlib.sha256(f"{deployment}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def tokenize(text: str):
+    """Lowercased words without stopwords, plural-folded, duplicates kept."""
+    words = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        word = word.strip(".")
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        # Cheap plural folding so "trends" matches "trend"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def query_terms(query: str):
+    return frozenset(tokenize(query))
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# =================================================
+# LLM RESPONSE CACHE (EXACT + NEAR-DUPLICATE)
+# =================================================
+class LLMCache:
+    """
+    Cache for raw LLM completions.
+
+    - exact tier: sha256 of deployment + fully built prompt
+    - near-duplicate tier: same tool and deployment, similar query terms
+      (e.g. "Logitech history" vs "history of logitech company") and the
+      same source URLs in the same order: the completion cites sources by
+      their [n] position in the prompt, so any other list would remap them
+
+    Entries live in a memory LRU and, when `path` is set, in SQLite so
+    they survive restarts.
+    """
+
+    def __init__(self, path=None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL, similarity: float = DEFAULT_SIMILARITY):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stale_hits": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+        self._db = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    deployment TEXT NOT NULL,
+                    tool TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    content TEXT NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+            self._load_recent()
+
+    def _load_recent(self):
+        # Warm the memory tier so near-duplicate matching works right after a restart
+        rows = self._db.execute(
+            "SELECT key, deployment, tool, query, sources, stored_at, content "
+            "FROM llm_cache WHERE stored_at >= ? ORDER BY stored_at DESC LIMIT ?",
+            (time.time() - self.ttl, self.max_entries)
+        ).fetchall()
+        for key, deployment, tool, query, sources, stored_at, content in reversed(rows):
+            self._remember(key, {
+                "deployment": deployment,
+                "tool": tool,
+                "query": query,
+                "terms": query_terms(query),
+                "sources": tuple(json.loads(sources)),
+                "stored_at": stored_at,
+                "content": content,
+            })
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _fresh(self, entry, now):
+        return now - entry["stored_at"] <= self.ttl
+
+    def _get_exact(self, key, now, max_age=None):
+        # Expired entries stay put so get_stale() can serve them during an outage
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._memory.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT deployment, tool, query, sources, stored_at, content FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None:
+                deployment, tool, query, sources, stored_at, content = row
+                entry = {
+                    "deployment": deployment,
+                    "tool": tool,
+                    "query": query,
+                    "terms": query_terms(query),
+                    "sources": tuple(json.loads(sources)),
+                    "stored_at": stored_at,
+                    "content": content,
+                }
+                self._remember(key, entry)
+
+        if entry is None:
+            return None
+        if now - entry["stored_at"] > max_age:
+            self._stats["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _get_similar(self, deployment, tool, terms, sources, now):
+        best, best_score = None, 0.0
+        for key, entry in reversed(self._memory.items()):
+            if entry["tool"] != tool or entry["deployment"] != deployment:
+                continue
+            if entry["sources"] != sources or not self._fresh(entry, now):
+                continue
+            query_score = jaccard(terms, entry["terms"])
+            if query_score < MIN_QUERY_SIMILARITY:
+                continue
+            # The sources are identical, so only the query wording still differs
+            score = QUERY_WEIGHT * query_score + SOURCE_WEIGHT
+            if score > best_score:
+                best, best_score = key, score
+
+        if best is None or best_score < self.similarity:
+            return None
+        self._memory.move_to_end(best)
+        return self._memory[best]
+
+    def get(self, prompt: str, deployment: str, tool: str = "", query: str = "", sources=()):
+        now = time.time()
+        key = prompt_key(prompt, deployment)
+
+        with self._lock:
+            entry = self._get_exact(key, now)
+            if entry is not None:
+                self._stats["exact_hits"] += 1
+                return entry["content"]
+
+            if tool and query:
+                sources = tuple(s for s in sources if s)
+                entry = self._get_similar(deployment, tool, query_terms(query), sources, now)
+                if entry is not None:
+                    self._stats["semantic_hits"] += 1
+                    return entry["content"]
+
+            self._stats["misses"] += 1
+            return None
+
+    def get_stale(self, prompt: str, deployment: str):
+        """Exact-match completion regardless of TTL (fallback while the LLM is unavailable)."""
+        with self._lock:
+            entry = self._get_exact(prompt_key(prompt, deployment), time.time(), max_age=float("inf"))
+            if entry is None:
+                return None
+            self._stats["stale_hits"] += 1
+            return entry["content"]
+
+    def set(self, prompt: str, deployment: str, content: str, tool: str = "", query: str = "", sources=()):
+        key = prompt_key(prompt, deployment)
+        sources = [s for s in sources if s]
+        entry = {
+            "deployment": deployment,
+            "tool": tool,
+            "query": query,
+            "terms": query_terms(query),
+            "sources": tuple(sources),
+            "stored_at": time.time(),
+            "content": content,
+        }
+
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, deployment, tool, query, sources, stored_at, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, deployment, tool, query, json.dumps(sources), entry["stored_at"], content)
+                )
+                self._db.commit()
+            self._stats["writes"] += 1
+
+    def purge_expired(self, grace: float = 0):
+        """
+        Drop completions that expired more than `grace` seconds ago (until
+        then get_stale() can still serve them). Returns the number removed.
+        """
+        cutoff = time.time() - self.ttl - grace
+        removed = 0
+
+        with self._lock:
+            for key, entry in list(self._memory.items()):
+                if entry["stored_at"] < cutoff:
+                    del self._memory[key]
+                    removed += 1
+            if self._db is not None:
+                # Memory entries are copies of rows: count each entry once, as its row
+                removed = self._db.execute("DELETE FROM llm_cache WHERE stored_at < ?", (cutoff,)).rowcount
+                self._db.commit()
+
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["memory_entries"] = len(self._memory)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["similarity"] = self.similarity
+        return snapshot
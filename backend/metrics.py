@@ -0,0 +1,195 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# =================================================
+# BUCKETS
+# =================================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# =================================================
+# METRICS REGISTRY (PROMETHEUS TEXT FORMAT)
+# =================================================
+class MetricsRegistry:
+    """
+    Minimal in-process counters, gauges and histograms.
+
+    Metrics are created on first use; histograms take their buckets from
+    the first observe() call (or an explicit histogram() registration).
+    render() returns the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def _name(self, name):
+        return f"{self.prefix}{name}"
+
+    def _declare(self, name, kind, help_text, buckets=None):
+        meta = self._meta.get(name)
+        if meta is None:
+            meta = {"type": kind, "help": help_text or name, "buckets": buckets}
+            self._meta[name] = meta
+        return meta
+
+    def counter(self, name: str, help_text: str = ""):
+        with self._lock:
+            self._declare(self._name(name), "counter", help_text)
+
+    def gauge(self, name: str, help_text: str = ""):
+        with self._lock:
+            self._declare(self._name(name), "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str = "", buckets=LATENCY_BUCKETS):
+        with self._lock:
+            self._declare(self._name(name), "histogram", help_text, tuple(sorted(buckets)))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        name = self._name(name)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", "")
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        name = self._name(name)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "gauge", "")
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        name = self._name(name)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            meta = self._declare(name, "histogram", "", tuple(sorted(buckets)))
+            bounds = meta["buckets"] or tuple(sorted(buckets))
+            series = self._histograms.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+                self._histograms[key] = series
+            series["counts"][bisect.bisect_left(bounds, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall-clock seconds spent inside the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, name: str, **labels):
+        """Current value of a counter/gauge, or {"count", "sum"} for a histogram."""
+        name = self._name(name)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            if key in self._gauges:
+                return self._gauges[key]
+            series = self._histograms.get(key)
+            if series is not None:
+                return {"count": series["count"], "sum": series["sum"]}
+        return None
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._meta):
+                meta = self._meta[name]
+                lines.append(f"# HELP {name} {meta['help']}")
+                lines.append(f"# TYPE {name} {meta['type']}")
+
+                if meta["type"] == "histogram":
+                    bounds = meta["buckets"]
+                    for (series_name, labels), series in sorted(self._histograms.items()):
+                        if series_name != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(bounds + (float("inf"),), series["counts"]):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+                else:
+                    values = self._counters if meta["type"] == "counter" else self._gauges
+                    for (series_name, labels), value in sorted(values.items()):
+                        if series_name == name:
+                            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# =================================================
+# SHARED REGISTRY
+# =================================================
+metrics = MetricsRegistry(prefix="sales_agent_")
+metrics.histogram("research_stage_seconds", "Time spent in each research stage (search, prompt, llm, parse, serialize)", LATENCY_BUCKETS)
+metrics.histogram("serper_request_seconds", "Serper HTTP round-trip time", LATENCY_BUCKETS)
+metrics.histogram("serper_response_bytes", "Serper response body size", SIZE_BUCKETS)
+metrics.histogram("serper_results", "Results returned per Serper call", COUNT_BUCKETS)
+metrics.histogram("llm_request_seconds", "Azure OpenAI call time (cache misses only)", LATENCY_BUCKETS)
+metrics.histogram("llm_prompt_tokens", "Prompt tokens per LLM call", TOKEN_BUCKETS)
+metrics.histogram("llm_completion_tokens", "Completion tokens per LLM call", TOKEN_BUCKETS)
+metrics.histogram("prompt_tokens_local", "Prompt tokens counted locally before the LLM call, after budget trimming", TOKEN_BUCKETS)
+metrics.counter("llm_truncated_total", "Answers cut off by the max_tokens cap (their last partial line is dropped)")
+metrics.histogram("prompt_sources_trimmed", "Sources dropped to fit a prompt into its token budget", COUNT_BUCKETS)
+metrics.histogram("http_request_seconds", "End-to-end HTTP handler time", LATENCY_BUCKETS)
+metrics.histogram("http_request_bytes", "HTTP request body size", SIZE_BUCKETS)
+metrics.histogram("http_response_bytes", "HTTP response body size (non-streamed responses)", SIZE_BUCKETS)
+metrics.counter("serper_requests_total", "Serper calls by outcome")
+metrics.counter("llm_tokens_total", "LLM tokens by kind (prompt / completion)")
+metrics.counter("cache_requests_total", "Cache lookups by cache and result (hit / miss)")
+metrics.counter("cache_purged_total", "Expired cache entries and pruned source-index documents removed")
+metrics.counter("research_errors_total", "Research failures by tool and stage")
+metrics.counter("http_requests_total", "HTTP requests by endpoint and status")
+metrics.counter("provider_calls_total", "Guarded provider calls by outcome (ok / throttled / error / rejected)")
+metrics.gauge("provider_rate_limit", "Current adaptive requests/second per provider key")
+metrics.gauge("provider_breaker_open", "1 while a provider key's circuit breaker is open or half-open")
+metrics.histogram("query_variants_overlap", "Duplicate pages merged away when fusing query-variant results", COUNT_BUCKETS)
+metrics.counter("result_revalidations_total", "Background refreshes scheduled for stale cached answers, by tool")
+metrics.histogram("scheduler_wait_seconds", "Time research calls waited for a scheduler slot, by priority class", LATENCY_BUCKETS)
+metrics.gauge("scheduler_queue_depth", "Research calls waiting for a scheduler slot, by priority class")
+metrics.gauge("scheduler_active", "Research calls holding a scheduler slot, by priority class")
+metrics.histogram("rerank_dropped", "Candidate sources dropped by reranking (duplicates, low score, over budget)", COUNT_BUCKETS)
+metrics.histogram("llm_batch_size", "Summaries per micro-batched LLM call", COUNT_BUCKETS)
+metrics.counter("llm_batch_fallbacks_total", "Batched summaries the model skipped and that were re-asked on their own")
+metrics.histogram("watchlist_new_articles", "New articles summarized per watchlist account run", COUNT_BUCKETS)
+metrics.histogram("llm_tier_seconds", "Azure OpenAI call time per model tier (small / large)", LATENCY_BUCKETS)
+metrics.counter("llm_tier_tokens_total", "LLM tokens per model tier and kind (prompt / completion)")
+metrics.counter("llm_route_total", "Summaries routed per tool, model tier and routing reason")
+metrics.counter("llm_escalations_total", "Small-model answers re-asked on the large model, by reason")
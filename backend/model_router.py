@@ -0,0 +1,117 @@
+import re
+import threading
+
+from backend.rerank import source_tokens
+
+# =================================================
+# DEFAULTS
+# =================================================
+SMALL = "small"
+LARGE = "large"
+
+# Contexts up to this size are easy enough for the small deployment
+DEFAULT_MAX_SOURCES = 5
+DEFAULT_MAX_CONTEXT_TOKENS = 500
+# Tools that always use the large deployment (lead profiles need careful
+# disambiguation between people with the same name)
+DEFAULT_LARGE_TOOLS = ("lead",)
+# A small-model answer with fewer points than this is re-asked on the large one
+MIN_POINTS = 2
+
+# Words that signal snippets disagree or report unconfirmed claims
+_CONFLICT_CUE_RE = re.compile(
+    r"\b(however|denie[sd]|deny|disputed?|contradict\w*|conflicting|unconfirmed|rumou?r\w*|"
+    r"allegedly|reportedly|contrary|refuted?|disagree\w*)\b",
+    re.IGNORECASE
+)
+# Facts that should agree across sources when they describe the same company
+_FACT_RES = {
+    "founded": re.compile(r"\bfounded\s+(?:in\s+)?(\d{4})\b", re.IGNORECASE),
+    "employees": re.compile(r"\b(\d[\d,]*)\s*\+?\s*employees\b", re.IGNORECASE),
+    "headquarters": re.compile(r"\bheadquartered\s+in\s+([A-Z][a-zA-Z]+)"),
+}
+
+
+def conflicting_snippets(results: list):
+    """True when the snippets look like they disagree with each other."""
+    texts = [f"{r.title} {r.snippet}" for r in results]
+
+    cued = sum(1 for text in texts if _CONFLICT_CUE_RE.search(text))
+    if cued >= 2:
+        return True
+
+    for pattern in _FACT_RES.values():
+        values = {match.replace(",", "").lower() for text in texts for match in pattern.findall(text)}
+        if len(values) > 1:
+            return True
+    return False
+
+
+# =================================================
+# TWO-TIER MODEL ROUTER
+# =================================================
+class ModelRouter:
+    """
+    Picks the deployment for a summary: the small (fast, cheap) one for
+    short, unambiguous contexts and the large one when a heuristic says the
+    task is hard. Answers from the small deployment that fail to parse are
+    escalated with needs_escalation().
+
+    With no small deployment configured every call goes to the large one.
+    """
+
+    def __init__(self, large_deployment: str, small_deployment: str = None,
+                 max_sources: int = DEFAULT_MAX_SOURCES,
+                 max_context_tokens: int = DEFAULT_MAX_CONTEXT_TOKENS,
+                 large_tools=DEFAULT_LARGE_TOOLS):
+        self.deployments = {LARGE: large_deployment, SMALL: small_deployment or large_deployment}
+        self.enabled = bool(small_deployment) and small_deployment != large_deployment
+        self.max_sources = max_sources
+        self.max_context_tokens = max_context_tokens
+        self.large_tools = frozenset(large_tools)
+
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def deployment(self, tier: str):
+        return self.deployments[tier]
+
+    def _record(self, key):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def route(self, tool: str, results: list):
+        """(tier, reason) for summarizing `results` with `tool`."""
+        if not self.enabled:
+            tier, reason = LARGE, "single_model"
+        elif tool in self.large_tools:
+            tier, reason = LARGE, tool
+        elif len(results) > self.max_sources:
+            tier, reason = LARGE, "many_sources"
+        elif sum(source_tokens(r) for r in results) > self.max_context_tokens:
+            tier, reason = LARGE, "long_context"
+        elif conflicting_snippets(results):
+            tier, reason = LARGE, "conflicting_sources"
+        else:
+            tier, reason = SMALL, "simple"
+
+        self._record(f"{tier}:{reason}")
+        return tier, reason
+
+    def needs_escalation(self, points: list, source_count: int):
+        """Reason to re-ask a small-model answer on the large deployment, or None."""
+        if len(points) < min(MIN_POINTS, source_count or MIN_POINTS):
+            return "parse_failure"
+        if source_count and not any(p["sources"] for p in points):
+            return "no_citations"
+        return None
+
+    def escalated(self, reason: str):
+        self._record(f"escalated:{reason}")
+
+    def stats(self):
+        with self._lock:
+            snapshot = {"decisions": dict(self._stats)}
+        snapshot["enabled"] = self.enabled
+        snapshot["deployments"] = dict(self.deployments)
+        return snapshot
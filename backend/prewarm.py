@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# =================================================
+# DEFAULTS
+# =================================================
+# Off-peak window (local time) in which the daily prewarm run starts
+DEFAULT_AT = "05:30"
+DEFAULT_WINDOW_HOURS = 3.0
+DEFAULT_POLL = 60.0
+
+TOOLS = ("company", "news", "lead")
+
+
+def _cell(row: dict, *names):
+    for name in names:
+        value = row.get(name)
+        if isinstance(value, str) and value.strip():
+            return " ".join(value.split())
+    return ""
+
+
+def target_items(rows):
+    """
+    Research items for a list of CRM rows. A row is either an explicit item
+    ({"tool": "lead", "query": "..."}) or an account, optionally with a
+    contact ({"company": "Acme", "person": "Jane Doe"}): company profile and
+    news for the account plus a lead profile per contact, with the same
+    queries /api/brief uses. Duplicates are dropped, order is kept.
+    """
+    items, seen = [], set()
+
+    def _add(tool, query):
+        key = (tool, query.lower())
+        if query and key not in seen:
+            seen.add(key)
+            items.append({"tool": tool, "query": query})
+
+    for row in rows or []:
+        if isinstance(row, str):
+            row = {"company": row}
+        if not isinstance(row, dict):
+            continue
+
+        tool = _cell(row, "tool").lower()
+        if tool:
+            if tool not in TOOLS:
+                raise ValueError(f"Unknown tool '{tool}' (expected one of {sorted(TOOLS)})")
+            _add(tool, _cell(row, "query"))
+            continue
+
+        company = _cell(row, "company", "account", "account_name", "name")
+        person = _cell(row, "person", "lead", "contact", "contact_name")
+        if company:
+            _add("company", company)
+            _add("news", company)
+        if person:
+            _add("lead", f"{person} {company}".strip())
+    return items
+
+
+def load_targets(path: str):
+    """Research items from a CRM export: CSV with a header row, or JSON (a list, or {"accounts": [...]})."""
+    with open(path, encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            return target_items(csv.DictReader(f))
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get("accounts") or data.get("targets") or data.get("items") or []
+    return target_items(data)
+
+
+def parse_time(value: str):
+    hours, _, minutes = (value or DEFAULT_AT).partition(":")
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time of day '{value}' (expected HH:MM)")
+    return hours, minutes
+
+
+# =================================================
+# PREWARM SCHEDULER
+# =================================================
+class PrewarmScheduler:
+    """
+    Once a day, inside the off-peak window starting at `at` (local time),
+    loads the target accounts from `targets_path` and hands their research
+    items to `submit(items)`, which returns a job id. The actual work runs
+    as a bulk job, so it gets that job's bounded concurrency, rate limits,
+    retries and restart resume.
+
+    The last run is kept in `state_path`, so a restart inside the window
+    does not start a second run the same day.
+    """
+
+    def __init__(self, targets_path, submit, at: str = DEFAULT_AT,
+                 window_hours: float = DEFAULT_WINDOW_HOURS, state_path=None):
+        self.targets_path = targets_path
+        self.submit = submit
+        self.at = parse_time(at)
+        self.window = window_hours * 60 * 60
+        self.state_path = state_path
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = self._read_state()
+
+    def _read_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"last_run": None, "job_id": None, "items": 0}
+
+    def _write_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self.state_path)
+
+    def window_start(self, now: float = None):
+        """Start of the most recent off-peak window (epoch seconds)."""
+        current = datetime.fromtimestamp(time.time() if now is None else now)
+        start = current.replace(hour=self.at[0], minute=self.at[1], second=0, microsecond=0)
+        if start > current:
+            start -= timedelta(days=1)
+        return start.timestamp()
+
+    def due(self, now: float = None):
+        now = time.time() if now is None else now
+        start = self.window_start(now)
+        if now >= start + self.window:
+            return False
+        # Another worker may have run it already: the state file is shared
+        with self._lock:
+            if self.state_path:
+                self._state = self._read_state()
+            last_run = self._state.get("last_run")
+        return last_run is None or last_run < start
+
+    def run_now(self, items: list = None):
+        """Submit a prewarm job now (for `items`, or everything in the targets file). Returns the job id."""
+        if items is None:
+            if not self.targets_path or not os.path.exists(self.targets_path):
+                raise ValueError("No prewarm targets file configured (PREWARM_FILE)")
+            items = load_targets(self.targets_path)
+        if not items:
+            raise ValueError("No prewarm targets")
+
+        job_id = self.submit(items)
+        with self._lock:
+            self._state = {"last_run": time.time(), "job_id": job_id, "items": len(items)}
+            self._write_state()
+        print(f"Prewarm job {job_id} started for {len(items)} items")
+        return job_id
+
+    def start(self, poll: float = DEFAULT_POLL):
+        """Background thread that checks every `poll` seconds whether the daily run is due."""
+        if self._thread is not None or not self.targets_path:
+            return
+
+        def _loop():
+            while not self._stop.wait(poll):
+                try:
+                    if self.due():
+                        self.run_now()
+                except Exception as e:
+                    print(f"Prewarm scheduler error: {e}")
+
+        self._thread = threading.Thread(target=_loop, name="prewarm-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        next_run = now if self.due(now) else self.window_start(now) + 24 * 60 * 60
+        with self._lock:
+            state = dict(self._state)
+        return {
+            "targets": self.targets_path or None,
+            "scheduled": self._thread is not None,
+            "at": f"{self.at[0]:02d}:{self.at[1]:02d}",
+            "window_hours": self.window / 3600,
+            "next_run": next_run if self.targets_path else None,
+            **state,
+        }
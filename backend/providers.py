@@ -0,0 +1,259 @@
+import hashlib
+import os
+import threading
+
+# =================================================
+# SHARED PROVIDER REGISTRY
+# =================================================
+# Every module (Flask app, ASGI app, backend/tools, batch workers) gets its
+# settings, LLM client and caches from here. Nothing is built until first
+# use, and LangChain is only imported when the LLM is actually needed.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUIRED_ENV = (
+    "AZURE_OPENAI_ENDPOINT",
+    "OPENAI_API_KEY",
+    "OPENAI_API_VERSION",
+    "OPENAI_MODEL_NAME",
+    "SERPER_API_KEY",
+)
+
+_lock = threading.RLock()
+_env_loaded = False
+_settings = None
+_llms = {}
+_search_cache = None
+_llm_cache = None
+_source_index = None
+_result_cache = None
+_cassette = None
+_guards = {}
+
+# Default requests/second per provider; override with PROVIDER_RATE_LIMITS,
+# e.g. "serper=50,llm=10,serper:1a2b3c4d=20" (the suffix is key_id(api_key))
+DEFAULT_RATE_LIMITS = {"serper": 50.0, "llm": 10.0}
+PROVIDER_KEYS = {"serper": "SERPER_API_KEY", "llm": "OPENAI_API_KEY"}
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def env(name: str, default=None):
+    _load_env()
+    return os.getenv(name, default)
+
+
+def get_settings():
+    """Validated provider settings (raises ValueError if a required variable is missing)."""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _load_env()
+                settings = {name: os.getenv(name) for name in REQUIRED_ENV}
+                if not all(settings.values()):
+                    raise ValueError("❌ Missing environment variables")
+                settings["SERPER_BASE_URL"] = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
+                _settings = settings
+    return _settings
+
+
+def get_llm(deployment: str = None):
+    """The shared AzureChatOpenAI client (temperature=0) for a deployment (default OPENAI_MODEL_NAME)."""
+    deployment = deployment or get_settings()["OPENAI_MODEL_NAME"]
+    llm = _llms.get(deployment)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(deployment)
+            if llm is None:
+                from langchain_openai import AzureChatOpenAI
+
+                settings = get_settings()
+                clients = {}
+                cassette = get_cassette()
+                if cassette is not None:
+                    import httpx
+                    from backend.cassette import httpx_async_transport, httpx_transport
+
+                    clients = {
+                        "http_client": httpx.Client(transport=httpx_transport(cassette)),
+                        "http_async_client": httpx.AsyncClient(transport=httpx_async_transport(cassette)),
+                    }
+                llm = AzureChatOpenAI(
+                    azure_endpoint=settings["AZURE_OPENAI_ENDPOINT"],
+                    api_key=settings["OPENAI_API_KEY"],
+                    api_version=settings["OPENAI_API_VERSION"],
+                    deployment_name=deployment,
+                    temperature=0,
+                    # The provider guard owns backoff: SDK retries would bypass its limiter and breaker
+                    max_retries=0,
+                    **clients
+                )
+                _llms[deployment] = llm
+    return llm
+
+
+def get_search_cache():
+    """Serper result cache (set SERPER_CACHE_PATH="" to keep it in memory only)."""
+    global _search_cache
+    if _search_cache is None:
+        with _lock:
+            if _search_cache is None:
+                from backend.search_cache import SearchCache
+
+                path = env("SERPER_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "serper.sqlite3"))
+                _search_cache = SearchCache(
+                    path=path or None,
+                    max_entries=int(env("SERPER_CACHE_SIZE", "1024")),
+                    ttls={
+                        "search": int(env("SERPER_CACHE_TTL_SEARCH", str(6 * 60 * 60))),
+                        "news": int(env("SERPER_CACHE_TTL_NEWS", str(15 * 60))),
+                    }
+                )
+    return _search_cache
+
+
+def get_llm_cache():
+    """LLM response cache (set LLM_CACHE_PATH="" to keep it in memory only)."""
+    global _llm_cache
+    if _llm_cache is None:
+        with _lock:
+            if _llm_cache is None:
+                from backend.llm_cache import LLMCache
+
+                path = env("LLM_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "llm.sqlite3"))
+                _llm_cache = LLMCache(
+                    path=path or None,
+                    max_entries=int(env("LLM_CACHE_SIZE", "512")),
+                    ttl=int(env("LLM_CACHE_TTL", str(24 * 60 * 60))),
+                    similarity=float(env("LLM_CACHE_SIMILARITY", "0.75"))
+                )
+    return _llm_cache
+
+
+def get_source_index():
+    """Local full-text index of retrieved sources (set SOURCE_INDEX_PATH="" to keep it in memory only)."""
+    global _source_index
+    if _source_index is None:
+        with _lock:
+            if _source_index is None:
+                from backend.source_index import SourceIndex
+
+                path = env("SOURCE_INDEX_PATH", os.path.join(BASE_DIR, ".cache", "sources.sqlite3"))
+                _source_index = SourceIndex(
+                    path=path or None,
+                    max_ages={
+                        "search": int(env("SOURCE_INDEX_MAX_AGE_SEARCH", str(3 * 24 * 60 * 60))),
+                        "news": int(env("SOURCE_INDEX_MAX_AGE_NEWS", str(60 * 60))),
+                    },
+                    min_results=int(env("SOURCE_INDEX_MIN_RESULTS", "3")),
+                    retention=int(env("SOURCE_INDEX_RETENTION", str(30 * 24 * 60 * 60))),
+                    max_documents=int(env("SOURCE_INDEX_MAX_DOCUMENTS", "100000"))
+                )
+    return _source_index
+
+
+def get_result_cache():
+    """Finished research results with freshness metadata (set RESULT_CACHE_PATH="" to keep it in memory only)."""
+    global _result_cache
+    if _result_cache is None:
+        with _lock:
+            if _result_cache is None:
+                from backend.result_cache import ResultCache
+
+                path = env("RESULT_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "results.sqlite3"))
+                _result_cache = ResultCache(
+                    path=path or None,
+                    max_entries=int(env("RESULT_CACHE_SIZE", "2048")),
+                    ttls={
+                        "company": int(env("RESULT_TTL_COMPANY", str(24 * 60 * 60))),
+                        "lead": int(env("RESULT_TTL_LEAD", str(24 * 60 * 60))),
+                        "news": int(env("RESULT_TTL_NEWS", str(12 * 60 * 60))),
+                    }
+                )
+    return _result_cache
+
+
+def get_cassette():
+    """
+    Record/replay cassette for Serper and Azure OpenAI traffic, or None.
+    CASSETTE_PATH turns it on; CASSETTE_MODE is "replay" (default) or
+    "record"; CASSETTE_REALTIME scales the recorded delays (1 = recorded
+    speed, 0 = instant).
+    """
+    global _cassette
+    if _cassette is None:
+        path = env("CASSETTE_PATH", "")
+        if not path:
+            return None
+        with _lock:
+            if _cassette is None:
+                from backend.cassette import Cassette
+
+                _cassette = Cassette(
+                    path,
+                    mode=env("CASSETTE_MODE", "replay").lower(),
+                    realtime=float(env("CASSETTE_REALTIME", "0"))
+                )
+    return _cassette
+
+
+def worker_processes():
+    # WEB_CONCURRENCY is the worker count gunicorn / uvicorn are started with
+    return max(1, int(env("WEB_CONCURRENCY", "1") or 1))
+
+
+def key_id(api_key: str):
+    # Short fingerprint so limits and stats can name a key without exposing it
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+
+
+def get_guard(provider: str):
+    """Rate limiter + circuit breaker shared by every caller of `provider` ("serper" / "llm") with the current key."""
+    kid = key_id(get_settings()[PROVIDER_KEYS[provider]])
+    guard = _guards.get((provider, kid))
+    if guard is None:
+        with _lock:
+            guard = _guards.get((provider, kid))
+            if guard is None:
+                from backend.resilience import AdaptiveTokenBucket, CircuitBreaker, ProviderGuard, parse_limits
+
+                limits = parse_limits(env("PROVIDER_RATE_LIMITS", ""))
+                rate = limits.get(f"{provider}:{kid}", limits.get(provider, DEFAULT_RATE_LIMITS[provider]))
+                # Limits are per key: every worker process gets an equal share
+                guard = ProviderGuard(
+                    provider,
+                    AdaptiveTokenBucket(rate / worker_processes()),
+                    CircuitBreaker(
+                        failure_threshold=int(env("BREAKER_FAILURES", "5")),
+                        cooldown=float(env("BREAKER_COOLDOWN", "30"))
+                    ),
+                    max_wait=float(env("PROVIDER_MAX_WAIT", "5")),
+                    attempts=int(env("PROVIDER_ATTEMPTS", "2"))
+                )
+                _guards[(provider, kid)] = guard
+    return guard
+
+
+def guard_stats():
+    return {f"{provider}:{kid}": guard.stats() for (provider, kid), guard in list(_guards.items())}
+
+
+def reset():
+    """Forget every built instance so the next call rebuilds it from the current environment."""
+    global _settings, _search_cache, _llm_cache, _source_index, _result_cache, _cassette
+    with _lock:
+        _settings = None
+        _cassette = None
+        _llms.clear()
+        _search_cache = None
+        _llm_cache = None
+        _source_index = None
+        _result_cache = None
+        _guards.clear()
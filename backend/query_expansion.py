@@ -0,0 +1,85 @@
+from backend.results import canonical_url
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_VARIANTS = 4
+# Reciprocal-rank fusion constant: larger values flatten the gap between ranks
+RRF_K = 60
+
+
+# =================================================
+# QUERY VARIANTS
+# =================================================
+def expand_query(tool: str, query: str, max_variants: int = DEFAULT_VARIANTS):
+    """
+    Search queries for one research question, most important first. The
+    first variant is the query the tool has always sent, so max_variants=1
+    behaves exactly like a single search.
+    """
+    query = " ".join((query or "").split())
+
+    if tool == "lead":
+        if "@" in query:
+            variants = [
+                f"{query} professional profile",
+                f"{query} site:linkedin.com/in",
+                f"{query} role company",
+            ]
+        else:
+            variants = [
+                f"{query} profile CEO founder",
+                f"{query} site:linkedin.com/in",
+                f"{query} leadership team role",
+                f"{query} interview",
+            ]
+    elif tool == "news":
+        variants = [
+            query,
+            f"{query} funding",
+            f"{query} leadership",
+        ]
+    else:
+        variants = [
+            query,
+            f"{query} official site",
+            f"{query} funding investors",
+            f"{query} leadership team",
+            f"{query} site:linkedin.com/company",
+        ]
+
+    return variants[:max(1, max_variants)]
+
+
+# =================================================
+# RECIPROCAL-RANK FUSION
+# =================================================
+def reciprocal_rank_fusion(result_lists: list, limit: int = None, k: int = RRF_K):
+    """
+    Merge ranked result lists into one: each result scores sum(1 / (k + rank))
+    over the lists it appears in, so pages several variants agree on rise to
+    the top. Results are deduplicated by canonical URL; the first copy seen
+    (best rank, earliest variant) is kept.
+    """
+    scores, records = {}, {}
+    seen = [set() for _ in result_lists]
+    depth = max((len(results) for results in result_lists), default=0)
+
+    # Rank-major order, so ties keep round-robin order across the variants
+    for rank in range(depth):
+        for results, listed in zip(result_lists, seen):
+            if rank >= len(results):
+                continue
+            r = results[rank]
+            key = canonical_url(r.link) or f"title:{r.title}"
+            # A page listed twice by one variant only counts once
+            if key in listed:
+                continue
+            listed.add(key)
+            if key not in records:
+                records[key] = r
+                scores[key] = 0.0
+            scores[key] += 1.0 / (k + rank + 1)
+
+    fused = sorted(records, key=lambda key: -scores[key])
+    return [records[key] for key in fused[:limit]]
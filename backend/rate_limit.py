@@ -0,0 +1,100 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+
+
+# =================================================
+# TOKEN BUCKET RATE LIMITER
+# =================================================
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `rate` tokens are added per second up to `capacity`; acquire() blocks
+    until enough tokens are available. A rate of 0 (or less) disables
+    limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self, tokens: float = 1):
+        return self.wait_time(tokens) == 0
+
+    def wait_time(self, tokens: float = 1):
+        """Take `tokens` and return 0 if they are available, otherwise return the seconds to wait."""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: float = None):
+        """Block until `tokens` are available. Returns False if `timeout` runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.wait_time(tokens)
+            if wait == 0:
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# =================================================
+# PER-CALLER PROVIDER BUDGETS
+# =================================================
+# A budget is a TokenBucket per provider ("serper", "llm") that every real
+# call made inside `with provider_budgets(...)` also takes a token from
+# (ProviderGuard does this), on top of the shared per-key limit. Cache hits
+# and calls coalesced into someone else's flight take nothing.
+_budgets = contextvars.ContextVar("provider_budgets", default=None)
+
+
+@contextlib.contextmanager
+def provider_budgets(limiters: dict):
+    token = _budgets.set(limiters or None)
+    try:
+        yield
+    finally:
+        _budgets.reset(token)
+
+
+def provider_budget(provider: str):
+    """The current caller's TokenBucket for `provider`, or None."""
+    budgets = _budgets.get()
+    return budgets.get(provider) if budgets else None
+
+
+def take_budget(provider: str):
+    """Wait for a token from the current caller's budget for `provider` (if it has one)."""
+    budget = provider_budget(provider)
+    if budget is not None:
+        budget.acquire()
+
+
+async def take_budget_async(provider: str):
+    budget = provider_budget(provider)
+    while budget is not None:
+        wait = budget.wait_time()
+        if not wait:
+            return
+        await asyncio.sleep(wait)
@@ -0,0 +1,103 @@
+import numpy as np
+
+from backend.llm_cache import tokenize
+from backend.results import MAX_SNIPPET_CHARS, MAX_TITLE_CHARS, canonical_url, truncate
+from backend.tokens import count_tokens
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_TOP_K = 5
+DEFAULT_TOKEN_BUDGET = 600
+# Cosine similarity above which two snippets count as the same story
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+# Small bonus for Serper's own ordering, so ties keep the search engine's ranking
+RANK_WEIGHT = 0.1
+# Labels ("SOURCE n:", "Title:", "Snippet:", "URL:") per formatted source
+SOURCE_OVERHEAD_TOKENS = 12
+
+
+def source_tokens(result):
+    # Size of the source as build_context() writes it (title / snippet truncated)
+    text = " ".join((
+        truncate(result.title, MAX_TITLE_CHARS),
+        truncate(result.snippet, MAX_SNIPPET_CHARS),
+        getattr(result, "date", None) or "",
+        result.link,
+    ))
+    return count_tokens(text) + SOURCE_OVERHEAD_TOKENS
+
+
+def tfidf_matrix(documents: list, query: str):
+    """L2-normalised TF-IDF rows for the documents plus the query vector."""
+    tokens = [tokenize(doc) for doc in documents]
+    query_tokens = tokenize(query)
+
+    vocabulary = {}
+    for words in tokens + [query_tokens]:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+    if not vocabulary:
+        return np.zeros((len(documents), 0)), np.zeros(0)
+
+    counts = np.zeros((len(documents) + 1, len(vocabulary)))
+    for row, words in enumerate(tokens + [query_tokens]):
+        for word in words:
+            counts[row, vocabulary[word]] += 1
+
+    # Smoothed IDF over the candidate documents only
+    doc_counts = counts[:-1]
+    df = np.count_nonzero(doc_counts, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1.0
+    weighted = counts * idf
+
+    norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+    weighted = weighted / np.where(norms == 0, 1.0, norms)
+    return weighted[:-1], weighted[-1]
+
+
+# =================================================
+# RERANK + CONTEXT BUDGET
+# =================================================
+def rerank(query: str, results: list, top_k: int = DEFAULT_TOP_K,
+           token_budget: int = DEFAULT_TOKEN_BUDGET,
+           duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD):
+    """
+    Score Serper results against the query with TF-IDF cosine similarity,
+    drop near-duplicates and keep the best ones that fit `token_budget`.
+
+    Returns the selected results, best first. The first result is always
+    kept, even if it alone exceeds the budget.
+    """
+    if not results:
+        return []
+
+    documents = [f"{r.title} {r.snippet}" for r in results]
+    matrix, query_vector = tfidf_matrix(documents, query)
+
+    positions = np.arange(len(results))
+    prior = RANK_WEIGHT * (1.0 - positions / len(results))
+    scores = matrix @ query_vector + prior if matrix.shape[1] else prior
+    similarity = matrix @ matrix.T if matrix.shape[1] else np.zeros((len(results), len(results)))
+
+    selected, seen_links = [], set()
+    used_tokens = 0
+    for i in np.argsort(-scores, kind="stable"):
+        if len(selected) >= top_k:
+            break
+
+        link = canonical_url(results[i].link)
+        if link and link in seen_links:
+            continue
+        if selected and similarity[i, selected].max() >= duplicate_threshold:
+            continue
+
+        cost = source_tokens(results[i])
+        if selected and used_tokens + cost > token_budget:
+            continue
+
+        selected.append(int(i))
+        seen_links.add(link)
+        used_tokens += cost
+
+    return [results[i] for i in selected]
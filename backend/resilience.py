@@ -0,0 +1,275 @@
+import asyncio
+import email.utils
+import threading
+import time
+
+from backend.metrics import metrics
+from backend.rate_limit import TokenBucket, take_budget, take_budget_async
+
+# =================================================
+# DEFAULTS
+# =================================================
+BACKOFF_FACTOR = 0.5        # rate multiplier after a 429
+RECOVERY_STEP = 0.05        # fraction of the configured rate regained per success
+MIN_RATE_FRACTION = 0.1     # never back off below this fraction of the configured rate
+PROBE_POLL = 0.25           # how often callers re-check a half-open breaker
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """A call could not go out within the wait budget (breaker open or limiter saturated)."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} unavailable, retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After value (delta-seconds or HTTP date), or None."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def retry_after_from_headers(headers):
+    # Azure OpenAI also sends the finer-grained retry-after-ms
+    if not headers:
+        return None
+    headers = {str(k).lower(): v for k, v in headers.items()}
+    millis = headers.get("retry-after-ms")
+    if millis is not None:
+        seconds = parse_retry_after(millis)
+        if seconds is not None:
+            return seconds / 1000.0
+    return parse_retry_after(headers.get("retry-after"))
+
+
+def error_details(error):
+    """(status_code, headers) carried by an SDK / HTTP exception, if any."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None)
+    return status, headers
+
+
+# =================================================
+# ADAPTIVE TOKEN BUCKET (AIMD)
+# =================================================
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    TokenBucket whose rate halves on every 429 and creeps back towards the
+    configured rate on success, so throughput settles just under the
+    provider's real limit instead of oscillating into a retry storm.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = None):
+        super().__init__(rate, capacity)
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate * MIN_RATE_FRACTION
+
+    def _set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def throttled(self):
+        if self.max_rate > 0:
+            self._set_rate(max(self.min_rate, self.rate * BACKOFF_FACTOR))
+
+    def succeeded(self):
+        if 0 < self.rate < self.max_rate:
+            self._set_rate(min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP))
+
+
+# =================================================
+# CIRCUIT BREAKER
+# =================================================
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures (or right
+    away when the provider sends Retry-After); open -> half_open once the
+    cooldown / Retry-After has passed; half_open lets a single probe through
+    and closes again on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """0 if a call may go out now, otherwise the seconds to wait before asking again."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    return self._open_until - now
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                # A probe that never reported back (e.g. an abandoned stream) expires after the cooldown
+                if self._probing and now - self._probe_started < self.cooldown:
+                    return PROBE_POLL
+                self._probing = True
+                self._probe_started = now
+            return 0
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self, retry_after: float = None):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if retry_after is not None or self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = OPEN
+                self._open_until = time.monotonic() + (retry_after if retry_after is not None else self.cooldown)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self._failures,
+                "retry_in": round(max(0.0, self._open_until - time.monotonic()), 2) if self.state == OPEN else 0,
+            }
+
+
+# =================================================
+# PROVIDER GUARD (LIMITER + BREAKER)
+# =================================================
+class ProviderGuard:
+    """
+    Shared gate in front of one provider key.
+
+    acquire() queues the caller for up to `max_wait` seconds while the
+    limiter refills or the breaker is open, then raises ProviderUnavailable
+    so the caller can fall back to a stale cache entry. A caller with a
+    provider budget (bulk jobs) first waits for a token of its own. record() feeds the
+    outcome of each call back into both. call() makes up to `attempts`
+    tries, retrying only after a 429 (SDK clients should not retry on their
+    own, or the limiter never sees those calls).
+    """
+
+    def __init__(self, provider: str, limiter: AdaptiveTokenBucket, breaker: CircuitBreaker,
+                 max_wait: float = 5.0, attempts: int = 2):
+        self.provider = provider
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self.attempts = max(1, attempts)
+
+    def _reserve(self):
+        # Limiter first: a half-open probe slot is never held while waiting for tokens
+        return self.limiter.wait_time() or self.breaker.check()
+
+    def _next_wait(self, deadline):
+        wait = self._reserve()
+        if wait and wait > deadline - time.monotonic():
+            metrics.inc("provider_calls_total", provider=self.provider, outcome="rejected")
+            raise ProviderUnavailable(self.provider, wait)
+        return wait
+
+    def acquire(self):
+        take_budget(self.provider)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._next_wait(deadline)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        await take_budget_async(self.provider)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._next_wait(deadline)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def record(self, status: int = None, headers=None, error: bool = False):
+        retry_after = retry_after_from_headers(headers)
+        if status == 429:
+            self.limiter.throttled()
+            self.breaker.record_failure(retry_after)
+            outcome = "throttled"
+        elif error or (status is not None and status >= 500):
+            self.breaker.record_failure(retry_after if status == 503 else None)
+            outcome = "error"
+        else:
+            # Other 4xx (bad key, bad request) say nothing about provider health
+            self.limiter.succeeded()
+            self.breaker.record_success()
+            outcome = "ok"
+        metrics.inc("provider_calls_total", provider=self.provider, outcome=outcome)
+
+    def record_error(self, error):
+        status, headers = error_details(error)
+        self.record(status, headers, error=status is None)
+
+    def _retry(self, error, attempt):
+        # Records the failure; True if it was a 429 and there are tries left
+        self.record_error(error)
+        return error_details(error)[0] == 429 and attempt + 1 < self.attempts
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.attempts):
+            # After a 429 this waits out the (halved) rate or a short Retry-After
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if self._retry(e, attempt):
+                    continue
+                raise
+            self.record()
+            return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        for attempt in range(self.attempts):
+            await self.acquire_async()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if self._retry(e, attempt):
+                    continue
+                raise
+            self.record()
+            return result
+
+    def stats(self):
+        snapshot = self.breaker.stats()
+        snapshot["rate"] = round(self.limiter.rate, 3)
+        snapshot["max_rate"] = self.limiter.max_rate
+        return snapshot
+
+
+def parse_limits(spec: str):
+    """"serper=50,llm=10,serper:1a2b3c4d=20" -> {"serper": 50.0, ...}"""
+    limits = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if sep and name.strip():
+            limits[name.strip()] = float(value)
+    return limits
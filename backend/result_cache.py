@@ -0,0 +1,243 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.search_cache import normalize_query
+from backend.storage import connect
+
+# =================================================
+# DEFAULTS
+# =================================================
+# How long a stored research result is served as-is
+DEFAULT_TTLS = {
+    "company": 24 * 60 * 60,
+    "lead": 24 * 60 * 60,
+    "news": 12 * 60 * 60,
+}
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_REVALIDATE_WORKERS = 2
+DEFAULT_MAX_PENDING = 100
+
+
+def make_key(tool: str, query: str):
+    return f"{tool}|{normalize_query(query)}"
+
+
+# =================================================
+# RESEARCH RESULT CACHE (MEMORY LRU + SQLITE)
+# =================================================
+class ResultCache:
+    """
+    Finished research results (summary, sources, points) per tool and
+    normalized query, so a repeated lookup skips Serper and the LLM entirely.
+
+    Every entry carries freshness metadata: when it was stored, until when
+    it is fresh and where it came from ("prewarm" / "live" / "revalidate").
+    get() returns fresh entries, and with `max_stale` also entries at most
+    that many seconds past their freshness window, with that metadata under
+    "freshness" ("stale" tells the two apart).
+    """
+
+    def __init__(self, path=None, max_entries: int = DEFAULT_MAX_ENTRIES, ttls=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._stats = {"hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0,
+                       "evictions": 0, "writes": 0}
+
+        self._db = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS research_results (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    origin TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    def _ttl(self, tool: str):
+        return self.ttls.get(tool, DEFAULT_TTLS["company"])
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _lookup(self, key):
+        # Caller holds the lock. Returns ((stored_at, fresh_until, origin, result), from_disk)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry, False
+
+        if self._db is None:
+            return None, False
+
+        row = self._db.execute(
+            "SELECT stored_at, fresh_until, origin, payload FROM research_results WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None, False
+
+        entry = (row[0], row[1], row[2], json.loads(row[3]))
+        self._remember(key, entry)
+        return entry, True
+
+    @staticmethod
+    def _with_freshness(entry, now):
+        stored_at, fresh_until, origin, result = entry
+        result = dict(result)
+        result["freshness"] = {
+            "stored_at": stored_at,
+            "fresh_until": fresh_until,
+            "age": round(now - stored_at, 1),
+            "origin": origin,
+            "stale": now > fresh_until,
+        }
+        return result
+
+    def get(self, tool: str, query: str, max_stale: float = 0):
+        key = make_key(tool, query)
+        now = time.time()
+
+        with self._lock:
+            entry, from_disk = self._lookup(key)
+            if entry is not None:
+                if now <= entry[1] + max_stale:
+                    self._stats["hits" if now <= entry[1] else "stale_hits"] += 1
+                    if from_disk:
+                        self._stats["disk_hits"] += 1
+                    return self._with_freshness(entry, now)
+                self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, tool: str, query: str, result: dict, origin: str = "live", ttl: float = None):
+        key = make_key(tool, query)
+        stored_at = time.time()
+        fresh_until = stored_at + (self._ttl(tool) if ttl is None else ttl)
+        result = {k: v for k, v in result.items() if k != "freshness"}
+        entry = (stored_at, fresh_until, origin, result)
+
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO research_results (key, tool, stored_at, fresh_until, origin, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, tool, stored_at, fresh_until, origin, json.dumps(result))
+                )
+                self._db.commit()
+            self._stats["writes"] += 1
+
+    def purge_expired(self, grace: float = 0):
+        """Drop entries that stopped being fresh more than `grace` seconds ago. Returns the number removed."""
+        cutoff = time.time() - grace
+        removed = 0
+
+        with self._lock:
+            for key, entry in list(self._memory.items()):
+                if entry[1] < cutoff:
+                    del self._memory[key]
+                    removed += 1
+            if self._db is not None:
+                # Memory entries are copies of rows: count each entry once, as its row
+                removed = self._db.execute("DELETE FROM research_results WHERE fresh_until < ?", (cutoff,)).rowcount
+                self._db.commit()
+
+        return removed
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                snapshot["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM research_results").fetchone()[0]
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM research_results")
+                self._db.commit()
+
+
+# =================================================
+# BACKGROUND REVALIDATION
+# =================================================
+class Revalidator:
+    """
+    Bounded background refreshes for stale cache entries: `workers` threads,
+    at most one refresh per key at a time, and no more than `max_pending`
+    queued. A refresh that is skipped is simply asked for again by the next
+    stale hit.
+    """
+
+    def __init__(self, workers: int = DEFAULT_REVALIDATE_WORKERS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.max_pending = max_pending
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="revalidate")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._stats = {"scheduled": 0, "coalesced": 0, "skipped": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Refresh `key` with fn(*args, **kwargs) in the background. Returns whether it was scheduled."""
+        with self._lock:
+            if key in self._pending:
+                self._stats["coalesced"] += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self._stats["skipped"] += 1
+                return False
+            self._pending.add(key)
+            self._stats["scheduled"] += 1
+
+        try:
+            self._pool.submit(self._run, key, fn, args, kwargs)
+        except RuntimeError:
+            # Shutting down
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        return True
+
+    def _run(self, key, fn, args, kwargs):
+        outcome = "completed"
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            outcome = "failed"
+            print(f"Revalidation error for {key}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+                self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = len(self._pending)
+        return snapshot
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,175 @@
+import io
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# =================================================
+# COMPACT SEARCH RESULT RECORDS
+# =================================================
+# Serper results are held by caches, the source index, bulk jobs and every
+# in-flight request, so they use __slots__ instead of a per-result dict.
+# Records are read-only: caches hand the same instances to every caller.
+
+# Per-source limits in prompt contexts (Serper snippets are usually far shorter)
+MAX_TITLE_CHARS = 200
+MAX_SNIPPET_CHARS = 500
+
+
+class SearchResult:
+    __slots__ = ("title", "snippet", "link")
+    FIELDS = ("title", "snippet", "link")
+    endpoint = "search"
+
+    def __init__(self, title: str = "", snippet: str = "", link: str = ""):
+        object.__setattr__(self, "title", title or "")
+        object.__setattr__(self, "snippet", snippet or "")
+        object.__setattr__(self, "link", link or "")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    # Mapping-style access, so code written for the old result dicts
+    # (r["link"], r.get("date"), dict(r), json) keeps working
+    def keys(self):
+        return self.FIELDS
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def __eq__(self, other):
+        if isinstance(other, SearchResult):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    # Read-only, so copies (single-flight hands each caller one) can share it
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class NewsResult(SearchResult):
+    __slots__ = ("date",)
+    FIELDS = SearchResult.FIELDS + ("date",)
+    endpoint = "news"
+
+    def __init__(self, title: str = "", snippet: str = "", link: str = "", date: str = None):
+        super().__init__(title, snippet, link)
+        object.__setattr__(self, "date", date)
+
+
+def make_result(endpoint: str, item: dict):
+    """Record for one Serper organic / news item (or a stored result dict)."""
+    if isinstance(item, SearchResult):
+        return item
+    if endpoint == "news":
+        return NewsResult(item.get("title"), item.get("snippet"), item.get("link"), item.get("date"))
+    return SearchResult(item.get("title"), item.get("snippet"), item.get("link"))
+
+
+def make_results(endpoint: str, items):
+    return [make_result(endpoint, item) for item in items or []]
+
+
+# =================================================
+# LINKS
+# =================================================
+# Query parameters that only track the click, never change the page
+_TRACKING_PARAM_RE = re.compile(
+    r"^(utm_\w+|gclid|dclid|fbclid|msclkid|mc_cid|mc_eid|igshid|ref|ref_src|trk|trackingid|src)$",
+    re.IGNORECASE
+)
+
+
+def canonical_url(link: str):
+    """
+    Key for "is this the same page": scheme-insensitive, lowercase host
+    without "www.", no fragment, tracking parameters or trailing slash,
+    remaining query parameters sorted. Only used for comparing links;
+    results keep the URL Serper returned.
+    """
+    link = (link or "").strip()
+    try:
+        parts = urlsplit(link)
+        port = parts.port
+    except ValueError:
+        return link.rstrip("/")
+    if not parts.netloc:
+        return link.rstrip("/")
+
+    host = parts.hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    scheme = parts.scheme.lower()
+    if scheme in ("http", "https"):
+        scheme = "https"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                    if not _TRACKING_PARAM_RE.match(k))
+    return urlunsplit((scheme, host, path, urlencode(params), ""))
+
+
+# =================================================
+# PROMPT CONTEXT
+# =================================================
+def truncate(text: str, limit: int):
+    # Cut at a word boundary so the model never sees half a word
+    text = text or ""
+    if limit is None or len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip() + "…"
+
+
+def write_context(out, results, label: str = "SOURCE", max_snippet_chars: int = MAX_SNIPPET_CHARS):
+    """
+    Write numbered sources into the file-like `out`:
+
+        SOURCE 1:
+        Title: ...
+        Snippet: ...
+        Date: ...      (news results only)
+        URL: ...
+
+    Each piece is written straight into the buffer, so building a context
+    is linear in its size however many results there are.
+    """
+    for idx, r in enumerate(results, 1):
+        if idx > 1:
+            out.write("\n\n")
+        out.write(label)
+        out.write(f" {idx}:\nTitle: ")
+        out.write(truncate(r.title, MAX_TITLE_CHARS))
+        out.write("\nSnippet: ")
+        out.write(truncate(r.snippet, max_snippet_chars))
+        if isinstance(r, NewsResult):
+            out.write("\nDate: ")
+            out.write(r.date or "")
+        out.write("\nURL: ")
+        out.write(r.link)
+
+
+def build_context(results, label: str = "SOURCE", max_snippet_chars: int = MAX_SNIPPET_CHARS):
+    out = io.StringIO()
+    write_context(out, results, label, max_snippet_chars)
+    return out.getvalue().strip()
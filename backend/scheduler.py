@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+
+from backend.metrics import metrics
+
+# =================================================
+# PRIORITY CLASSES
+# =================================================
+INTERACTIVE = "interactive"   # reps waiting on a response
+BULK = "bulk"                 # enrichment jobs
+BACKGROUND = "background"     # prewarm, revalidation, watchlists
+PRIORITIES = (INTERACTIVE, BULK, BACKGROUND)
+
+DEFAULT_CAPACITY = 32
+# Most lookups of each class that may run at once
+DEFAULT_LIMITS = {INTERACTIVE: 32, BULK: 4, BACKGROUND: 2}
+# Fair-share weights: a free slot goes to the waiting class with the fewest
+# running lookups per unit of weight
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, BULK: 2, BACKGROUND: 1}
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "granted", "event", "loop", "future")
+
+    def __init__(self, priority, loop=None, future=None):
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.event = None if future is not None else threading.Event()
+        self.loop = loop
+        self.future = future
+
+
+# =================================================
+# PRIORITY SCHEDULER
+# =================================================
+class PriorityScheduler:
+    """
+    Admission control for research lookups shared by threads and asyncio.
+
+    At most `capacity` lookups run at once, and at most `limits[class]` of
+    each priority class. Waiters queue per class (FIFO); when a slot frees
+    up it goes to the eligible class with the lowest running / weight, so
+    interactive requests are served first without starving bulk work.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, limits=None, weights=None):
+        self.capacity = capacity
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+
+        self._lock = threading.Lock()
+        self._queues = {p: deque() for p in PRIORITIES}
+        self._active = {p: 0 for p in PRIORITIES}
+        self._stats = {p: {"admitted": 0, "waited": 0} for p in PRIORITIES}
+
+    def _check(self, priority):
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of {list(PRIORITIES)})")
+
+    def _pick(self):
+        best, best_share = None, None
+        for priority in PRIORITIES:
+            if not self._queues[priority] or self._active[priority] >= self.limits[priority]:
+                continue
+            # Share the class would have after this grant
+            share = (self._active[priority] + 1) / max(self.weights[priority], 1e-9)
+            if best is None or share < best_share:
+                best, best_share = priority, share
+        return best
+
+    def _dispatch(self):
+        # Caller holds the lock
+        while sum(self._active.values()) < self.capacity:
+            priority = self._pick()
+            if priority is None:
+                return
+            waiter = self._queues[priority].popleft()
+            waiter.granted = True
+            self._active[priority] += 1
+            self._stats[priority]["admitted"] += 1
+
+            waited = time.perf_counter() - waiter.enqueued
+            if waited > 0.001:
+                self._stats[priority]["waited"] += 1
+            metrics.observe("scheduler_wait_seconds", waited, priority=priority)
+
+            if waiter.future is not None:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+            else:
+                waiter.event.set()
+
+    def _enqueue(self, waiter):
+        with self._lock:
+            self._queues[waiter.priority].append(waiter)
+            self._dispatch()
+
+    def release(self, priority: str):
+        with self._lock:
+            self._active[priority] -= 1
+            self._dispatch()
+
+    def acquire(self, priority: str):
+        """Block until a slot of class `priority` is free. Pair with release()."""
+        self._check(priority)
+        waiter = _Waiter(priority)
+        self._enqueue(waiter)
+        waiter.event.wait()
+
+    async def acquire_async(self, priority: str):
+        self._check(priority)
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, loop, loop.create_future())
+        self._enqueue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Give the slot back if it was granted while we were being cancelled
+            with self._lock:
+                if waiter.granted:
+                    self._active[priority] -= 1
+                    self._dispatch()
+                else:
+                    self._queues[priority].remove(waiter)
+            raise
+
+    @contextlib.contextmanager
+    def slot(self, priority: str):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, priority: str):
+        await self.acquire_async(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "classes": {
+                    p: {
+                        "limit": self.limits[p],
+                        "weight": self.weights[p],
+                        "active": self._active[p],
+                        "queued": len(self._queues[p]),
+                        **self._stats[p],
+                    }
+                    for p in PRIORITIES
+                },
+            }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from backend.results import make_results
+from backend.storage import connect
+
+# =================================================
+# DEFAULTS
+# =================================================
+# Organic results (company / lead profiles) change slowly, news goes stale fast
+DEFAULT_TTLS = {
+    "search": 6 * 60 * 60,
+    "news": 15 * 60,
+}
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def normalize_query(query: str):
+    return " ".join((query or "").lower().split())
+
+
+def make_key(endpoint: str, query: str, num_results: int):
+    return f"{endpoint}|{num_results}|{normalize_query(query)}"
+
+
+# =================================================
+# SERPER RESULT CACHE (MEMORY LRU + SQLITE)
+# =================================================
+class SearchCache:
+    """
+    Two-tier cache for Serper results.
+
+    - memory: bounded LRU, checked first
+    - disk: SQLite file that survives restarts (skipped when path is None)
+
+    Entries expire per endpoint ("search" / "news") using `ttls`.
+    """
+
+    def __init__(self, path=None, max_entries: int = DEFAULT_MAX_ENTRIES, ttls=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stale_hits": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+        self._db = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS serper_cache (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    def _ttl(self, endpoint: str):
+        return self.ttls.get(endpoint, DEFAULT_TTLS["search"])
+
+    def _remember(self, key, stored_at, results):
+        self._memory[key] = (stored_at, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _lookup(self, key):
+        # Caller holds the lock. Expired rows are left in place (purge_expired()
+        # removes them) so get_stale() can still serve them during an outage.
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry, False
+
+        if self._db is None:
+            return None, False
+
+        row = self._db.execute(
+            "SELECT stored_at, payload FROM serper_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None, False
+
+        stored_at, payload = row
+        entry = (stored_at, make_results(key.split("|", 1)[0], json.loads(payload)))
+        self._remember(key, *entry)
+        return entry, True
+
+    def get(self, endpoint: str, query: str, num_results: int):
+        key = make_key(endpoint, query, num_results)
+        now = time.time()
+
+        with self._lock:
+            entry, from_disk = self._lookup(key)
+            if entry is not None:
+                stored_at, results = entry
+                if now - stored_at <= self._ttl(endpoint):
+                    self._stats["hits"] += 1
+                    if from_disk:
+                        self._stats["disk_hits"] += 1
+                    # Result records are read-only, so callers can share them
+                    return list(results)
+                self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def get_stale(self, endpoint: str, query: str, num_results: int):
+        """Last stored results regardless of TTL (fallback while Serper is unavailable)."""
+        key = make_key(endpoint, query, num_results)
+
+        with self._lock:
+            entry, _ = self._lookup(key)
+            if entry is None:
+                return None
+            self._stats["stale_hits"] += 1
+            return list(entry[1])
+
+    def set(self, endpoint: str, query: str, num_results: int, results: list):
+        key = make_key(endpoint, query, num_results)
+        stored_at = time.time()
+        results = make_results(endpoint, results)
+
+        with self._lock:
+            self._remember(key, stored_at, results)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO serper_cache (key, endpoint, stored_at, payload) VALUES (?, ?, ?, ?)",
+                    (key, endpoint, stored_at, json.dumps([r.to_dict() for r in results]))
+                )
+                self._db.commit()
+            self._stats["writes"] += 1
+
+    def purge_expired(self, grace: float = 0):
+        """
+        Drop rows that expired more than `grace` seconds ago from both tiers
+        (until then get_stale() can still serve them). Returns the number removed.
+        """
+        now = time.time()
+        removed = 0
+
+        with self._lock:
+            for key, (stored_at, _) in list(self._memory.items()):
+                endpoint = key.split("|", 1)[0]
+                if now - stored_at > self._ttl(endpoint) + grace:
+                    del self._memory[key]
+                    removed += 1
+
+            if self._db is not None:
+                # Memory entries are copies of rows: count each entry once, as its row
+                removed = 0
+                for endpoint in self.ttls:
+                    cursor = self._db.execute(
+                        "DELETE FROM serper_cache WHERE endpoint = ? AND stored_at < ?",
+                        (endpoint, now - self._ttl(endpoint) - grace)
+                    )
+                    removed += cursor.rowcount
+                self._db.commit()
+
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM serper_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["memory_entries"] = len(self._memory)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["ttls"] = dict(self.ttls)
+        return snapshot
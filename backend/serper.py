@@ -0,0 +1,155 @@
+import asyncio
+
+from backend.http_pool import get_async_client, get_session
+from backend.metrics import COUNT_BUCKETS, SIZE_BUCKETS, metrics
+from backend.providers import get_guard, get_search_cache, get_settings, get_source_index
+from backend.resilience import ProviderUnavailable
+from backend.results import make_results
+from backend.search_cache import normalize_query
+from backend.singleflight import AsyncSingleFlight, SingleFlight
+
+SERPER_ATTEMPTS = 2
+
+# Concurrent misses for the same search (every research path, the brief and
+# streams included, ends up here) share one Serper call
+serper_flights = SingleFlight()
+serper_flights_async = AsyncSingleFlight()
+
+def fetch_key(endpoint: str, query: str, num_results: int):
+    return ("serper", endpoint, normalize_query(query), num_results)
+
+# =================================================
+# SERPER SEARCH (SHARED BY THE APP AND backend/tools)
+# =================================================
+def serper_request(endpoint: str, query: str, num_results: int):
+    settings = get_settings()
+    url = f"{settings['SERPER_BASE_URL']}/{endpoint}"
+    headers = {
+        "X-API-KEY": settings["SERPER_API_KEY"],
+        "Content-Type": "application/json"
+    }
+    payload = {"q": query, "num": num_results}
+    return url, headers, payload
+
+def parse_serper_response(endpoint: str, query: str, num_results: int, response, tool: str = None):
+    # Works for both requests.Response and httpx.Response
+    label = "Serper news" if endpoint == "news" else "Serper search"
+
+    metrics.observe("serper_response_bytes", len(response.content), buckets=SIZE_BUCKETS, endpoint=endpoint)
+
+    # Debug logging: show status and small snippet when things go wrong
+    if response.status_code != 200:
+        metrics.inc("serper_requests_total", endpoint=endpoint, outcome=f"http_{response.status_code}")
+        print(f"{label} non-200 status: {response.status_code}, body: {response.text[:500]}")
+        return []
+
+    try:
+        data = response.json()
+    except Exception as e:
+        metrics.inc("serper_requests_total", endpoint=endpoint, outcome="invalid_json")
+        print(f"{label} JSON parse error: {e}, body: {response.text[:500]}")
+        return []
+
+    results = make_results(endpoint, data.get("news" if endpoint == "news" else "organic", []))
+
+    metrics.inc("serper_requests_total", endpoint=endpoint, outcome="ok" if results else "empty")
+    metrics.observe("serper_results", len(results), buckets=COUNT_BUCKETS, endpoint=endpoint)
+
+    if not results:
+        kind = "news" if endpoint == "news" else "organic"
+        print(f"{label} returned no {kind} results for query '{query}' (response keys: {list(data.keys())})")
+    else:
+        get_search_cache().set(endpoint, query, num_results, results)
+        get_source_index().add(endpoint, tool, query, results)
+
+    return results
+
+def stale_results(endpoint: str, query: str, num_results: int, reason):
+    # Provider is throttling or down: an old answer beats an empty one
+    stale = get_search_cache().get_stale(endpoint, query, num_results)
+    metrics.inc("cache_requests_total", cache="serper", result="stale" if stale is not None else "miss_stale")
+    if stale is not None:
+        print(f"Serving stale {endpoint} results for '{query}' ({reason})")
+        return stale
+    return []
+
+def serper_fetch(endpoint: str, query: str, num_results: int, tool: str = None):
+    cached = get_search_cache().get(endpoint, query, num_results)
+    metrics.inc("cache_requests_total", cache="serper", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    return serper_flights.do(fetch_key(endpoint, query, num_results), serper_call, endpoint, query, num_results, tool)
+
+def serper_call(endpoint: str, query: str, num_results: int, tool: str = None):
+    url, headers, payload = serper_request(endpoint, query, num_results)
+    guard = get_guard("serper")
+
+    # One retry after a 429: acquire() waits out a short Retry-After
+    for _ in range(SERPER_ATTEMPTS):
+        try:
+            guard.acquire()
+            with metrics.timer("serper_request_seconds", endpoint=endpoint):
+                response = get_session().post(url, headers=headers, json=payload, timeout=10)
+        except ProviderUnavailable as e:
+            return stale_results(endpoint, query, num_results, e)
+        except Exception as e:
+            guard.record(error=True)
+            metrics.inc("serper_requests_total", endpoint=endpoint, outcome="error")
+            print(f"{'News search' if endpoint == 'news' else 'Search'} error: {e}")
+            return stale_results(endpoint, query, num_results, e)
+
+        guard.record(response.status_code, response.headers)
+        if response.status_code != 429:
+            break
+
+    return serper_results(endpoint, query, num_results, response, tool)
+
+def serper_results(endpoint: str, query: str, num_results: int, response, tool: str = None):
+    results = parse_serper_response(endpoint, query, num_results, response, tool)
+    if response.status_code != 200:
+        return stale_results(endpoint, query, num_results, f"HTTP {response.status_code}")
+    return results
+
+async def serper_fetch_async(endpoint: str, query: str, num_results: int, tool: str = None):
+    # The cache, the source index and JSON parsing are blocking: they run in a worker thread
+    cached = await asyncio.to_thread(get_search_cache().get, endpoint, query, num_results)
+    metrics.inc("cache_requests_total", cache="serper", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    return await serper_flights_async.do(fetch_key(endpoint, query, num_results),
+                                         serper_call_async, endpoint, query, num_results, tool)
+
+async def serper_call_async(endpoint: str, query: str, num_results: int, tool: str = None):
+    url, headers, payload = serper_request(endpoint, query, num_results)
+    guard = get_guard("serper")
+
+    for _ in range(SERPER_ATTEMPTS):
+        try:
+            await guard.acquire_async()
+            with metrics.timer("serper_request_seconds", endpoint=endpoint):
+                response = await get_async_client().post(url, headers=headers, json=payload)
+        except ProviderUnavailable as e:
+            return await asyncio.to_thread(stale_results, endpoint, query, num_results, e)
+        except Exception as e:
+            guard.record(error=True)
+            metrics.inc("serper_requests_total", endpoint=endpoint, outcome="error")
+            print(f"{'News search' if endpoint == 'news' else 'Search'} error: {e}")
+            return await asyncio.to_thread(stale_results, endpoint, query, num_results, e)
+
+        guard.record(response.status_code, response.headers)
+        if response.status_code != 429:
+            break
+
+    return await asyncio.to_thread(serper_results, endpoint, query, num_results, response, tool)
+
+def serper_search(query: str, num_results: int = 5, tool: str = None):
+    return serper_fetch("search", query, num_results, tool)
+
+def serper_news_search(query: str, num_results: int = 5, tool: str = None):
+    return serper_fetch("news", query, num_results, tool)
+
+async def serper_search_async(query: str, num_results: int = 5, tool: str = None):
+    return await serper_fetch_async("search", query, num_results, tool)
+
+async def serper_news_search_async(query: str, num_results: int = 5, tool: str = None):
+    return await serper_fetch_async("news", query, num_results, tool)
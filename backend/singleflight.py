@@ -0,0 +1,308 @@
+import asyncio
+import copy
+import functools
+import threading
+
+from backend.search_cache import normalize_query
+
+
+# =================================================
+# SINGLE-FLIGHT (THREADS)
+# =================================================
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers that arrive while it is
+    in flight wait and receive a copy of the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stream(self, key, fn, *args, **kwargs):
+        """
+        Generator version of do() for fn(*args, **kwargs) returning an
+        iterator: callers that join while it runs get every item produced so
+        far and then the rest as they arrive. If the leader's consumer stops
+        early (a client disconnecting) while others are still reading, the
+        leader finishes the iterator for them before it returns.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = _Stream()
+                self._streams[key] = shared
+                self._stats["executed"] += 1
+            else:
+                self._stats["shared"] += 1
+            shared.readers += 1
+
+        if leader:
+            yield from self._lead(key, shared, fn(*args, **kwargs))
+        else:
+            yield from self._follow(shared)
+
+    def _lead(self, key, shared, source):
+        error = None
+        try:
+            for item in source:
+                shared.put(item)
+                yield item
+        except GeneratorExit:
+            with self._lock:
+                shared.readers -= 1
+                abandoned = not shared.readers
+                if abandoned:
+                    self._streams.pop(key, None)
+            if not abandoned:
+                try:
+                    # Keep producing for followers until they're done reading
+                    for item in source:
+                        shared.put(item)
+                        if not shared.readers:
+                            break
+                except Exception as e:
+                    error = e
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+            shared.finish(error)
+
+    def _follow(self, shared):
+        index = 0
+        try:
+            while True:
+                with shared.changed:
+                    while index >= len(shared.items) and not shared.done:
+                        shared.changed.wait()
+                    items, done = shared.items[index:], shared.done
+                index += len(items)
+                yield from items
+                if done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+        finally:
+            with self._lock:
+                shared.readers -= 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["in_flight"] = len(self._calls) + len(self._streams)
+        return snapshot
+
+
+class _Stream:
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.changed = threading.Condition()
+
+    def put(self, item):
+        with self.changed:
+            self.items.append(item)
+            self.changed.notify_all()
+
+    def finish(self, error=None):
+        with self.changed:
+            self.error = error
+            self.done = True
+            self.changed.notify_all()
+
+
+# =================================================
+# SINGLE-FLIGHT (ASYNCIO)
+# =================================================
+class _AsyncCall:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Same as SingleFlight for coroutines running on one event loop.
+
+    The call runs in its own task, so a caller that is cancelled (a client
+    disconnecting) leaves it running for the others; it is only cancelled
+    once every caller waiting on it has gone.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def _forget(self, table, key, entry):
+        if table.get(key) is entry:
+            del table[key]
+
+    async def do(self, key, fn, *args, **kwargs):
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            call = _AsyncCall(asyncio.ensure_future(fn(*args, **kwargs)))
+            self._calls[key] = call
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            call.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            call.task.add_done_callback(lambda t: self._forget(self._calls, key, call))
+            self._stats["executed"] += 1
+        else:
+            self._stats["shared"] += 1
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Last one out: later callers start over instead of joining a cancelled call
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+            raise
+        return result if leader else copy.deepcopy(result)
+
+    async def stream(self, key, fn, *args, **kwargs):
+        """Async generator version of SingleFlight.stream; fn(*args, **kwargs) is an async iterator."""
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _AsyncStream()
+            self._streams[key] = shared
+            shared.task = asyncio.ensure_future(self._pump(key, shared, fn(*args, **kwargs)))
+            self._stats["executed"] += 1
+        else:
+            self._stats["shared"] += 1
+
+        shared.readers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(shared.items):
+                    index += 1
+                    yield shared.items[index - 1]
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await shared.changed.wait()
+        finally:
+            shared.readers -= 1
+            if not shared.readers and not shared.done:
+                self._forget(self._streams, key, shared)
+                shared.task.cancel()
+
+    async def _pump(self, key, shared, source):
+        try:
+            async for item in source:
+                shared.items.append(item)
+                shared.wake()
+        except asyncio.CancelledError:
+            shared.error = asyncio.CancelledError()
+            raise
+        except BaseException as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            shared.wake()
+            self._forget(self._streams, key, shared)
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        snapshot["in_flight"] = len(self._calls) + len(self._streams)
+        return snapshot
+
+
+class _AsyncStream:
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def wake(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+# =================================================
+# DECORATORS FOR RESEARCH FUNCTIONS
+# =================================================
+def flight_key(tool: str, query: str, args=(), kwargs=None):
+    # Other arguments (local_first=...) can change the answer, so they're part of the key
+    return (tool, normalize_query(query), tuple(args), tuple(sorted((kwargs or {}).items())))
+
+
+def single_flight(group: SingleFlight, tool: str):
+    """Coalesce calls of fn(query, ...) that share the tool, normalized query and other arguments."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(query, *args, **kwargs):
+            return group.do(flight_key(tool, query, args, kwargs), fn, query, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def single_flight_async(group: AsyncSingleFlight, tool: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(query, *args, **kwargs):
+            return await group.do(flight_key(tool, query, args, kwargs), fn, query, *args, **kwargs)
+        return wrapper
+    return decorator
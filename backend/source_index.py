@@ -0,0 +1,206 @@
+import threading
+import time
+
+from backend.llm_cache import query_terms
+from backend.results import NewsResult, SearchResult, make_results
+from backend.storage import connect
+
+# =================================================
+# DEFAULTS
+# =================================================
+# How old indexed documents may be and still answer a query without Serper
+DEFAULT_MAX_AGES = {
+    "search": 3 * 24 * 60 * 60,
+    "news": 60 * 60,
+}
+DEFAULT_MIN_RESULTS = 3
+# prune() drops documents not seen for this long, then the oldest beyond the cap
+DEFAULT_RETENTION = 30 * 24 * 60 * 60
+DEFAULT_MAX_DOCUMENTS = 100_000
+
+
+def match_expression(query: str):
+    # Every query term must appear; prefix match so "trend" also finds "trends"
+    terms = sorted(query_terms(query))
+    if not terms:
+        return None
+    return " AND ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+# =================================================
+# LOCAL SOURCE INDEX (SQLITE FTS5)
+# =================================================
+class SourceIndex:
+    """
+    Full-text index of every Serper result the app has seen.
+
+    - sources: one row per (endpoint, link), refreshed whenever it is seen again
+    - source_fts: FTS5 index over title + snippet (external content)
+    - source_tags: which tool / query fetched each link, and when
+
+    lookup() returns the best fresh matches for a query, or None when the
+    index does not cover it well enough (fewer than `min_results` hits).
+    prune() keeps the index to `max_documents` seen within `retention` seconds.
+    """
+
+    def __init__(self, path=None, max_ages=None, min_results: int = DEFAULT_MIN_RESULTS,
+                 retention: float = DEFAULT_RETENTION, max_documents: int = DEFAULT_MAX_DOCUMENTS):
+        self.path = path
+        self.max_ages = dict(DEFAULT_MAX_AGES)
+        if max_ages:
+            self.max_ages.update(max_ages)
+        self.min_results = min_results
+        self.retention = retention
+        self.max_documents = max_documents
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "pruned": 0}
+
+        self._db = connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                id INTEGER PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                link TEXT NOT NULL,
+                title TEXT NOT NULL,
+                snippet TEXT NOT NULL,
+                date TEXT,
+                fetched_at REAL NOT NULL,
+                UNIQUE (endpoint, link)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS source_fts USING fts5(
+                title, snippet, content='sources', content_rowid='id'
+            );
+            CREATE TABLE IF NOT EXISTS source_tags (
+                source_id INTEGER NOT NULL,
+                tool TEXT NOT NULL,
+                query TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (source_id, tool, query)
+            );
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sources_fetched_at ON sources (fetched_at)")
+        self._db.commit()
+
+    def _max_age(self, endpoint: str):
+        return self.max_ages.get(endpoint, DEFAULT_MAX_AGES["search"])
+
+    def add(self, endpoint: str, tool: str, query: str, results: list):
+        """Index (or refresh) each result and tag it with the tool / query that fetched it."""
+        now = time.time()
+        query = " ".join((query or "").split())
+
+        with self._lock:
+            for r in make_results(endpoint, results):
+                link, title, snippet, date = r.link, r.title, r.snippet, getattr(r, "date", None)
+                if not link:
+                    continue
+
+                row = self._db.execute(
+                    "SELECT id, title, snippet FROM sources WHERE endpoint = ? AND link = ?",
+                    (endpoint, link)
+                ).fetchone()
+                if row is None:
+                    source_id = self._db.execute(
+                        "INSERT INTO sources (endpoint, link, title, snippet, date, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (endpoint, link, title, snippet, date, now)
+                    ).lastrowid
+                else:
+                    source_id, old_title, old_snippet = row
+                    # External-content FTS: remove the old text before indexing the new one
+                    self._db.execute(
+                        "INSERT INTO source_fts (source_fts, rowid, title, snippet) VALUES ('delete', ?, ?, ?)",
+                        (source_id, old_title, old_snippet)
+                    )
+                    self._db.execute(
+                        "UPDATE sources SET title = ?, snippet = ?, date = ?, fetched_at = ? WHERE id = ?",
+                        (title, snippet, date, now, source_id)
+                    )
+                self._db.execute(
+                    "INSERT INTO source_fts (rowid, title, snippet) VALUES (?, ?, ?)",
+                    (source_id, title, snippet)
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO source_tags (source_id, tool, query, fetched_at) VALUES (?, ?, ?, ?)",
+                    (source_id, tool or endpoint, query, now)
+                )
+            self._db.commit()
+            self._stats["writes"] += 1
+
+    def search(self, endpoint: str, query: str, limit: int = 5, max_age: float = None):
+        """Fresh documents matching every query term, best first (BM25)."""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        max_age = self._max_age(endpoint) if max_age is None else max_age
+
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT s.title, s.snippet, s.link, s.date
+                FROM source_fts JOIN sources s ON s.id = source_fts.rowid
+                WHERE source_fts MATCH ? AND s.endpoint = ? AND s.fetched_at >= ?
+                ORDER BY bm25(source_fts)
+                LIMIT ?
+                """,
+                (expression, endpoint, time.time() - max_age, limit)
+            ).fetchall()
+
+        if endpoint == "news":
+            return [NewsResult(title, snippet, link, date) for title, snippet, link, date in rows]
+        return [SearchResult(title, snippet, link) for title, snippet, link, _ in rows]
+
+    def lookup(self, endpoint: str, query: str, num_results: int = 5):
+        """Results for a well-covered query, or None if Serper should be asked instead."""
+        results = self.search(endpoint, query, limit=num_results)
+        with self._lock:
+            if len(results) < min(self.min_results, num_results):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+        return results
+
+    def prune(self):
+        """Drop documents older than `retention`, then the oldest beyond `max_documents`. Returns the number removed."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, title, snippet FROM sources WHERE fetched_at < ?",
+                (time.time() - self.retention,)
+            ).fetchall()
+            over = self._db.execute("SELECT COUNT(*) FROM sources").fetchone()[0] - len(rows) - self.max_documents
+            if over > 0:
+                rows += self._db.execute(
+                    "SELECT id, title, snippet FROM sources WHERE fetched_at >= ? ORDER BY fetched_at LIMIT ?",
+                    (time.time() - self.retention, over)
+                ).fetchall()
+
+            for source_id, title, snippet in rows:
+                self._db.execute(
+                    "INSERT INTO source_fts (source_fts, rowid, title, snippet) VALUES ('delete', ?, ?, ?)",
+                    (source_id, title, snippet)
+                )
+                self._db.execute("DELETE FROM source_tags WHERE source_id = ?", (source_id,))
+                self._db.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+            # Tags from old fetches of documents that are still indexed
+            self._db.execute("DELETE FROM source_tags WHERE fetched_at < ?", (time.time() - self.retention,))
+            self._db.commit()
+            self._stats["pruned"] += len(rows)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["documents"] = self._db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+            snapshot["tags"] = self._db.execute("SELECT COUNT(*) FROM source_tags").fetchone()[0]
+            snapshot["min_results"] = self.min_results
+            snapshot["max_documents"] = self.max_documents
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM source_tags")
+            self._db.execute("DELETE FROM sources")
+            self._db.execute("INSERT INTO source_fts (source_fts) VALUES ('delete-all')")
+            self._db.commit()
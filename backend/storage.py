@@ -0,0 +1,25 @@
+import os
+import sqlite3
+
+# =================================================
+# SQLITE CONNECTIONS
+# =================================================
+# Cache, index and watchlist databases are opened by every worker process
+# of a multi-worker deployment. WAL lets readers run while another process
+# writes, and the busy timeout makes a writer wait for the lock instead of
+# failing with "database is locked".
+
+BUSY_TIMEOUT = 10.0
+
+
+def connect(path=None):
+    """SQLite connection shared by the threads of one process (in-memory when path is empty)."""
+    if not path:
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
@@ -0,0 +1,122 @@
+import json
+import re
+
+# =================================================
+# OUTPUT FORMAT (JSON LINES)
+# =================================================
+# One JSON object per line streams well (a point can be shown as soon as its
+# line is complete) and survives micro-batching, where several answers share
+# one completion. `sources` are the 1-based SOURCE / NEWS numbers of the prompt.
+
+OUTPUT_INSTRUCTIONS = """Respond in JSON Lines: one JSON object per point, one point per line, nothing else.
+Each object has "text" (the point) and "sources" (the numbers of the sources it is based on).
+Example:
+{"text": "First point", "sources": [1, 3]}
+{"text": "Second point", "sources": [2]}"""
+
+MAX_POINTS = 5
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+# Plain-text fallback: "- point text [1, 2]" (bullet and citation both optional)
+_BULLET_RE = re.compile(r"^\s*(?:[-•*]|\d+[.)])?\s*(.*?)\s*(?:\[(\d+(?:\s*,\s*\d+)*)\])?\s*$")
+_INT_RE = re.compile(r"\d+")
+
+
+def _source_indices(value, source_count):
+    # 1-based numbers from the model -> validated 0-based indices into the sources list
+    if isinstance(value, (int, str)):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    indices = []
+    for number in value:
+        if isinstance(number, str):
+            number = int(number) if number.strip().isdigit() else 0
+        if isinstance(number, int) and not isinstance(number, bool) \
+                and 1 <= number <= (source_count or number) and number - 1 not in indices:
+            indices.append(number - 1)
+    return indices
+
+
+def _point(item, source_count):
+    """Validated {"text", "sources"} from a decoded JSON value, or None."""
+    if isinstance(item, str):
+        text, sources = item, []
+    elif isinstance(item, dict):
+        text = item.get("text") or item.get("point") or item.get("summary")
+        sources = item.get("sources") or item.get("source") or []
+    else:
+        return None
+    if not isinstance(text, str):
+        return None
+    text = text.strip().strip("-• ").strip()
+    if not text:
+        return None
+    return {"text": text, "sources": _source_indices(sources, source_count)}
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # Repair pass: smart quotes, trailing commas, unclosed brackets (truncated output)
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", text.translate(_SMART_QUOTES))
+    if repaired.count('"') % 2:
+        repaired += '"'
+    repaired += "]" * (repaired.count("[") - repaired.count("]"))
+    repaired += "}" * (repaired.count("{") - repaired.count("}"))
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        return None
+
+
+# =================================================
+# PARSER
+# =================================================
+def parse_point(line: str, source_count: int = None):
+    """One point from one line of model output (JSON object or plain bullet), or None."""
+    line = line.strip()
+    if not line or line.startswith("Question:") or line.startswith("```"):
+        return None
+
+    if line[0] == "{":
+        point = _point(_loads(line.rstrip(",")), source_count)
+        if point is not None:
+            return point
+        # Not recoverable as JSON: keep whatever "text" value is there
+        line = line.strip("{},")
+
+    match = _BULLET_RE.match(line)
+    text, cited = match.group(1), match.group(2)
+    return _point({"text": text, "sources": [int(n) for n in _INT_RE.findall(cited or "")]}, source_count)
+
+
+def parse_points(raw: str, source_count: int = None, max_points: int = MAX_POINTS):
+    """
+    All points from a completion: JSON Lines, a JSON array / {"points": [...]}
+    document, or plain bullets as a last resort. Never raises.
+    """
+    text = _FENCE_RE.sub("", (raw or "").strip())
+
+    # Whole-document JSON (some models ignore the JSON Lines instruction)
+    if text[:1] == "[" or (text[:1] == "{" and "\n{" not in text):
+        data = _loads(text)
+        if isinstance(data, dict):
+            data = data.get("points") or data.get("summary") or [data]
+        if isinstance(data, list):
+            points = [p for p in (_point(item, source_count) for item in data) if p]
+            if points:
+                return points[:max_points]
+
+    points = []
+    for line in text.split("\n"):
+        point = parse_point(line, source_count)
+        if point is not None:
+            points.append(point)
+            if len(points) == max_points:
+                break
+    return points
@@ -0,0 +1,59 @@
+import threading
+
+# =================================================
+# LOCAL TOKEN COUNTING
+# =================================================
+# tiktoken comes with langchain-openai, but an encoding is downloaded on first
+# use. Without tiktoken or network access every count falls back to the
+# ~4 characters per token estimate, so counting never fails.
+# TOKENIZER_ENCODING=estimate always uses the estimate (reproducible offline).
+DEFAULT_ENCODING = "o200k_base"
+ESTIMATE = "estimate"
+
+_encoding_name = DEFAULT_ENCODING
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+
+
+def set_encoding(name: str):
+    """Use another tiktoken encoding (e.g. "cl100k_base" for older deployments)."""
+    global _encoding_name, _encoding, _encoding_loaded
+    with _lock:
+        _encoding_name = name or DEFAULT_ENCODING
+        _encoding = None
+        _encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _lock:
+            if not _encoding_loaded:
+                _encoding = None
+                if _encoding_name != ESTIMATE:
+                    try:
+                        import tiktoken
+
+                        _encoding = tiktoken.get_encoding(_encoding_name)
+                    except Exception as e:
+                        # Tried once per process; a failed download is not retried on every call
+                        print(f"Tokenizer '{_encoding_name}' unavailable, estimating token counts ({type(e).__name__})")
+                _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text: str):
+    # ~4 characters per token for English prose
+    return max(1, len(text or "") // 4)
+
+
+def count_tokens(text: str):
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def tokenizer_name():
+    return _encoding_name if _get_encoding() is not None else ESTIMATE
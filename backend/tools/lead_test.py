@@ -1,4 +0,0 @@
-from lead_tools import get_lead_info
-
-print(get_lead_info("The lead of operations at Logitech "))
-
@@ -1,20 +0,0 @@
-from companytools import get_company_details
-
-print("---- Test 1 ----")
-print(get_company_details("latest news about freshworks company"))
-
-print("\n---- Test 2 ----")
-print(get_company_details("tools in openai"))
-
-# print("\n---- Test 3 ----")
-# print(get_company_details("How many employees does Amazon have?"))
-
-# print("\n---- Test 4 ----")
-# print(get_company_details("What is the purpose of OpenAI?"))
-
-# print("\n---- Test 5 ----")
-# print(get_company_details("History of logitech company."))
-
-
-# print("\n---- Test 6 ----")
-# print(get_company_details("upcoming trends in AI technology."))
@@ -1,4 +0,0 @@
-from news_tool import get_tech_news
-
-print(get_tech_news("Latest news about open ai"))
-
@@ -0,0 +1,340 @@
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backend.results import canonical_url
+from backend.search_cache import normalize_query
+from backend.storage import connect
+
+# =================================================
+# DEFAULTS
+# =================================================
+DEFAULT_INTERVAL = 60 * 60
+DEFAULT_WORKERS = 4
+# Serper's relative dates ("3 hours ago") are coarse, so allow some slack
+# before treating an unseen link as older than the watermark
+WATERMARK_GRACE = 24 * 60 * 60
+# Seen links older than this are forgotten
+SEEN_RETENTION = 30 * 24 * 60 * 60
+
+_RELATIVE_DATE_RE = re.compile(r"(\d+)\s+(second|minute|min|hour|day|week|month)s?\s+ago", re.IGNORECASE)
+_UNIT_SECONDS = {
+    "second": 1, "minute": 60, "min": 60, "hour": 3600,
+    "day": 86400, "week": 7 * 86400, "month": 30 * 86400,
+}
+_ABSOLUTE_DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%Y-%m-%d")
+
+
+def published_at(date: str, now: float = None):
+    """Epoch seconds for a Serper news date ("3 hours ago", "Mar 3, 2024"), or None."""
+    if not date:
+        return None
+    now = time.time() if now is None else now
+    match = _RELATIVE_DATE_RE.search(date)
+    if match:
+        return now - int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+    for fmt in _ABSOLUTE_DATE_FORMATS:
+        try:
+            return datetime.strptime(date.strip(), fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+# =================================================
+# NEWS WATCHLISTS (SQLITE)
+# =================================================
+class WatchlistManager:
+    """
+    Named lists of accounts whose news is checked on a schedule.
+
+    Per account (normalized name, shared between watchlists) we keep the
+    links already summarized and a publication-date watermark. Each run
+    fetches the account's news with `fetch(account)`, keeps only articles
+    that are new since the last run and passes just those to
+    `summarize(account, articles)`. Accounts with nothing new cost no LLM
+    call. Every summarized delta is stored as a digest entry.
+    """
+
+    def __init__(self, path, fetch, summarize, interval: float = DEFAULT_INTERVAL,
+                 workers: int = DEFAULT_WORKERS):
+        self.path = path
+        self.fetch = fetch
+        self.summarize = summarize
+        self.interval = interval
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watchlist")
+        # Whole runs wait on their accounts in self._pool, so they never run inside it
+        self._runs = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watchlist-run")
+        self._lock = threading.Lock()
+        self._running = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._db = connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS watchlist_accounts (
+                watchlist TEXT NOT NULL,
+                account TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                account_key TEXT,
+                PRIMARY KEY (watchlist, account)
+            );
+            CREATE TABLE IF NOT EXISTS watch_state (
+                account_key TEXT PRIMARY KEY,
+                last_run REAL NOT NULL,
+                watermark REAL
+            );
+            CREATE TABLE IF NOT EXISTS watch_seen (
+                account_key TEXT NOT NULL,
+                link TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (account_key, link)
+            );
+            CREATE TABLE IF NOT EXISTS watch_digest (
+                id INTEGER PRIMARY KEY,
+                account_key TEXT NOT NULL,
+                account TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS watch_digest_time ON watch_digest (created_at);
+            """
+        )
+        self._migrate()
+        self._db.commit()
+
+    def _migrate(self):
+        # Accounts are keyed by normalize_query() in Python: SQLite's lower() only
+        # folds ASCII, so "NESTLÉ" and "Nestlé" would be two accounts
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(watchlist_accounts)")}
+        if "account_key" not in columns:
+            self._db.execute("ALTER TABLE watchlist_accounts ADD COLUMN account_key TEXT")
+        rows = self._db.execute("SELECT DISTINCT account FROM watchlist_accounts WHERE account_key IS NULL").fetchall()
+        self._db.executemany("UPDATE watchlist_accounts SET account_key = ? WHERE account = ?",
+                             [(normalize_query(account), account) for account, in rows])
+        self._db.execute("CREATE INDEX IF NOT EXISTS watchlist_account_key ON watchlist_accounts (account_key)")
+
+    # ---------------- watchlists ----------------
+    def add(self, watchlist: str, accounts: list):
+        """Add accounts to a watchlist (created on first use). Returns the watchlist."""
+        watchlist = (watchlist or "").strip()
+        accounts = [" ".join(a.split()) for a in accounts or [] if isinstance(a, str) and a.strip()]
+        if not watchlist:
+            raise ValueError("Watchlist name is required")
+        if not accounts:
+            raise ValueError("At least one account is required")
+
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO watchlist_accounts (watchlist, account, added_at, account_key) "
+                "VALUES (?, ?, ?, ?)",
+                [(watchlist, account, now, normalize_query(account)) for account in accounts]
+            )
+            self._db.commit()
+        return self.get(watchlist)
+
+    def remove(self, watchlist: str, accounts: list = None):
+        """Remove some accounts, or the whole watchlist when `accounts` is None."""
+        with self._lock:
+            if accounts is None:
+                cursor = self._db.execute("DELETE FROM watchlist_accounts WHERE watchlist = ?", (watchlist,))
+            else:
+                cursor = self._db.executemany(
+                    "DELETE FROM watchlist_accounts WHERE watchlist = ? AND account = ?",
+                    [(watchlist, account) for account in accounts]
+                )
+            self._db.commit()
+            return cursor.rowcount
+
+    def get(self, watchlist: str):
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT a.account, s.last_run, s.watermark
+                FROM watchlist_accounts a
+                LEFT JOIN watch_state s ON s.account_key = a.account_key
+                WHERE a.watchlist = ?
+                ORDER BY a.account
+                """,
+                (watchlist,)
+            ).fetchall()
+        if not rows:
+            return None
+        return {
+            "name": watchlist,
+            "accounts": [
+                {"account": account, "last_run": last_run, "watermark": watermark}
+                for account, last_run, watermark in rows
+            ],
+        }
+
+    def names(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT watchlist, COUNT(*) FROM watchlist_accounts GROUP BY watchlist ORDER BY watchlist"
+            ).fetchall()
+        return [{"name": name, "accounts": count} for name, count in rows]
+
+    # ---------------- runs ----------------
+    def _accounts(self, watchlist=None, due_only=False):
+        query = (
+            # One row per account key, however its spellings differ
+            "SELECT MIN(a.account) FROM watchlist_accounts a "
+            "LEFT JOIN watch_state s ON s.account_key = a.account_key"
+        )
+        clauses, params = [], []
+        if watchlist is not None:
+            clauses.append("a.watchlist = ?")
+            params.append(watchlist)
+        if due_only:
+            clauses.append("(s.last_run IS NULL OR s.last_run <= ?)")
+            params.append(time.time() - self.interval)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " GROUP BY a.account_key"
+        with self._lock:
+            return [row[0] for row in self._db.execute(query, params).fetchall()]
+
+    def _new_articles(self, key, articles, now):
+        with self._lock:
+            state = self._db.execute("SELECT watermark FROM watch_state WHERE account_key = ?", (key,)).fetchone()
+            watermark = state[0] if state else None
+            links = [canonical_url(a.get("link")) for a in articles]
+            seen = set()
+            if links:
+                marks = ",".join("?" * len(links))
+                seen = {row[0] for row in self._db.execute(
+                    f"SELECT link FROM watch_seen WHERE account_key = ? AND link IN ({marks})", [key] + links
+                )}
+
+        fresh = []
+        for article, link in zip(articles, links):
+            if not link or link in seen:
+                continue
+            seen.add(link)
+            published = published_at(article.get("date"), now)
+            if published is not None and watermark is not None and published < watermark - WATERMARK_GRACE:
+                continue
+            fresh.append(article)
+        return fresh, watermark
+
+    def run_account(self, account: str):
+        """Fetch, diff against the watermark and summarize only the new articles."""
+        key = normalize_query(account)
+        with self._lock:
+            if key in self._running:
+                return None
+            self._running.add(key)
+
+        try:
+            now = time.time()
+            articles = self.fetch(account) or []
+            fresh, watermark = self._new_articles(key, articles, now)
+
+            entry, summarized = None, []
+            if fresh:
+                result = self.summarize(account, fresh)
+                # Articles the prompt budget left out stay unseen, so a later run picks them up
+                used = {canonical_url(link) for link in result.get("sources", [])}
+                summarized = [a for a in fresh if canonical_url(a.get("link")) in used]
+                entry = {
+                    "account": account,
+                    "created_at": now,
+                    "new_articles": len(summarized),
+                    "articles": [dict(a) for a in summarized],
+                    "summary": result.get("summary", []),
+                    "points": result.get("points", []),
+                    "sources": result.get("sources", []),
+                }
+
+            with self._lock:
+                # A failed summary is not recorded as seen, so the next run retries it
+                if entry is not None and entry["summary"] != ["Error generating summary"]:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO watch_seen (account_key, link, seen_at) VALUES (?, ?, ?)",
+                        [(key, canonical_url(a.get("link")), now) for a in summarized]
+                    )
+                    self._db.execute(
+                        "INSERT INTO watch_digest (account_key, account, created_at, payload) VALUES (?, ?, ?, ?)",
+                        (key, account, now, json.dumps(entry))
+                    )
+                    for article in summarized:
+                        published = published_at(article.get("date"), now)
+                        if published is not None:
+                            watermark = published if watermark is None else max(watermark, published)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO watch_state (account_key, last_run, watermark) VALUES (?, ?, ?)",
+                    (key, now, watermark)
+                )
+                self._db.commit()
+
+            return {"account": account, "new_articles": len(fresh), "fetched": len(articles),
+                    "digest": entry is not None}
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+    def run(self, watchlist: str = None, due_only: bool = False):
+        """Run every account (of one watchlist, or all). Returns per-account outcomes."""
+        futures = [self._pool.submit(self.run_account, account)
+                   for account in self._accounts(watchlist, due_only)]
+        outcomes = []
+        for future in futures:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                print(f"Watchlist run error: {e}")
+                continue
+            if outcome is not None:
+                outcomes.append(outcome)
+        return outcomes
+
+    def run_async(self, watchlist: str = None):
+        return self._runs.submit(self.run, watchlist)
+
+    def digest(self, watchlist: str = None, since: float = None, limit: int = 200):
+        """Digest entries (newest first), optionally for one watchlist's accounts only."""
+        since = time.time() - 24 * 60 * 60 if since is None else since
+        query = "SELECT payload FROM watch_digest WHERE created_at >= ?"
+        params = [since]
+        if watchlist is not None:
+            query += " AND account_key IN (SELECT account_key FROM watchlist_accounts WHERE watchlist = ?)"
+            params.append(watchlist)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [json.loads(row[0]) for row in self._db.execute(query, params).fetchall()]
+
+    def prune(self):
+        with self._lock:
+            self._db.execute("DELETE FROM watch_seen WHERE seen_at < ?", (time.time() - SEEN_RETENTION,))
+            self._db.commit()
+
+    # ---------------- scheduler ----------------
+    def start(self, poll: float = 60.0):
+        """Background thread that runs due accounts every `poll` seconds."""
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        def _loop():
+            while not self._stop.wait(poll):
+                try:
+                    self.run(due_only=True)
+                    self.prune()
+                except Exception as e:
+                    print(f"Watchlist scheduler error: {e}")
+
+        self._thread = threading.Thread(target=_loop, name="watchlist-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """Stop the scheduler; with `wait`, account checks already running finish first."""
+        self._stop.set()
+        self._runs.shutdown(wait=wait, cancel_futures=True)
+        self._pool.shutdown(wait=wait, cancel_futures=True)
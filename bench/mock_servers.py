@@ -0,0 +1,284 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =================================================
+# LOCAL SERPER + AZURE OPENAI STAND-IN
+# =================================================
+# One threaded HTTP server that answers:
+#   POST /search, POST /news                              (Serper)
+#   POST /openai/deployments/<name>/chat/completions      (Azure OpenAI, incl. stream=true)
+# with canned payloads after a configurable latency +/- jitter (optionally
+# per deployment, to stand in for a small and a large model). An optional
+# per-provider quota (requests/second) answers 429 + Retry-After when exceeded.
+
+_QUESTION_RE = re.compile(r"^Question:\s*(.+)$", re.MULTILINE)
+_TASK_RE = re.compile(r"<<<TASK (\d+)>>>(.*?)<<<END TASK \1>>>", re.DOTALL)
+_DEPLOYMENT_RE = re.compile(r"/deployments/([^/]+)/")
+
+
+class MockLatency:
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def sleep(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+class MockQuota:
+    """Fixed one-second windows; rps <= 0 means unlimited."""
+
+    def __init__(self, rps: float = 0):
+        self.rps = rps
+        self._window = 0
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        # None if the request is allowed, otherwise seconds until the next window
+        if self.rps <= 0:
+            return None
+        with self._lock:
+            now = time.time()
+            window = int(now)
+            if window != self._window:
+                self._window, self._used = window, 0
+            if self._used < self.rps:
+                self._used += 1
+                return None
+            return window + 1 - now
+
+
+# Distinct snippet topics so reranking / de-duplication has something to work with
+_TOPICS = (
+    "founded in Switzerland and headquartered in Lausanne with offices worldwide",
+    "product lineup spans keyboards, mice, webcams and video conferencing gear",
+    "leadership team led by the chief executive and a new finance chief",
+    "quarterly revenue grew while gross margin improved on lower freight costs",
+    "acquisitions in gaming peripherals expanded the brand portfolio",
+    "sustainability report commits to carbon neutral products by 2030",
+    "partnership with cloud providers for enterprise meeting rooms",
+    "analysts expect demand for hybrid work devices to stay strong",
+)
+
+
+def serper_payload(endpoint: str, query: str, num: int):
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-") or "query"
+    items = []
+    for i in range(1, num + 1):
+        item = {
+            "title": f"{query} - result {i}",
+            "snippet": f"{query} snippet {i}: {_TOPICS[(i - 1) % len(_TOPICS)]}.",
+            "link": f"https://example.com/{slug}/{i}",
+        }
+        if endpoint == "news":
+            item["date"] = f"{i} hours ago"
+        items.append(item)
+    return {"searchParameters": {"q": query, "num": num}, "news" if endpoint == "news" else "organic": items}
+
+
+def completion_text(prompt: str):
+    # Multi-entity prompts (micro-batching) get one "### ANSWER n" section per task
+    tasks = _TASK_RE.findall(prompt)
+    if tasks:
+        return "\n".join(f"### ANSWER {n}\n{completion_text(body)}" for n, body in tasks)
+
+    match = _QUESTION_RE.search(prompt)
+    subject = match.group(1).strip() if match else "the subject"
+    # JSON Lines, as requested by backend.structured_output.OUTPUT_INSTRUCTIONS
+    return "\n".join(json.dumps({"text": f"Mock fact {i} about {subject}", "sources": [i]}) for i in range(1, 6))
+
+
+def _prompt_from_messages(messages):
+    return "\n".join(str(m.get("content", "")) for m in messages or [])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttle(self, provider):
+        retry_after = self.server.quotas[provider].retry_after()
+        if retry_after is None:
+            return False
+        self.server.count(f"{provider}_429")
+        self._send_json(429, {"error": "rate limited"}, {"Retry-After": f"{retry_after:.2f}"})
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": "invalid json"})
+
+        path = self.path.split("?", 1)[0]
+        server = self.server
+
+        if path in ("/search", "/news"):
+            if self._throttle("serper"):
+                return
+            server.serper_latency.sleep()
+            server.count("serper")
+            endpoint = path.lstrip("/")
+            return self._send_json(200, serper_payload(endpoint, body.get("q", ""), int(body.get("num", 5))))
+
+        if path.endswith("/chat/completions"):
+            if self._throttle("llm"):
+                return
+            match = _DEPLOYMENT_RE.search(path)
+            deployment = match.group(1) if match else ""
+            server.deployment_latency.get(deployment, server.llm_latency).sleep()
+            server.count("llm")
+            server.count(f"llm:{deployment}")
+            prompt = _prompt_from_messages(body.get("messages"))
+            text = completion_text(prompt)
+            # max_tokens cuts the answer off like the real API does (~4 characters per token)
+            max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+            finish_reason = "stop"
+            if max_tokens and len(text) > max_tokens * 4:
+                text, finish_reason = text[:max_tokens * 4], "length"
+            if body.get("stream"):
+                usage = (body.get("stream_options") or {}).get("include_usage")
+                return self._stream_completion(text, prompt, finish_reason, usage)
+            return self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(text) // 4,
+                    "total_tokens": (len(prompt) + len(text)) // 4,
+                },
+            })
+
+        self._send_json(404, {"error": f"no mock for {path}"})
+
+    def _stream_completion(self, text, prompt, finish_reason="stop", usage=False):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        for piece in re.findall(r"\S+\s*", text):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            self.server.stream_latency.sleep()
+        final = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "mock",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        if usage:
+            tail = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(text) // 4,
+                    "total_tokens": (len(prompt) + len(text)) // 4,
+                },
+            }
+            self.wfile.write(f"data: {json.dumps(tail)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, serper=None, llm=None, stream=None, quotas=None,
+                 deployment_latency=None):
+        super().__init__((host, port), _Handler)
+        self.serper_latency = serper or MockLatency()
+        self.llm_latency = llm or MockLatency()
+        self.deployment_latency = dict(deployment_latency or {})
+        self.stream_latency = stream or MockLatency()
+        self.quotas = {"serper": MockQuota(), "llm": MockQuota()}
+        self.quotas.update(quotas or {})
+        self.calls = {"serper": 0, "llm": 0}
+        self._calls_lock = threading.Lock()
+        self._thread = None
+
+    def count(self, provider):
+        with self._calls_lock:
+            self.calls[provider] = self.calls.get(provider, 0) + 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the local Serper / Azure OpenAI stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serper-latency-ms", type=float, default=150)
+    parser.add_argument("--serper-jitter-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--serper-quota-rps", type=float, default=0)
+    parser.add_argument("--llm-quota-rps", type=float, default=0)
+    parser.add_argument("--small-deployment", default="", help="deployment answered with --small-llm-latency-ms")
+    parser.add_argument("--small-llm-latency-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    server = MockServer(
+        port=args.port,
+        serper=MockLatency(args.serper_latency_ms, args.serper_jitter_ms),
+        llm=MockLatency(args.llm_latency_ms, args.llm_jitter_ms),
+        quotas={"serper": MockQuota(args.serper_quota_rps), "llm": MockQuota(args.llm_quota_rps)},
+        deployment_latency={args.small_deployment: MockLatency(args.small_llm_latency_ms, args.llm_jitter_ms / 4)}
+        if args.small_deployment else None,
+    )
+    print(f"Mock Serper/Azure OpenAI listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,244 @@
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bench.mock_servers import MockLatency, MockQuota, MockServer
+
+# =================================================
+# OFFLINE BENCHMARK
+# =================================================
+# Starts the mock Serper / Azure OpenAI server, points the app at it and
+# drives /api/company, /api/news and /api/lead at a fixed concurrency.
+#
+#   python -m bench.run_bench --requests 300 --concurrency 32
+#   python -m bench.run_bench --server asgi --max-p95-ms 1500 --json bench.json
+#
+
+COMPANIES = [
+    "Logitech", "Freshworks", "OpenAI", "Atlassian", "Snowflake", "Datadog",
+    "HubSpot", "Zendesk", "Twilio", "Stripe", "Shopify", "Cloudflare",
+]
+LEADS = [
+    "Sundar Pichai", "Satya Nadella", "Jensen Huang", "Lisa Su",
+    "jane.doe@example.com", "Marc Benioff",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def configure_env(mock_url, workdir, provider_limits="serper=0,llm=0", small_model=""):
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": mock_url,
+        "OPENAI_API_KEY": "bench-key",
+        "OPENAI_API_VERSION": "2024-02-01",
+        "OPENAI_MODEL_NAME": "bench-deployment",
+        "SERPER_API_KEY": "bench-key",
+        "SERPER_BASE_URL": mock_url,
+        # Memory-only caches so every run starts cold and nothing is left behind
+        "SERPER_CACHE_PATH": "",
+        "LLM_CACHE_PATH": "",
+        "SOURCE_INDEX_PATH": "",
+        "RESULT_CACHE_PATH": "",
+        "WATCHLIST_PATH": "",
+        "BATCH_JOBS_DIR": os.path.join(workdir, "jobs"),
+        "PREWARM_DIR": os.path.join(workdir, "prewarm"),
+        # The mock has no quota unless --*-quota-rps is set, so don't throttle by default
+        "PROVIDER_RATE_LIMITS": provider_limits,
+        "OPENAI_SMALL_MODEL_NAME": small_model,
+    })
+
+
+def start_app(kind, port):
+    if kind == "asgi":
+        import uvicorn
+        from asgi import api
+
+        server = uvicorn.Server(uvicorn.Config(api, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 30
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn failed to start (see the log above)")
+            time.sleep(0.05)
+        return lambda: setattr(server, "should_exit", True)
+
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown
+
+
+def build_workload(tools, total, query_pool):
+    # query_pool < total makes queries repeat, which exercises the caches
+    workload = []
+    for i in range(total):
+        tool = tools[i % len(tools)]
+        n = i % query_pool
+        names = LEADS if tool == "lead" else COMPANIES
+        query = f"{names[n % len(names)]} {n}" if tool == "lead" else f"{names[n % len(names)]} overview {n}"
+        workload.append((tool, query))
+    return workload
+
+
+def run_load(base_url, workload, concurrency):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def call(item):
+        tool, query = item
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/api/{tool}", json={"query": query}, timeout=120)
+            body = response.json()
+            ok = response.status_code == 200 and "error" not in body and body.get("summary") != ["Error generating summary"]
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.setdefault(tool, []).append(elapsed)
+            if not ok:
+                errors[tool] = errors.get(tool, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, workload))
+    wall = time.perf_counter() - start
+    return wall, latencies, errors
+
+
+def summarize_run(wall, latencies, errors, mock):
+    every = [x for values in latencies.values() for x in values]
+    report = {
+        "requests": len(every),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(every) / wall, 2) if wall else 0.0,
+        "errors": sum(errors.values()),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "upstream_calls": dict(mock.calls),
+        "latency_ms": {},
+    }
+    for tool, values in sorted(latencies.items()) + [("all", every)]:
+        report["latency_ms"][tool] = {
+            "count": len(values),
+            "p50": round(percentile(values, 50) * 1000, 1),
+            "p95": round(percentile(values, 95) * 1000, 1),
+            "p99": round(percentile(values, 99) * 1000, 1),
+            "max": round(max(values) * 1000, 1) if values else 0.0,
+            "errors": errors.get(tool, 0) if tool != "all" else sum(errors.values()),
+        }
+    return report
+
+
+def print_report(report):
+    print(f"requests:    {report['requests']} in {report['wall_seconds']}s")
+    print(f"throughput:  {report['throughput_rps']} req/s")
+    print(f"errors:      {report['errors']}")
+    print(f"peak RSS:    {report['peak_rss_mb']} MB")
+    print(f"upstream:    {report['upstream_calls']}")
+    print(f"{'endpoint':<10}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for tool, row in report["latency_ms"].items():
+        print(f"{tool:<10}{row['count']:>7}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}{row['max']:>10}{row['errors']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput/latency benchmark for the research API")
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--tools", default="company,news,lead", help="comma separated: company,news,lead")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--query-pool", type=int, default=0,
+                        help="distinct queries to cycle through (0 = every request unique)")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--serper-latency-ms", type=float, default=150)
+    parser.add_argument("--serper-jitter-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--serper-quota-rps", type=float, default=0, help="mock Serper answers 429 above this rate")
+    parser.add_argument("--llm-quota-rps", type=float, default=0, help="mock Azure OpenAI answers 429 above this rate")
+    parser.add_argument("--small-model", default="",
+                        help="route easy summaries to this mock deployment (two-tier routing)")
+    parser.add_argument("--small-llm-latency-ms", type=float, default=250)
+    parser.add_argument("--provider-limits", default="serper=0,llm=0",
+                        help="PROVIDER_RATE_LIMITS for the app, e.g. serper=20,llm=10 (0 = unlimited)")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 if overall p95 exceeds this")
+    parser.add_argument("--min-rps", type=float, help="exit 1 if throughput falls below this")
+    args = parser.parse_args(argv)
+
+    mock = MockServer(
+        serper=MockLatency(args.serper_latency_ms, args.serper_jitter_ms),
+        llm=MockLatency(args.llm_latency_ms, args.llm_jitter_ms),
+        quotas={"serper": MockQuota(args.serper_quota_rps), "llm": MockQuota(args.llm_quota_rps)},
+        deployment_latency={args.small_model: MockLatency(args.small_llm_latency_ms, args.llm_jitter_ms / 4)}
+        if args.small_model else None,
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix="sales-bench-") as workdir:
+        configure_env(mock.url, workdir, args.provider_limits, args.small_model)
+        stop_app = start_app(args.server, args.port)
+
+        tools = [t.strip() for t in args.tools.split(",") if t.strip()]
+        workload = build_workload(tools, args.requests, args.query_pool or args.requests)
+        wall, latencies, errors = run_load(f"http://127.0.0.1:{args.port}", workload, args.concurrency)
+
+        stop_app()
+        mock.stop()
+
+    report = summarize_run(wall, latencies, errors, mock)
+    report["config"] = vars(args)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if args.max_p95_ms is not None and report["latency_ms"]["all"]["p95"] > args.max_p95_ms:
+        print(f"FAIL: p95 {report['latency_ms']['all']['p95']} ms > {args.max_p95_ms} ms")
+        failed = True
+    if args.min_rps is not None and report["throughput_rps"] < args.min_rps:
+        print(f"FAIL: throughput {report['throughput_rps']} req/s < {args.min_rps} req/s")
+        failed = True
+    if report["errors"]:
+        print(f"FAIL: {report['errors']} requests failed")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
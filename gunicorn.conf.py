@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+
+from backend.providers import env
+
+# =================================================
+# GUNICORN SETTINGS (PRODUCTION WSGI)
+# =================================================
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every request mostly waits on Serper / Azure OpenAI, so each worker
+# process runs a pool of threads (gthread) rather than one request at a time.
+
+bind = env("BIND", f"0.0.0.0:{env('PORT', '5000')}")
+workers = int(env("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "gthread"
+threads = int(env("WEB_THREADS", "8"))
+
+# LLM summaries can take a while; a worker silent for longer than this is restarted
+timeout = int(env("WEB_TIMEOUT", "120"))
+# Time a stopping worker gets to finish its requests; DRAIN_TIMEOUT must fit inside it
+graceful_timeout = int(env("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(env("WEB_KEEPALIVE", "5"))
+
+# Build the app in each worker, after the fork: LLM clients, HTTP pools,
+# SQLite connections and background threads must not be shared across processes
+preload_app = False
+
+# Workers read this to split the per-key provider rate limits between them
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+accesslog = env("ACCESS_LOG", "-") or None
+
+
+def post_worker_init(worker):
+    # gunicorn has no SIGTERM hook: chain one in front of the worker's handler
+    # so new requests get 503 while the worker finishes the ones it has
+    from app import drain_on_sigterm
+    drain_on_sigterm()
+
+
+def worker_exit(server, worker):
+    # Requests are done; let background LLM calls (jobs, watchlists) finish too
+    from app import shutdown
+    shutdown()
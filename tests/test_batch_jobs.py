@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+from backend.batch_jobs import JobManager
+from backend.rate_limit import TokenBucket, provider_budget
+
+ITEMS = [{"tool": "company", "query": f"Account {i}"} for i in range(4)]
+
+
+def wait_for(manager, job_id, status="completed", timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if manager.status(job_id)["status"] == status:
+            return manager.status(job_id)
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached '{status}': {manager.status(job_id)}")
+
+
+def read_results(directory, job_id):
+    with open(directory / job_id / "results.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_job_runs_every_item_and_retries_failures(tmp_path):
+    calls = []
+    lock = threading.Lock()
+
+    def research(query):
+        with lock:
+            calls.append(query)
+            first = calls.count(query) == 1
+        if query == "Account 1" and first:
+            return {"summary": ["Error generating summary"], "sources": [], "points": []}
+        return {"summary": [query], "sources": [], "points": []}
+
+    manager = JobManager(str(tmp_path), {"company": research}, workers=2, backoff=0.01)
+    job_id = manager.submit(ITEMS)
+    status = wait_for(manager, job_id)
+    manager.shutdown()
+
+    assert (status["completed"], status["failed"], status["pending"]) == (4, 0, 0)
+    records = {r["index"]: r for r in read_results(tmp_path, job_id)}
+    assert records[1]["attempts"] == 2 and records[1]["summary"] == ["Account 1"]
+
+
+def test_resume_skips_checkpointed_items_and_drops_a_torn_line(tmp_path):
+    job_id = "abc123"
+    job_dir = tmp_path / job_id
+    job_dir.mkdir()
+    (job_dir / "items.jsonl").write_text("".join(json.dumps(item) + "\n" for item in ITEMS))
+    (job_dir / "job.json").write_text(json.dumps(
+        {"id": job_id, "status": "running", "total": 4, "created_at": 1.0, "updated_at": 1.0}
+    ))
+    done = {"index": 0, "tool": "company", "query": "Account 0", "status": "ok", "summary": ["Account 0"]}
+    # Item 1 was being written when the process died
+    (job_dir / "results.jsonl").write_text(json.dumps(done) + "\n" + '{"index": 1, "tool": "comp')
+
+    calls, budgets = [], []
+
+    def research(query):
+        calls.append(query)
+        budgets.append(provider_budget("serper"))
+        return {"summary": [query], "sources": [], "points": []}
+
+    serper = TokenBucket(100)
+    manager = JobManager(str(tmp_path), {"company": research}, workers=2, limiters={"serper": serper})
+    assert manager.resume() == [job_id]
+    status = wait_for(manager, job_id)
+    manager.shutdown()
+
+    assert sorted(calls) == ["Account 1", "Account 2", "Account 3"]
+    # Every item ran inside the job's provider budget
+    assert budgets == [serper] * 3
+    records = read_results(tmp_path, job_id)
+    assert sorted(r["index"] for r in records) == [0, 1, 2, 3]
+    assert (status["completed"], status["failed"]) == (4, 0)
+
+
+def test_cancelled_job_is_not_resumed(tmp_path):
+    release = threading.Event()
+
+    def research(query):
+        release.wait(2)
+        return {"summary": [query], "sources": [], "points": []}
+
+    manager = JobManager(str(tmp_path), {"company": research}, workers=1)
+    job_id = manager.submit(ITEMS)
+    assert manager.cancel(job_id)
+    release.set()
+    manager.shutdown()
+
+    restarted = JobManager(str(tmp_path), {"company": research}, workers=1)
+    assert restarted.resume() == []
+    assert restarted.status(job_id)["status"] == "cancelled"
+    restarted.shutdown()
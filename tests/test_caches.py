@@ -0,0 +1,163 @@
+import threading
+import time
+
+from backend.llm_cache import LLMCache
+from backend.result_cache import ResultCache, Revalidator
+from backend.results import SearchResult
+from backend.search_cache import SearchCache
+from backend.source_index import SourceIndex
+
+SOURCES = ["https://a.example/1", "https://b.example/2", "https://c.example/3"]
+
+
+# =================================================
+# LLM CACHE
+# =================================================
+def test_llm_exact_hit_and_near_duplicate_query():
+    cache = LLMCache(ttl=60)
+    cache.set("prompt one", "gpt", "- fact [1]", tool="company", query="Acme Corp overview", sources=SOURCES)
+
+    assert cache.get("prompt one", "gpt") == "- fact [1]"
+    # Different prompt text, same question in other words, same sources
+    assert cache.get("prompt two", "gpt", tool="company", query="acme corp overview please",
+                     sources=SOURCES) == "- fact [1]"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_llm_near_duplicate_needs_the_same_source_order():
+    cache = LLMCache(ttl=60)
+    cache.set("prompt one", "gpt", "- fact [1]", tool="company", query="Acme Corp overview", sources=SOURCES)
+
+    # [1] would point at a different source, so the completion can't be reused
+    assert cache.get("prompt two", "gpt", tool="company", query="Acme Corp overview",
+                     sources=list(reversed(SOURCES))) is None
+    assert cache.get("prompt two", "gpt", tool="company", query="Acme Corp overview",
+                     sources=SOURCES[:2]) is None
+    assert cache.get("prompt two", "gpt", tool="news", query="Acme Corp overview", sources=SOURCES) is None
+
+
+def test_llm_without_query_only_hits_exactly():
+    cache = LLMCache(ttl=60)
+    cache.set("delta prompt", "gpt", "- new [1]", tool="news", query="", sources=SOURCES)
+    assert cache.get("other delta prompt", "gpt", tool="news", query="", sources=SOURCES) is None
+    assert cache.get("delta prompt", "gpt") == "- new [1]"
+
+
+def test_llm_purge_keeps_stale_fallback_for_the_grace_period():
+    cache = LLMCache(ttl=0.05)
+    cache.set("prompt", "gpt", "answer")
+    time.sleep(0.1)
+
+    assert cache.get("prompt", "gpt") is None
+    assert cache.purge_expired(grace=60) == 0
+    assert cache.get_stale("prompt", "gpt") == "answer"
+    assert cache.purge_expired() == 1
+    assert cache.get_stale("prompt", "gpt") is None
+
+
+def test_search_cache_purge_grace(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "serper.sqlite3"), ttls={"search": 0.05, "news": 0.05})
+    cache.set("search", "acme", 5, [SearchResult("Acme", "snippet", "https://a.example")])
+    time.sleep(0.1)
+
+    assert cache.purge_expired(grace=60) == 0
+    assert cache.get_stale("search", "acme", 5)
+    # In the memory tier and SQLite, but one entry
+    assert cache.purge_expired() == 1
+    assert cache.get_stale("search", "acme", 5) is None
+
+
+# =================================================
+# RESULT CACHE (STALE-WHILE-REVALIDATE)
+# =================================================
+def test_result_fresh_then_stale_then_expired():
+    cache = ResultCache(ttls={"company": 0.05})
+    cache.set("company", "Acme", {"summary": ["a"], "sources": [], "points": []}, origin="prewarm")
+
+    fresh = cache.get("company", "acme")
+    assert fresh["freshness"]["stale"] is False and fresh["freshness"]["origin"] == "prewarm"
+
+    time.sleep(0.1)
+    assert cache.get("company", "acme") is None
+    stale = cache.get("company", "acme", max_stale=60)
+    assert stale["freshness"]["stale"] is True and stale["summary"] == ["a"]
+
+    assert cache.purge_expired(grace=60) == 0
+    assert cache.purge_expired() == 1
+    assert cache.get("company", "acme", max_stale=60) is None
+
+
+def test_purge_counts_each_entry_once(tmp_path):
+    llm = LLMCache(path=str(tmp_path / "llm.sqlite3"), ttl=0.05)
+    results = ResultCache(path=str(tmp_path / "results.sqlite3"), ttls={"company": 0.05})
+    for i in range(3):
+        llm.set(f"prompt {i}", "gpt", "answer")
+        results.set("company", f"acme {i}", {"summary": ["a"], "sources": [], "points": []})
+    time.sleep(0.1)
+
+    assert llm.purge_expired() == 3
+    assert results.purge_expired() == 3
+
+
+def test_revalidator_runs_one_refresh_per_key():
+    revalidator = Revalidator(workers=2, max_pending=10)
+    release = threading.Event()
+    runs = []
+
+    def refresh(query):
+        runs.append(query)
+        release.wait(2)
+
+    assert revalidator.submit("company|acme", refresh, "acme")
+    assert not revalidator.submit("company|acme", refresh, "acme")
+    assert revalidator.submit("company|globex", refresh, "globex")
+    release.set()
+    revalidator.shutdown(wait=True)
+
+    assert sorted(runs) == ["acme", "globex"]
+    stats = revalidator.stats()
+    assert (stats["scheduled"], stats["coalesced"], stats["completed"], stats["pending"]) == (2, 1, 2, 0)
+
+
+def test_revalidator_skips_when_the_queue_is_full():
+    revalidator = Revalidator(workers=1, max_pending=1)
+    release = threading.Event()
+
+    assert revalidator.submit("a", release.wait, 2)
+    assert not revalidator.submit("b", release.wait, 2)
+    release.set()
+    revalidator.shutdown(wait=True)
+    assert revalidator.stats()["skipped"] == 1
+
+
+# =================================================
+# SOURCE INDEX
+# =================================================
+def results(count, start=0):
+    return [SearchResult(f"Acme news {i}", f"acme snippet {i}", f"https://a.example/{i}")
+            for i in range(start, start + count)]
+
+
+def test_source_index_lookup_needs_enough_fresh_matches():
+    index = SourceIndex(min_results=3)
+    index.add("search", "company", "acme", results(2))
+    assert index.lookup("search", "acme", 5) is None
+
+    index.add("search", "company", "acme", results(2, start=2))
+    assert len(index.lookup("search", "acme", 5)) == 4
+    assert index.lookup("news", "acme", 5) is None
+
+
+def test_source_index_prune_ages_out_and_caps():
+    index = SourceIndex(retention=60, max_documents=3)
+    index.add("search", "company", "acme", results(5))
+    index._db.execute("UPDATE sources SET fetched_at = fetched_at - 3600 WHERE link = 'https://a.example/0'")
+    index._db.commit()
+
+    # One too old, then one more over the cap
+    assert index.prune() == 2
+    stats = index.stats()
+    assert (stats["documents"], stats["tags"], stats["pruned"]) == (3, 3, 2)
+    # The FTS entries went with them
+    assert len(index.search("search", "acme", limit=10, max_age=7200)) == 3
+    assert index.prune() == 0
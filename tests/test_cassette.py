@@ -0,0 +1,92 @@
+import gzip
+import json
+
+import httpx
+import pytest
+import requests
+
+from backend.cassette import (
+    Cassette, CassetteMiss, httpx_transport, request_key, requests_adapter
+)
+from bench.mock_servers import MockLatency, MockServer
+
+
+@pytest.fixture
+def mock_server():
+    server = MockServer(serper=MockLatency(50), llm=MockLatency(100), stream=MockLatency(10)).start()
+    yield server
+    server.stop()
+
+
+def session_for(cassette):
+    session = requests.Session()
+    session.mount("http://", requests_adapter(cassette))
+    session.mount("https://", requests_adapter(cassette))
+    return session
+
+
+def test_request_key_ignores_host_query_and_deployment():
+    a = request_key("POST", "http://127.0.0.1:8765/openai/deployments/gpt-4o/chat/completions?api-version=1",
+                    b'{"b": 1, "a": 2}')
+    b = request_key("post", "https://x.openai.azure.com/openai/deployments/small/chat/completions",
+                    '{"a": 2, "b": 1}')
+    assert a == b
+
+
+def test_record_then_replay_without_network(mock_server, tmp_path):
+    path = str(tmp_path / "serper.jsonl.gz")
+    payload = {"q": "Logitech", "num": 5}
+
+    recorder = Cassette(path, mode="record")
+    live = session_for(recorder).post(f"{mock_server.url}/search", json=payload,
+                                      headers={"X-API-KEY": "secret-key"})
+    assert mock_server.calls["serper"] == 1
+    # Compressed, and API keys are never written down
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert "secret-key" not in f.read()
+
+    player = Cassette(path)
+    replayed = session_for(player).post("https://google.serper.dev/search", json=payload)
+    assert replayed.status_code == live.status_code
+    assert replayed.json() == live.json()
+    assert mock_server.calls["serper"] == 1
+
+    with pytest.raises(CassetteMiss):
+        session_for(player).post("https://google.serper.dev/search", json={"q": "other", "num": 5})
+
+
+def test_replay_speed(mock_server, tmp_path, replay_clock):
+    path = str(tmp_path / "serper.jsonl.gz")
+    payload = {"q": "Logitech", "num": 5}
+    session_for(Cassette(path, mode="record")).post(f"{mock_server.url}/search", json=payload)
+
+    session_for(Cassette(path)).post("https://google.serper.dev/search", json=payload)
+    assert replay_clock.slept == 0
+
+    realtime = Cassette(path, realtime=1)
+    session_for(realtime).post("https://google.serper.dev/search", json=payload)
+    assert realtime.recorded_seconds() >= 0.05
+    assert replay_clock.slept == pytest.approx(realtime.recorded_seconds())
+
+
+def test_streamed_completion_keeps_chunk_timing(mock_server, tmp_path):
+    path = str(tmp_path / "llm.jsonl.gz")
+    url = f"{mock_server.url}/openai/deployments/gpt-4o/chat/completions"
+    body = {"messages": [{"role": "user", "content": "Question: Logitech"}], "stream": True}
+
+    def stream(cassette, base):
+        with httpx.Client(transport=httpx_transport(cassette)) as client:
+            with client.stream("POST", base, json=body) as response:
+                return [line for line in response.iter_lines() if line]
+
+    live = stream(Cassette(path, mode="record"), url)
+    cassette = Cassette(path, realtime=1)
+    replayed = stream(cassette, "https://replay.openai.azure.com/openai/deployments/other/chat/completions")
+
+    assert replayed == live
+    assert live[-1] == "data: [DONE]"
+    exchange = cassette.play(request_key("POST", url, json.dumps(body)))
+    offsets = [offset for offset, _ in exchange["chunks"]]
+    # Time to first token, then the tokens spread out as they were streamed
+    assert offsets[0] >= 0.1
+    assert offsets[-1] - offsets[0] >= 0.05
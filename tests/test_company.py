@@ -0,0 +1,32 @@
+import pytest
+
+from backend.tools.companytools import get_company_details
+
+QUESTIONS = ["latest news about freshworks company", "tools in openai"]
+
+
+def check_result(result):
+    assert result["sources"]
+    assert all(link.startswith("http") for link in result["sources"])
+    assert 3 <= len(result["points"]) <= 5
+    assert result["summary"] == [p["text"] for p in result["points"]]
+    for point in result["points"]:
+        assert point["text"]
+        assert all(0 <= i < len(result["sources"]) for i in point["sources"])
+
+
+def test_company_details(use_cassette, recording):
+    cassette = use_cassette("company")
+    for question in QUESTIONS:
+        check_result(get_company_details(question))
+    # One search, then one summary, per question
+    assert cassette.count("/search") == cassette.count("/openai/") == len(QUESTIONS)
+    assert recording or cassette.stats()["replayed"] == cassette.count()
+
+
+def test_company_details_at_recorded_speed(use_cassette, replay_clock):
+    cassette = use_cassette("company", realtime=1)
+    for question in QUESTIONS:
+        check_result(get_company_details(question))
+    # Every recorded call was replayed with its recorded timing
+    assert replay_clock.slept == pytest.approx(cassette.recorded_seconds(), abs=0.01)
@@ -0,0 +1,29 @@
+import pytest
+
+from backend.tools.lead_tools import get_lead_info
+
+QUERY = "The lead of operations at Logitech"
+
+
+def check_result(result):
+    assert result["sources"]
+    assert 3 <= len(result["points"]) <= 5
+    for point in result["points"]:
+        assert point["text"]
+        assert all(0 <= i < len(result["sources"]) for i in point["sources"])
+
+
+def test_lead_info(use_cassette, recording):
+    cassette = use_cassette("lead")
+    check_result(get_lead_info(QUERY))
+
+    # One search, one summary
+    assert cassette.count("/search") == 1
+    assert cassette.count("/openai/") == 1
+    assert recording or cassette.stats()["replayed"] == 2
+
+
+def test_lead_info_at_recorded_speed(use_cassette, replay_clock):
+    cassette = use_cassette("lead", realtime=1)
+    check_result(get_lead_info(QUERY))
+    assert replay_clock.slept == pytest.approx(cassette.recorded_seconds(), abs=0.01)
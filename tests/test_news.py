@@ -0,0 +1,21 @@
+import pytest
+
+from backend.tools.news_tool import get_tech_news
+
+QUESTION = "Latest news about open ai"
+
+
+def test_tech_news(use_cassette, recording):
+    cassette = use_cassette("news")
+    result = get_tech_news(QUESTION)
+
+    assert result["sources"]
+    assert 3 <= len(result["points"]) <= 5
+    # One news search, one summary
+    assert recording or cassette.stats()["replayed"] == cassette.count() == 2
+
+
+def test_tech_news_at_recorded_speed(use_cassette, replay_clock):
+    cassette = use_cassette("news", realtime=1)
+    assert get_tech_news(QUESTION)["points"]
+    assert replay_clock.slept == pytest.approx(cassette.recorded_seconds(), abs=0.01)
@@ -0,0 +1,90 @@
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def app_module(use_cassette):
+    # Imported once the test environment is set up (it reads its settings on import)
+    import app
+
+    return app
+
+
+def test_company_lookup(use_cassette, app_module, recording):
+    cassette = use_cassette("research_company")
+    result = app_module.get_company_details("Logitech")
+
+    assert 3 <= len(result["points"]) <= 5
+    assert len(result["sources"]) == len(set(result["sources"]))
+    # Query variants are searched, then summarized once
+    assert cassette.count("/search") == app_module.QUERY_VARIANTS
+    assert cassette.count("/openai/") == 1
+    assert recording or cassette.stats()["replayed"] == cassette.count()
+
+
+def test_company_lookup_searches_in_parallel(use_cassette, app_module, monkeypatch):
+    cassette = use_cassette("research_company")
+    # A search is only answered once every variant's request is in flight, so
+    # variants searched one after the other would time out here
+    variants = threading.Barrier(app_module.QUERY_VARIANTS, timeout=5)
+    play = cassette.play
+
+    def play_together(key):
+        if key.startswith("POST /search "):
+            variants.wait()
+        return play(key)
+
+    monkeypatch.setattr(cassette, "play", play_together)
+    result = app_module.get_company_details("Logitech")
+
+    assert result["points"]
+    assert not variants.broken
+
+
+def test_repeated_lookup_is_served_from_the_result_cache(use_cassette, app_module):
+    cassette = use_cassette("research_company")
+    first = app_module.get_company_details("Logitech")
+    replayed = cassette.stats()["replayed"]
+
+    second = app_module.get_company_details("logitech")
+
+    assert second["points"] == first["points"]
+    assert second["freshness"]["stale"] is False
+    # No Serper or LLM call the second time
+    assert cassette.stats()["replayed"] == replayed
+
+
+def test_stream_events(use_cassette, app_module):
+    use_cassette("research_stream")
+    client = app_module.app.test_client()
+
+    response = client.post("/api/lead/stream", json={"query": "Jane Doe"})
+    events = [block.split("\n", 1) for block in response.get_data(as_text=True).strip().split("\n\n")]
+    names = [event[0].removeprefix("event: ") for event in events]
+
+    assert names[0] == "sources"
+    assert names[-1] == "done"
+    done = json.loads(events[-1][1].removeprefix("data: "))
+    assert done["points"]
+    assert names.count("point") == len(done["points"])
+
+
+def test_stream_cut_off_midway_is_not_cached(use_cassette, app_module, monkeypatch):
+    use_cassette("research_stream")
+
+    def broken_completion(*args, **kwargs):
+        yield "- First fact [1]"
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(app_module, "stream_llm_completion", broken_completion)
+    client = app_module.app.test_client()
+
+    response = client.post("/api/lead/stream", json={"query": "Jane Doe"})
+    events = [block.split("\n", 1) for block in response.get_data(as_text=True).strip().split("\n\n")]
+    names = [event[0].removeprefix("event: ") for event in events]
+
+    assert names == ["sources", "point", "error", "done"]
+    assert json.loads(events[-1][1].removeprefix("data: "))["points"]
+    assert app_module.get_result_cache().get("lead", "Jane Doe", max_stale=3600) is None
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from backend import providers
+from backend.rate_limit import TokenBucket, provider_budgets, take_budget, take_budget_async
+from backend.resilience import (
+    CLOSED, HALF_OPEN, OPEN, AdaptiveTokenBucket, CircuitBreaker, ProviderGuard, ProviderUnavailable
+)
+
+
+class Throttled(Exception):
+    """Looks like an SDK 429 (status_code + response headers)."""
+
+    status_code = 429
+
+    def __init__(self, retry_after="0.05"):
+        super().__init__("429")
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": retry_after}})()
+
+
+def make_guard(rate=100.0, max_wait=1.0, attempts=2):
+    return ProviderGuard("llm", AdaptiveTokenBucket(rate), CircuitBreaker(failure_threshold=2, cooldown=0.05),
+                         max_wait=max_wait, attempts=attempts)
+
+
+# =================================================
+# LIMITER + BREAKER
+# =================================================
+def test_token_bucket_waits_for_tokens():
+    bucket = TokenBucket(10, capacity=1)
+    assert bucket.wait_time() == 0
+    assert 0 < bucket.wait_time() <= 0.1
+    assert TokenBucket(0).wait_time() == 0
+
+
+def test_adaptive_bucket_halves_on_429_and_recovers():
+    bucket = AdaptiveTokenBucket(10)
+    bucket.throttled()
+    assert bucket.rate == 5
+    for _ in range(3):
+        bucket.throttled()
+    assert bucket.rate == 1  # never below min_rate
+    for _ in range(200):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.check() > 0
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.check() == 0 and breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert breaker.check() > 0
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.check() == 0
+
+
+def test_guard_rejects_when_the_wait_is_too_long():
+    guard = make_guard(max_wait=0.01)
+    guard.breaker.record_failure(retry_after=5)
+    with pytest.raises(ProviderUnavailable):
+        guard.acquire()
+
+
+def test_guard_retries_once_after_429():
+    guard = make_guard()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Throttled()
+        return "ok"
+
+    assert guard.call(flaky) == "ok"
+    assert len(calls) == 2
+    assert guard.limiter.rate < guard.limiter.max_rate
+
+    def always_throttled():
+        calls.append(1)
+        raise Throttled()
+
+    calls.clear()
+    with pytest.raises(Throttled):
+        guard.call(always_throttled)
+    assert len(calls) == 2
+
+
+def test_guard_does_not_retry_other_errors():
+    guard = make_guard()
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(guard.call_async(broken))
+    assert calls == [1]
+
+
+def test_provider_budget_is_taken_per_real_call():
+    guard = make_guard()
+    budget = TokenBucket(1000)
+
+    with provider_budgets({"llm": budget, "serper": TokenBucket(1000)}):
+        for _ in range(3):
+            guard.call(lambda: "ok")
+    # Outside a budget nothing is taken from it
+    guard.call(lambda: "ok")
+
+    assert budget.capacity - budget._tokens == pytest.approx(3, abs=0.1)
+
+
+def test_take_budget_charges_only_inside_a_budget():
+    budget = TokenBucket(0.001, capacity=10)
+    take_budget("llm")
+    with provider_budgets({"llm": budget}):
+        take_budget("llm")
+        take_budget("serper")
+        asyncio.run(take_budget_async("llm"))
+    assert budget.capacity - budget._tokens == pytest.approx(2, abs=0.1)
+
+
+# =================================================
+# PROVIDERS
+# =================================================
+@pytest.fixture
+def provider_env(monkeypatch):
+    monkeypatch.setenv("PROVIDER_RATE_LIMITS", "serper=20,llm=4")
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    providers.reset()
+    yield monkeypatch
+    providers.reset()
+
+
+def test_guards_split_the_limit_between_workers(provider_env):
+    assert providers.get_guard("llm").limiter.max_rate == 2
+    assert providers.get_guard("serper").limiter.max_rate == 10
+    assert providers.get_guard("llm") is providers.get_guard("llm")
+
+
+def test_reset_rebuilds_from_the_current_environment(provider_env):
+    guard = providers.get_guard("llm")
+    cache = providers.get_search_cache()
+    settings = providers.get_settings()
+
+    provider_env.setenv("PROVIDER_RATE_LIMITS", "llm=8")
+    provider_env.setenv("SERPER_API_KEY", "other-key")
+    providers.reset()
+
+    assert providers.guard_stats() == {}
+    assert providers.get_guard("llm") is not guard
+    assert providers.get_guard("llm").limiter.max_rate == 4
+    assert providers.get_search_cache() is not cache
+    assert providers.get_settings() is not settings
+    assert providers.get_settings()["SERPER_API_KEY"] == "other-key"
+    assert list(providers.guard_stats()) == [f"llm:{providers.key_id(settings['OPENAI_API_KEY'])}"]
+
+
+def test_llm_client_leaves_retries_to_the_guard(provider_env):
+    assert providers.get_llm().max_retries == 0
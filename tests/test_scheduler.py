@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.scheduler import BACKGROUND, BULK, INTERACTIVE, PriorityScheduler
+
+
+def test_free_slot_goes_to_interactive_first():
+    scheduler = PriorityScheduler(capacity=1)
+    order = []
+    scheduler.acquire(BULK)
+
+    def wait(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    threads = [threading.Thread(target=wait, args=(p,)) for p in (BACKGROUND, BULK, INTERACTIVE)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    assert sum(c["queued"] for c in scheduler.stats()["classes"].values()) == 3
+
+    scheduler.release(BULK)
+    for thread in threads:
+        thread.join(2)
+    assert order == [INTERACTIVE, BULK, BACKGROUND]
+
+
+def test_class_limit_holds_even_with_free_capacity():
+    scheduler = PriorityScheduler(capacity=4, limits={BULK: 1})
+    scheduler.acquire(BULK)
+    admitted = threading.Event()
+
+    def second():
+        with scheduler.slot(BULK):
+            admitted.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not admitted.wait(0.05)
+    # Other classes still get in
+    with scheduler.slot(INTERACTIVE):
+        pass
+
+    scheduler.release(BULK)
+    assert admitted.wait(1)
+    thread.join(1)
+    stats = scheduler.stats()["classes"]
+    assert (stats[BULK]["admitted"], stats[BULK]["waited"], stats[BULK]["active"]) == (2, 1, 0)
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        PriorityScheduler().acquire("urgent")
+
+
+def test_async_cancel_while_queued_leaks_no_slot():
+    async def main():
+        scheduler = PriorityScheduler(capacity=1)
+        await scheduler.acquire_async(BULK)
+
+        waiter = asyncio.create_task(scheduler.acquire_async(INTERACTIVE))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.stats()["classes"][INTERACTIVE]["queued"] == 0
+
+        scheduler.release(BULK)
+        async with scheduler.slot_async(BACKGROUND):
+            assert scheduler.stats()["classes"][BACKGROUND]["active"] == 1
+        assert all(c["active"] == 0 for c in scheduler.stats()["classes"].values())
+
+    asyncio.run(main())
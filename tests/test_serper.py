@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from backend import providers
+from backend.http_pool import close_async_client, get_session
+from backend.serper import serper_request, serper_search, serper_search_async
+
+
+def test_serper_response_shape(use_cassette):
+    use_cassette("serper")
+    url, headers, payload = serper_request("search", "OpenAI", 5)
+
+    response = get_session().post(url, headers=headers, json=payload, timeout=10)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "organic" in data
+    assert len(data["organic"]) == 5
+
+
+def test_serper_search(use_cassette, recording):
+    cassette = use_cassette("serper")
+    results = serper_search("OpenAI")
+
+    assert len(results) == 5
+    assert all(r.link.startswith("http") and r.title for r in results)
+    # Served from the search cache the second time
+    assert serper_search("openai") == results
+    assert recording or cassette.stats()["replayed"] == 1
+
+
+def test_serper_search_async(use_cassette):
+    use_cassette("serper")
+
+    async def _search():
+        try:
+            return await serper_search_async("OpenAI")
+        finally:
+            await close_async_client()
+
+    results = asyncio.run(_search())
+    assert len(results) == 5
+    assert all(r.link.startswith("http") for r in results)
+
+
+def test_serper_search_async_keeps_sqlite_off_the_event_loop(use_cassette, monkeypatch):
+    use_cassette("serper")
+    cache, index = providers.get_search_cache(), providers.get_source_index()
+    threads = []
+
+    def spy(method):
+        def call(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+        return call
+
+    monkeypatch.setattr(cache, "get", spy(cache.get))
+    monkeypatch.setattr(cache, "set", spy(cache.set))
+    monkeypatch.setattr(index, "add", spy(index.add))
+
+    async def _search():
+        try:
+            return await serper_search_async("OpenAI"), threading.current_thread()
+        finally:
+            await close_async_client()
+
+    results, loop_thread = asyncio.run(_search())
+    assert len(results) == 5
+    assert len(threads) == 3
+    assert loop_thread not in threads
@@ -0,0 +1,224 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.singleflight import AsyncSingleFlight, SingleFlight, flight_key, single_flight
+
+
+def test_concurrent_calls_share_one_execution_and_get_copies():
+    group = SingleFlight()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"summary": ["a"]}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: group.do("k", lookup), range(4)))
+
+    assert len(calls) == 1
+    assert all(r == {"summary": ["a"]} for r in results)
+    # Followers get copies: one caller mutating its answer can't change the others'
+    assert len({id(r) for r in results}) == 4
+    assert group.stats() == {"executed": 1, "shared": 3, "in_flight": 0}
+
+
+def test_follower_gets_the_leaders_exception():
+    group = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(group.do, "k", failing)
+        started.wait(1)
+        follower = pool.submit(group.do, "k", failing)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="boom"):
+                future.result(timeout=2)
+
+
+def test_key_includes_the_other_arguments():
+    group = SingleFlight()
+    seen = []
+
+    @single_flight(group, "company")
+    def lookup(query, local_first=None):
+        seen.append(local_first)
+        time.sleep(0.1)
+        return local_first
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        a = pool.submit(lookup, "Acme", local_first=True)
+        b = pool.submit(lookup, "acme ", local_first=False)
+        assert (a.result(timeout=2), b.result(timeout=2)) == (True, False)
+
+    assert sorted(seen) == [False, True]
+    assert flight_key("company", "Acme", (), {"local_first": None}) == \
+        flight_key("company", " acme", (), {"local_first": None})
+
+
+def test_stream_followers_get_every_item():
+    group = SingleFlight()
+    produced = []
+
+    def lines():
+        for i in range(5):
+            produced.append(i)
+            time.sleep(0.03)
+            yield f"line {i}"
+
+    def read():
+        return list(group.stream("k", lines))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(read)
+        time.sleep(0.05)
+        second = pool.submit(read)
+        assert first.result(timeout=2) == second.result(timeout=2) == [f"line {i}" for i in range(5)]
+
+    assert produced == list(range(5))
+
+
+def test_stream_leader_that_stops_early_finishes_for_followers():
+    group = SingleFlight()
+    closed = []
+
+    def lines():
+        try:
+            for i in range(5):
+                time.sleep(0.03)
+                yield i
+        finally:
+            closed.append(True)
+
+    def read(stop=None):
+        items = []
+        for item in group.stream("k", lines):
+            items.append(item)
+            if len(items) == stop:
+                break
+        return items
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(read, 1)
+        time.sleep(0.01)
+        follower = pool.submit(read)
+        assert leader.result(timeout=2) == [0]
+        assert follower.result(timeout=2) == [0, 1, 2, 3, 4]
+    assert closed == [True]
+
+
+def test_stream_leader_alone_closes_the_source():
+    group = SingleFlight()
+    produced = []
+
+    def lines():
+        for i in range(5):
+            produced.append(i)
+            yield i
+
+    stream = group.stream("k", lines)
+    assert next(stream) == 0
+    stream.close()
+    assert produced == [0]
+    assert group.stats()["in_flight"] == 0
+
+
+def test_async_follower_survives_leader_cancellation():
+    async def main():
+        group = AsyncSingleFlight()
+        runs = []
+
+        async def lookup():
+            runs.append(1)
+            await asyncio.sleep(0.1)
+            return {"summary": ["a"]}
+
+        leader = asyncio.create_task(group.do("k", lookup))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(group.do("k", lookup))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == {"summary": ["a"]}
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert runs == [1]
+
+    asyncio.run(main())
+
+
+def test_async_call_is_cancelled_once_nobody_waits():
+    async def main():
+        group = AsyncSingleFlight()
+        runs, cancelled = [], []
+
+        async def lookup():
+            runs.append(1)
+            try:
+                await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "done"
+
+        callers = [asyncio.create_task(group.do("k", lookup)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert cancelled == [1]
+
+        # The next caller starts over instead of joining the cancelled call
+        assert await group.do("k", lookup) == "done"
+        assert runs == [1, 1]
+        assert group.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_async_stream_shared_and_stopped_with_last_reader():
+    async def main():
+        group = AsyncSingleFlight()
+        produced = []
+
+        async def lines(count):
+            for i in range(count):
+                produced.append(i)
+                await asyncio.sleep(0.02)
+                yield i
+
+        async def read(stop=None):
+            items = []
+            stream = group.stream("k", lines, 5)
+            async for item in stream:
+                items.append(item)
+                if len(items) == stop:
+                    break
+            await stream.aclose()
+            return items
+
+        first = asyncio.create_task(read(2))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(read())
+        assert await first == [0, 1]
+        assert await second == [0, 1, 2, 3, 4]
+        assert produced == [0, 1, 2, 3, 4]
+
+        produced.clear()
+        assert await read(1) == [0]
+        await asyncio.sleep(0.05)
+        # Nobody reading any more: the producer stopped instead of running to the end
+        assert len(produced) < 5
+        assert group.stats()["in_flight"] == 0
+
+    asyncio.run(main())
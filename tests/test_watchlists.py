@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+
+from backend.watchlists import WatchlistManager
+
+
+def article(i, date="1 hour ago"):
+    return {"title": f"Acme news {i}", "link": f"https://news.example/{i}", "date": date}
+
+
+class Feed:
+    """fetch / summarize doubles: the feed is editable, summarize cites at most `cite` articles."""
+
+    def __init__(self, articles, cite=None):
+        self.articles = list(articles)
+        self.cite = cite
+        self.summarized = []
+
+    def fetch(self, account):
+        return list(self.articles)
+
+    def summarize(self, account, articles):
+        self.summarized.append([a["link"] for a in articles])
+        used = articles[:self.cite] if self.cite else articles
+        return {"summary": [f"{len(used)} new"], "points": [], "sources": [a["link"] for a in used]}
+
+
+def manager_for(feed, workers=2):
+    manager = WatchlistManager(None, feed.fetch, feed.summarize, interval=0, workers=workers)
+    manager.add("key accounts", ["Acme Corp"])
+    return manager
+
+
+def test_only_new_articles_are_summarized():
+    feed = Feed([article(1), article(2)])
+    manager = manager_for(feed)
+
+    assert manager.run()[0]["new_articles"] == 2
+    # Nothing new: no LLM call, no digest entry
+    assert manager.run()[0] == {"account": "Acme Corp", "new_articles": 0, "fetched": 2, "digest": False}
+
+    feed.articles.append(article(3))
+    assert manager.run()[0]["new_articles"] == 1
+    assert feed.summarized == [
+        ["https://news.example/1", "https://news.example/2"],
+        ["https://news.example/3"],
+    ]
+    assert [entry["new_articles"] for entry in manager.digest("key accounts")] == [1, 2]
+    manager.stop()
+
+
+def test_articles_left_out_of_the_summary_stay_unseen():
+    feed = Feed([article(1), article(2), article(3)], cite=1)
+    manager = manager_for(feed)
+
+    manager.run()
+    entry = manager.digest()[0]
+    assert entry["new_articles"] == 1 and entry["sources"] == ["https://news.example/1"]
+
+    # The two dropped articles come back on the next run
+    manager.run()
+    assert feed.summarized[1] == ["https://news.example/2", "https://news.example/3"]
+    manager.stop()
+
+
+def test_failed_summary_is_retried():
+    feed = Feed([article(1)])
+    manager = manager_for(feed)
+    manager.summarize = lambda account, articles: {"summary": ["Error generating summary"], "sources": []}
+    manager.run()
+    assert manager.digest() == []
+
+    manager.summarize = feed.summarize
+    assert manager.run()[0]["digest"] is True
+    manager.stop()
+
+
+def test_concurrent_run_async_calls_complete():
+    release = threading.Event()
+    feed = Feed([article(1)])
+    fetch = feed.fetch
+
+    def slow_fetch(account):
+        release.wait(2)
+        return fetch(account)
+
+    manager = WatchlistManager(None, slow_fetch, feed.summarize, interval=0, workers=2)
+    manager.add("key accounts", ["Acme Corp", "Globex"])
+    manager.add("prospects", ["Initech"])
+
+    futures = [manager.run_async("key accounts"), manager.run_async("prospects"), manager.run_async()]
+    release.set()
+    # Runs wait on account checks in a separate pool, so they can't starve it
+    outcomes = [future.result(timeout=5) for future in futures]
+
+    assert {o["account"] for run in outcomes for o in run} == {"Acme Corp", "Globex", "Initech"}
+    manager.stop()
+
+
+def test_non_ascii_spellings_share_one_account():
+    feed = Feed([article(1)])
+    fetched = []
+    manager = WatchlistManager(None, lambda account: fetched.append(account) or feed.fetch(account),
+                               feed.summarize, interval=0)
+    manager.add("key accounts", ["Nestlé"])
+    manager.add("emea", ["NESTLÉ"])
+
+    assert len(manager.run()) == 1 and len(fetched) == 1
+    assert manager.run("emea")[0]["new_articles"] == 0
+    assert len(manager.digest("emea")) == len(manager.digest("key accounts")) == 1
+    assert manager.get("emea")["accounts"][0]["last_run"] is not None
+    manager.stop()
+
+
+def test_existing_database_gets_account_keys(tmp_path):
+    path = str(tmp_path / "watchlists.sqlite3")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE watchlist_accounts (watchlist TEXT NOT NULL, account TEXT NOT NULL, "
+                "added_at REAL NOT NULL, PRIMARY KEY (watchlist, account))")
+    old.execute("INSERT INTO watchlist_accounts VALUES ('key accounts', 'Nestlé', 0)")
+    old.commit()
+    old.close()
+
+    feed = Feed([article(1)])
+    manager = WatchlistManager(path, feed.fetch, feed.summarize, interval=0)
+    manager.add("key accounts", ["NESTLÉ"])
+    assert len(manager.run()) == 1
+    manager.stop()
@@ -0,0 +1,10 @@
+from app import create_app
+
+# =================================================
+# WSGI ENTRY POINT
+# =================================================
+# Production server for the Flask app (settings in gunicorn.conf.py):
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+app = create_app()